@@ -0,0 +1,58 @@
+"""
+    Run a benchmark and print its result in json format.
+    :argument
+    benchmark:          Name of the benchmark - one of:
+                        vectorizer_fit      serial vs. parallel fitting of vectorizers.
+                        classify_service    load generator against a running main_classify_service.py.
+                        pipeline            every pipeline stage and end to end on a synthetic corpus,
+                                            e.g. size=medium output=bench.json.
+                        compare             regressions between two pipeline results,
+                                            e.g. baseline=old.json current=new.json.
+                        import_time         cold start of entry points against their budgets.
+                        shared_scoring      memory of scoring processes with private copies vs. shared memory,
+                                            e.g. pool_processes=[1,2,4,8].
+                        pipelined_io        read - process - write one after the other vs. overlapped,
+                                            e.g. compression=gzip chunk_size=1000.
+                        similarity_index    top-k similar postings by the approximate index vs. brute force,
+                                            e.g. n_docs=100000 n_tables=16 n_bits=16.
+                        reduction           classifiers on full vs. chi2-selected or randomly projected features,
+                                            e.g. n_components=2000 'methods=["chi2"]'.
+    <param>=<value>:    Keyword arguments of the benchmark function in src/benchmark.py,
+                        e.g. n_docs=20000 pool_process=8 concurrency=32.
+"""
+
+if __name__ == '__main__':
+
+    import sys
+    import json
+    import warnings
+    from src import benchmark
+    warnings.filterwarnings('ignore')
+
+    # ========== parsing arguments ==========
+    argvs = sys.argv[1:]
+    bench_name = argvs.pop(0)
+    kwargs = {}
+
+    for arg in argvs:
+        key, value = arg.split('=', 1)
+        try:
+            kwargs[key] = json.loads(value)
+        except ValueError:
+            kwargs[key] = value  # plain string, e.g. host name or path.
+    # ========================================
+
+    benchmarks = {'vectorizer_fit': benchmark.benchmark_vectorizer_fit,
+                  'classify_service': benchmark.benchmark_classify_service,
+                  'pipeline': benchmark.benchmark_pipeline,
+                  'compare': benchmark.compare_benchmarks,
+                  'import_time': benchmark.benchmark_import_time,
+                  'shared_scoring': benchmark.benchmark_shared_scoring,
+                  'pipelined_io': benchmark.benchmark_pipelined_io,
+                  'similarity_index': benchmark.benchmark_similarity_index,
+                  'reduction': benchmark.benchmark_reduction}
+    if bench_name not in benchmarks:
+        raise ValueError('benchmark must be one of: ' + ', '.join(sorted(benchmarks)))
+
+    result = benchmarks[bench_name](**kwargs)
+    print(json.dumps(result, indent=4, ensure_ascii=False))
@@ -0,0 +1,39 @@
+"""
+    Serve a Classifier object over HTTP - POST /classify with a document or a list of documents
+    in json format with keys "title" and "desc"; GET /metrics for latency and throughput metrics.
+    :argument
+    classifier:         A file containing Classifier object.
+    host=<str>:         Host name to listen on - default = 127.0.0.1.
+    port=<int>:         TCP port to listen on - default = 8000.
+    unix=<str>:         Path to a Unix socket to listen on instead of a TCP port.
+    pool=<int>:         Number of pool processes - default = number of available CPUs.
+    batch=<int>:        Maximum number of documents in a batch - default = 64.
+    wait=<float>:       Maximum time (ms) to wait for a batch to fill up - default = 5.
+    thres=<float>:      Probability threshold over which a document is assigned a class - default = 0.5.
+    ntitle=<int>:       Length of n-gram for title tokenizer - default = 5.
+    ndesc=<int>:        Length of n-gram for description tokenizer - default = 4.
+"""
+
+if __name__ == '__main__':
+
+    import sys
+    import warnings
+    from src.service import serve
+    warnings.filterwarnings('ignore')
+
+    # ========== parsing arguments ==========
+    argvs = sys.argv[1:]
+    clf_filename = argvs.pop(0)
+    kwargs = {'host': '127.0.0.1', 'port': 8000, 'unix': None, 'pool': None,
+              'batch': 64, 'wait': 5.0, 'thres': 0.5, 'ntitle': 5, 'ndesc': 4}
+
+    for arg in argvs:
+        key, value = arg.split('=', 1)
+        if key not in kwargs:
+            raise ValueError('unknown argument ' + key)
+        kwargs[key] = value if key in ('host', 'unix') else type(kwargs[key] or 0)(value)
+    # ========================================
+
+    serve(clf_filename, host=kwargs['host'], port=kwargs['port'], unix_path=kwargs['unix'],
+          pool_process=kwargs['pool'], max_batch=kwargs['batch'], max_wait=kwargs['wait'] / 1000,
+          thres=kwargs['thres'], title_ngram=kwargs['ntitle'], desc_ngram=kwargs['ndesc'])
@@ -0,0 +1,46 @@
+"""
+    Prune features which contribute little to every classifier of a Classifier object,
+    save the compact Classifier object and report size, load time, latency and accuracy differences.
+    :argument
+    classifier:         A file containing Classifier object.
+    documents:          A file containing tokenized documents in json format with keys "title_seg", "desc_seg"
+                        and optionally "label" used for accuracy.
+    output:             File name for the compact Classifier object.
+    threshold=<float>:  Minimum contribution (absolute log-likelihood ratio) of a feature to be kept - default = 0.1.
+"""
+
+if __name__ == '__main__':
+
+    import sys
+    import json
+    import warnings
+    from src.classifier import Classifier
+    from src.compaction import compact_classifier, compare_classifiers
+    from src.pipeline_io import open_input
+    warnings.filterwarnings('ignore')
+
+    # ========== parsing arguments ==========
+    argvs = sys.argv[1:]
+    clf_filename = argvs.pop(0)
+    doc_filename = argvs.pop(0)
+    out_filename = argvs.pop(0)
+    kwargs = {'threshold': 0.1}
+
+    for arg in argvs:
+        for key in list(kwargs):
+            if arg.find(key) != -1:
+                kwargs[key] = float(arg.split('=')[1])
+    # ========================================
+
+    classifier = Classifier.read_pickle(clf_filename)
+    with open_input(doc_filename) as f_in:
+        documents = json.load(f_in)
+    labels = [doc['label'] for doc in documents] if all('label' in doc for doc in documents) else None
+
+    compact, features = compact_classifier(classifier, threshold=kwargs['threshold'])
+    print('Features kept: ' + json.dumps(features))
+    print(json.dumps(compare_classifiers(classifier, compact, documents, labels), indent=4))
+
+    out_dir, _, out_name = out_filename.rpartition('/')
+    compact.save_file(out_name, filepath=out_dir + '/' if out_dir else './')
+    print('Compact classifier saved to ' + out_filename)
@@ -4,16 +4,43 @@
     documents:          A file containing documents, each of which is stored in json format
                         with the following keys: (1) "title", (2) "desc", (3) "tag"
     output:             File name for the output.
-    pool=<int>:         Number of pool processes.
+    pool=<int>:         Number of pool processes - default = number of available CPUs.
     ntitle=<int>:       Length of n-gram for title tokenizer - default = 5.
     ndesc=<int>:        Length of n-gram for description tokenizer - default = 5.
-    chunksize=<int>:    Number of jobs assigned to a given queue in each process.
+    chunksize=<int>:    Number of jobs assigned to a given queue in each process -
+                        default = sized adaptively by character count.
+    checkpoint=<str>:   Directory where tokenized shards are written so that an interrupted run
+                        can be resumed - default = no checkpoint.
+    profile=<int>:      1 will print time spent in each tokenization stage - default = 0.
+    metrics=<str>:      File into which tokenization stage metrics are written in Prometheus text format.
+    mode=<str>:         Start method of pool processes - fork loads shared resources once in this process,
+                        forkserver loads them once in a forkserver, spawn does not share them -
+                        default = the start method of the platform.
+    freeze=<int>:       1 will keep objects of this process out of the garbage collector while fork pool
+                        processes run, so that they do not copy shared pages - default = 1.
+    memory=<int>:       1 will report memory usage of each pool process before and after - default = 0.
+    store=<str>:        SQLite file in which tokenized documents are kept across runs, so that only new or
+                        changed documents are tokenized - default = no store.
+    dedup=<int>:        1 will tokenize only one of exact or near-duplicate documents, link the others to it
+                        and fit vectorizers on unique documents - default = 0. Implies stream=0.
+    stream=<int>:       Number of documents read, tokenized and written at a time - reading the next chunk and
+                        writing the previous one overlap with tokenization - default = 20000.
+                        0 reads all documents before tokenizing.
+    reduce=<str>:       Reduction of features fitted with the vectorizers and saved with them - chi2 (select
+                        features by chi-squared statistics per class) or random_projection - default = none.
+    components=<int>:   Number of features after reduction - default = 5000.
+    label=<str>:        Field of the class of a document used by chi2 reduction - default = label.
+    limits=<str>:       Per-field tokenizer limits - default (TOKENIZE_LIMITS of src/tokenizer.py) or a json file
+                        {"title": {...}, "desc": {...}} - default = no limit.
+    Input and output files may be compressed (.gz, .bz2, .xz, .zst).
 """
 
 if __name__ == '__main__':
 
+    import os
     import sys
-    from src.tokenizer import tokenize_documents
+    from src.tokenizer import tokenize_documents, TokenizerPool, TOKENIZE_LIMITS
+    from src.pipeline_io import open_input, iter_json_records, JsonArrayWriter, run_pipeline
     from src.vectorizer import create_vectorizer
     import warnings
     import json
@@ -23,30 +50,127 @@ if __name__ == '__main__':
     argvs = sys.argv[1:]
     doc_filename = argvs.pop(0)
     out_filename = argvs.pop(0)
-    kwargs = {'pool': 32, 'ntitle': 5, 'ndesc': 5, 'chunksize': 100}
+    kwargs = {'pool': None, 'ntitle': 5, 'ndesc': 5, 'chunksize': None}
+
+    checkpoint_dir = None
+    metrics_filename = None
+    profile = False
+    pool_mode = None
+    freeze = True
+    report_memory = False
+    dedup = False
+    store_filename = None
+    stream = 20000
+    reduction = None
+    n_components = 5000
+    label_field = 'label'
+    limits = None
 
     for arg in argvs:
+        if arg.startswith('checkpoint='):
+            checkpoint_dir = arg.split('=', 1)[1]
+            continue
+        if arg.startswith('metrics='):
+            metrics_filename = arg.split('=', 1)[1]
+            continue
+        if arg.startswith('profile='):
+            profile = bool(int(arg.split('=', 1)[1]))
+            continue
+        if arg.startswith('mode='):
+            pool_mode = arg.split('=', 1)[1]
+            continue
+        if arg.startswith('freeze='):
+            freeze = bool(int(arg.split('=', 1)[1]))
+            continue
+        if arg.startswith('memory='):
+            report_memory = bool(int(arg.split('=', 1)[1]))
+            continue
+        if arg.startswith('store='):
+            store_filename = arg.split('=', 1)[1]
+            continue
+        if arg.startswith('stream='):
+            stream = int(arg.split('=', 1)[1])
+            continue
+        if arg.startswith('dedup='):
+            dedup = bool(int(arg.split('=', 1)[1]))
+            continue
+        if arg.startswith('reduce='):
+            reduction = arg.split('=', 1)[1]
+            continue
+        if arg.startswith('components='):
+            n_components = int(arg.split('=', 1)[1])
+            continue
+        if arg.startswith('label='):
+            label_field = arg.split('=', 1)[1]
+            continue
+        if arg.startswith('limits='):
+            limits = arg.split('=', 1)[1]
+            if limits == 'default':
+                limits = TOKENIZE_LIMITS
+            else:
+                with open(limits, 'rt', encoding='utf-8') as f_limits:
+                    limits = json.load(f_limits)
+            continue
         for key in list(kwargs):
             if arg.find(key) != -1:
                 kwargs[key] = int(arg.split('=')[1])
     # ========================================
 
-    # Read documents from json file.
-    print('Loading data from ' + doc_filename)
-    with open(doc_filename, 'rt', encoding='utf-8') as f_in:
-        documents = json.load(f_in)
-    print('Number of documents: ' + str(len(documents)))
-
     # Tokenize documents
     print(kwargs)
-    documents = tokenize_documents(documents, pool_process=kwargs['pool'],
-                                   chunksize=kwargs['chunksize'])
-    print('Completed tokenizing documents ' + doc_filename)
+    chunk_index = 0
+    # one pool for the whole run - chunks of a stream share its processes, and it reports and writes metrics once.
+    tokenizer_pool = TokenizerPool(pool_process=kwargs['pool'], profile=profile, metrics_filename=metrics_filename,
+                                   pool_mode=pool_mode, report_memory=report_memory, limits=limits, freeze=freeze)
+
+    def tokenize(docs):
+        global chunk_index
+        # each chunk has its own checkpoint directory, since shards are named by index within the chunk.
+        chunk_checkpoint = checkpoint_dir
+        if checkpoint_dir and stream and not dedup:
+            chunk_checkpoint = os.path.join(checkpoint_dir, 'chunk_{:06d}'.format(chunk_index))
+        chunk_index += 1
+        return tokenize_documents(docs, chunksize=kwargs['chunksize'], checkpoint_dir=chunk_checkpoint,
+                                  store_filename=store_filename, pool=tokenizer_pool)
 
-    json.dump(documents,
-              open(out_filename, 'wt', encoding='utf-8'),
-              ensure_ascii=False)
+    print('Loading data from ' + doc_filename)
+    if dedup or not stream:
+        # Read documents from json file.
+        with open_input(doc_filename) as f_in:
+            documents = json.load(f_in)
+        print('Number of documents: ' + str(len(documents)))
+        if dedup:
+            from src.dedup import dedup_tokenize
+            documents, dedup_report = dedup_tokenize(documents, tokenize_func=tokenize, mode='link')
+            print('Dedup: {exact_duplicates} exact and {near_duplicates} near duplicates of {documents} documents '
+                  '({dedup_rate:.1%}) found in {dedup_sec:.1f}s, saving about {saved_sec:.1f}s of tokenization'
+                  .format(**dedup_report))
+        else:
+            documents = tokenize(documents)
+        with JsonArrayWriter(out_filename) as writer:
+            for document in documents:
+                writer.write(document)
+    else:
+        # read the next chunk and write the previous one while a chunk is tokenized.
+        documents = []
+        with JsonArrayWriter(out_filename) as writer:
+            def write(docs):
+                for document in docs:
+                    writer.write(document)
+
+            def compute(docs):
+                docs = tokenize(docs)
+                documents.extend(docs)
+                return docs
+
+            io_report = run_pipeline(iter_json_records(doc_filename), compute, write, chunk_size=stream)
+        print('Number of documents: {items} in {chunks} chunks - waited {read_wait_sec:.1f}s for input and '
+              '{write_wait_sec:.1f}s for output, tokenized for {compute_sec:.1f}s'.format(**io_report))
+    tokenizer_pool.close()
+    print('Completed tokenizing documents ' + doc_filename)
 
     # create vectorizers
-    vectorizers = create_vectorizer(documents, dump=True)
+    vectorizers = create_vectorizer([doc for doc in documents if 'duplicate_of' not in doc],
+                                    dump=True, pool_process=kwargs['pool'],
+                                    reduction=reduction, n_components=n_components, label_field=label_field)
     print('Completed fitting vectorizers from documents ' + doc_filename)
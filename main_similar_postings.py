@@ -0,0 +1,75 @@
+"""
+    Find the postings most similar to given postings by cosine similarity of their TF-IDF vectors,
+    with an approximate nearest-neighbour index (see src/similarity_index.py), e.g. for duplicate review
+    or label propagation.
+    :argument
+    vectorizer:         A file containing VectorizerTFIDF object.
+    documents:          A file containing tokenized documents in json format with keys "title_seg" and "desc_seg"
+                        - the indexed postings.
+    index:              Directory of the index - built from documents and saved unless it exists.
+    output:             File name for the result - a json array of {"query": index, "similar": [{"index",
+                        "similarity"}]} where indices are positions in the query and documents files.
+    query=<file>:       Tokenized documents to be queried - default: each indexed posting against the others.
+    k=<int>:            Number of similar postings per query - default = 10.
+    tables=<int>:       Number of hash tables of a new index - default = 16.
+    bits=<int>:         Number of bits of a key of a new index - default = 16.
+    candidates=<int>:   Maximum number of candidates ranked per query - default = 1000.
+"""
+
+if __name__ == '__main__':
+
+    import os
+    import sys
+    import json
+    import warnings
+    import dill
+    from time import perf_counter
+    from src.pipeline_io import open_input, JsonArrayWriter
+    from src.similarity_index import posting_vectors, SimilarityIndex
+    warnings.filterwarnings('ignore')
+
+    # ========== parsing arguments ==========
+    argvs = sys.argv[1:]
+    vec_filename = argvs.pop(0)
+    doc_filename = argvs.pop(0)
+    index_dir = argvs.pop(0)
+    out_filename = argvs.pop(0)
+    kwargs = {'query': None, 'k': 10, 'tables': 16, 'bits': 16, 'candidates': 1000}
+
+    for arg in argvs:
+        key, value = arg.split('=', 1)
+        kwargs[key] = value if key == 'query' else int(value)
+    # ========================================
+
+    with open_input(vec_filename, 'rb') as f_in:
+        vectorizer = dill.load(f_in)  # create_vectorizer() dumps VectorizerTFIDF object with dill.
+
+    if os.path.exists(os.path.join(index_dir, 'meta.json')):
+        index = SimilarityIndex.load(index_dir)
+        print('Loaded index of ' + str(len(index)) + ' postings')
+    else:
+        begin = perf_counter()
+        with open_input(doc_filename) as f_in:
+            documents = json.load(f_in)
+        index = SimilarityIndex.build(posting_vectors(vectorizer, documents),
+                                      n_tables=kwargs['tables'], n_bits=kwargs['bits'])
+        index.save(index_dir)
+        del documents
+        print('Built index of {} postings in {:.1f} s ({:.1f} MB)'.format(
+            len(index), perf_counter() - begin, index.nbytes() / 2 ** 20))
+
+    begin = perf_counter()
+    if kwargs['query']:
+        with open_input(kwargs['query']) as f_in:
+            rows, similarities = index.query(posting_vectors(vectorizer, json.load(f_in)),
+                                             k=kwargs['k'], max_candidates=kwargs['candidates'])
+    else:
+        rows, similarities = index.neighbours(range(len(index)), k=kwargs['k'], max_candidates=kwargs['candidates'])
+    print('Queried {} postings in {:.1f} ms per posting'.format(
+        len(rows), (perf_counter() - begin) * 1000 / max(len(rows), 1)))
+
+    with JsonArrayWriter(out_filename) as writer:
+        for query, (query_rows, query_similarities) in enumerate(zip(rows, similarities)):
+            writer.write({'query': query,
+                          'similar': [{'index': int(row), 'similarity': float(similarity)}
+                                      for row, similarity in zip(query_rows, query_similarities) if row >= 0]})
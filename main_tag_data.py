@@ -1,6 +1,7 @@
 """
-    Read pandas.DataFrame from pickle file and display each item user can key new tag
-    Input:  path to pickle file
+    Display each item of a data set so that user can key new tag
+    Input:  path to pickle file of pandas.DataFrame or to columnar directory (see src.tagging) -
+                a pickle file is converted once into directory <path without extension>.columns
             path to new DataFrame file (ret=path_to_file)
             default tag name (def=tag_name)
             positive tag (pos=tag_name)
@@ -8,21 +9,37 @@
             [optional] filter (filter=tag)
             [optional] range (range=begin:end)
             [optional] sampling (sampling=sample_size(int or float))
+            [optional] seed of random sampling (seed=int)
+            [optional] active learning (active=path_to_Classifier_file) - every item is scored before the
+                first one is served, least certain first; the classifiers are updated as tags are entered
+            [optional] probability threshold of active learning (thres=float, default 0.5)
+    Each tag is appended to journal <ret file>.journal as it is entered; running again with the same ret file
+    resumes the session. Tagged items are written into ret file at the end of the session.
 """
 
 if __name__ == '__main__':
 
-    import pandas
+    import os
     import sys
+    from src.tagging import convert_to_columnar, ColumnarData, TagJournal, export_tags
 
     # parse arguments
     argvs = sys.argv[1:]
     data_file = argvs.pop(0)
     ret_file = data_file[:data_file.find('.')] + '.tagged'
-    kwargs = {'filter': None, 'range': {'begin': None, 'End': None}}
+    kwargs = {'filter': None, 'range': {'begin': None, 'end': None}}
     tags = {'def': None, '-': None, '+': None}
     sampling = 1.0
+    seed = None
+    active = None
+    thres = 0.5
     for index in reversed(range(len(argvs))):
+        if argvs[index].startswith('active='):
+            active = argvs.pop(index).split('=', 1)[1]
+            continue
+        if argvs[index].startswith('thres='):
+            thres = float(argvs.pop(index).split('=', 1)[1])
+            continue
         if argvs[index].find('ret') != -1:
             ret_file = argvs[index].split('=')[1]
         if argvs[index].find('filter') != -1:
@@ -43,52 +60,87 @@ if __name__ == '__main__':
                 sampling = int(sampling)
             except ValueError:
                 sampling = float(sampling)
+        if argvs[index].find('seed') != -1:
+            seed = int(argvs[index].split('=')[1])
         argvs.pop(index)
 
-    dataSet = pandas.read_pickle(data_file)
+    # open the data set memory-mapped, converting a pickle file once.
+    data_dir = data_file
+    if not os.path.isdir(data_file):
+        data_dir = os.path.splitext(data_file)[0] + '.columns'
+        if not os.path.exists(os.path.join(data_dir, 'meta.json')):
+            print('Converting ' + data_file + ' into ' + data_dir)
+            convert_to_columnar(data_file, data_dir)
+    dataSet = ColumnarData(data_dir)
     print('\n\n==== Sample data ====')
-    print(dataSet.iloc[:4])
-    print('Total observations: ' + str(dataSet.count()))
+    for row in range(min(4, len(dataSet))):
+        print(dataSet.record(row))
+    print('Total observations: ' + str(len(dataSet)))
     print('=' * 21)
     print('\n' * 2)
-    dataSet = dataSet.iloc[kwargs['range']['begin']:kwargs['range']['end']]
-    dataSet = dataSet.loc[dataSet['predict'] == kwargs['filter']]
-    if type(sampling) is int:
-        newDataSet = dataSet.sampling(n=sampling)
-    elif type(sampling) is float:
-        newDataSet = dataSet.sample(frac=sampling)
+
+    # select rows, or resume the selection of an interrupted session.
+    journal = TagJournal(ret_file + '.journal')
+    if journal.selection is None:
+        journal.start(dataSet.select(kwargs['filter'], begin=kwargs['range']['begin'],
+                                     end=kwargs['range']['end'], sampling=sampling, seed=seed))
     else:
-        raise ValueError('invalid sampling parameter')
-    newDataSet = newDataSet.reset_index(drop=True)
+        print('Resuming session: ' + str(len(journal.tags)) + ' of ' + str(len(journal.selection)) + ' tagged')
+    to_tag = [row for row in journal.selection if row not in journal.tags]
     print('\n\n==== Tagging data ====')
-    print(newDataSet.iloc[:4])
-    print('Total observations: ' + str(newDataSet.count()))
+    print('Total observations: ' + str(len(journal.selection)))
     print('=' * 21)
     print('\n' * 4)
-    for index, _ in newDataSet.iterrows():
+
+    if active:
+        # serve the most uncertain items first - every item is tokenized by pool processes and scored
+        # before the first one is served, so that tagging does not wait for tokenization.
+        from src.classifier import Classifier
+        from src.tagging import UncertaintyQueue
+        from src.tokenizer import tokenize_documents, TokenizerPool
+        print('Scoring ' + str(len(to_tag)) + ' items')
+        with TokenizerPool() as tokenizer_pool:
+            queue = UncertaintyQueue(Classifier.read_pickle(active),
+                                     lambda rows: tokenize_documents([dataSet.record(row) for row in rows],
+                                                                     pool=tokenizer_pool),
+                                     thres, batch_size=5000)
+            queue.extend(to_tag)
+            queue.score_all()
+
+        def next_row():
+            item = queue.pop()
+            return item[0] if item else None
+    else:
+        remaining = iter(to_tag)
+
+        def next_row():
+            return next(remaining, None)
+
+    inputs = {'': tags['def'], '-': tags['-'], '+': tags['+'], '.': 'not sure'}
+    row = next_row()
+    record = dataSet.record(row) if row is not None else None
+    while row is not None:
         print('\n' * 8)
-        print('current loc: ', index)
-        print('\ntitle: \n', newDataSet.iloc[index]['title'])
-        print('\ndescription: \n', newDataSet.iloc[index]['desc'])
+        print('current loc: ', row)
+        print('\ntitle: \n', record['title'])
+        print('\ndescription: \n', record['desc'])
         print('\n' * 8)
-        tag_recorded = False
-        while not tag_recorded:
+        if not active:
+            # fetch the next record while the user reads this one.
+            next_row_ = next_row()
+            next_record = dataSet.record(next_row_) if next_row_ is not None else None
+        while True:
             inp = input('>>>')
-            if inp == '':
-                newDataSet.at[index, 'tag'] = tags['def']
-                print('Entry tagged as ' + tags['def'])
-                print(newDataSet.iloc[index])
-                tag_recorded = True
-            elif inp in ['-', '+']:
-                newDataSet.at[index, 'tag'] = tags[inp]
-                print('Entry tagged as ' + tags[inp])
-                print(newDataSet.iloc[index])
-                tag_recorded = True
-            elif inp == '.':
-                newDataSet.at[index, 'tag'] = 'not sure'
-                print('Entry tagged as "not sure".')
-                print(newDataSet.iloc[index])
-                tag_recorded = True
-            else:
-                print('tag must be "-" for ' + tags['-'] + ' tag or "+" for ' + tags['+'] + ' tag.')
-    newDataSet.to_pickle(ret_file)
+            if inp in inputs:
+                journal.record(row, inputs[inp])
+                print('Entry tagged as "' + str(inputs[inp]) + '".')
+                break
+            print('tag must be "-" for ' + str(tags['-']) + ' tag or "+" for ' + str(tags['+']) + ' tag.')
+        if active:
+            # the next item depends on this tag.
+            queue.label(row, inputs[inp])
+            next_row_ = next_row()
+            next_record = dataSet.record(next_row_) if next_row_ is not None else None
+        row, record = next_row_, next_record
+    journal.close()
+    export_tags(dataSet, journal, ret_file)
@@ -0,0 +1,54 @@
+"""
+    Tune the cut-off probability of each class by k-fold cross-validation and write them into a json file.
+    :argument
+    documents:          A file containing tokenized documents in json format with keys "title_seg", "desc_seg"
+                        and "label".
+    vectorizer:         A file containing VectorizerTFIDF object.
+    output:             File name for the cut-offs - {"class": {"cutoff", "precision", "recall", "f_score"}}.
+    folds=<int>:        Number of folds - default = 5.
+    pool=<int>:         Number of pool processes - default = number of folds.
+    beta=<float>:       Weight of recall relative to precision in F-score - default = 1.
+    seed=<int>:         Random seed - default = 0.
+"""
+
+if __name__ == '__main__':
+
+    import sys
+    import json
+    import warnings
+    import dill
+    from src.classifier import Classifier
+    from src.evaluation import cross_validate_proba, tune_cutoffs, evaluate_cutoffs
+    from src.pipeline_io import open_input
+    warnings.filterwarnings('ignore')
+
+    # ========== parsing arguments ==========
+    argvs = sys.argv[1:]
+    doc_filename = argvs.pop(0)
+    vec_filename = argvs.pop(0)
+    out_filename = argvs.pop(0)
+    kwargs = {'folds': 5, 'pool': None, 'beta': 1.0, 'seed': 0}
+
+    for arg in argvs:
+        key, value = arg.split('=', 1)
+        kwargs[key] = float(value) if key == 'beta' else int(value)
+    # ========================================
+
+    with open_input(doc_filename) as f_in:
+        documents = json.load(f_in)
+    labels = [doc['label'] for doc in documents]
+    classes = sorted(set(labels) - {'None'})
+
+    with open_input(vec_filename, 'rb') as f_in:
+        vectorizer = dill.load(f_in)  # create_vectorizer() dumps VectorizerTFIDF object with dill.
+    data_vec = Classifier(vectorizer)._extract_features(documents)
+    proba = cross_validate_proba(data_vec, labels, classes, n_folds=kwargs['folds'],
+                                 pool_process=kwargs['pool'], seed=kwargs['seed'])
+    cutoffs = tune_cutoffs(proba, labels, classes, beta=kwargs['beta'])
+    default = evaluate_cutoffs(proba, labels, classes, {class_: 0.5 for class_ in classes})
+    for class_ in classes:
+        print('{:<30} cutoff {:.3f}  F {:.3f} (F at 0.5: {:.3f})'.format(
+            class_, cutoffs[class_]['cutoff'], cutoffs[class_]['f_score'], default[class_]['f_score']))
+
+    with open(out_filename, 'wt', encoding='utf-8') as f_out:
+        json.dump(cutoffs, f_out, ensure_ascii=False, indent=4)
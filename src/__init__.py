@@ -1 +1 @@
-'''This makes this folder behaves as a module'''
\ No newline at end of file
+'''This makes this folder behaves as a module'''
@@ -0,0 +1,650 @@
+def synthetic_tokenized_documents(n_docs, title_tokens=8, desc_tokens=300, vocabulary_size=20000, seed=0):
+    """
+    Generate synthetic tokenized documents for benchmarking.
+    Tokens are drawn from a Zipf-like distribution so that document frequencies resemble natural text.
+
+
+    :param n_docs: Number of documents to generate.
+    :param title_tokens: Number of word-tokens in each job title.
+    :param desc_tokens: Number of word-tokens in each job description.
+    :param vocabulary_size: Number of distinct word-tokens.
+    :param seed: Random seed.
+    :return: List of documents in dict format with keys: 'title_seg' and 'desc_seg'.
+    """
+
+    import random
+
+    rand = random.Random(seed)
+    vocabulary = ['tok' + str(index) for index in range(vocabulary_size)]
+    weights = [1.0 / (rank + 1) for rank in range(vocabulary_size)]
+
+    documents = []
+    for _ in range(n_docs):
+        documents.append({'title_seg': '|'.join(rand.choices(vocabulary, weights, k=title_tokens)),
+                          'desc_seg': '|'.join(rand.choices(vocabulary, weights, k=desc_tokens))})
+    return documents
+
+
+def time_function(func, *args, repeat=1, **kwargs):
+    """
+    Time a function call.
+
+
+    :param func: Function to be timed.
+    :param repeat: Number of repeated calls - the fastest is reported.
+    :return: (best wall time in seconds, return value of the last call).
+    """
+
+    from time import perf_counter
+
+    best = None
+    ret = None
+    for _ in range(repeat):
+        begin = perf_counter()
+        ret = func(*args, **kwargs)
+        elapsed = perf_counter() - begin
+        best = elapsed if best is None else min(best, elapsed)
+    return best, ret
+
+
+def benchmark_vectorizer_fit(n_docs=20000, pool_process=None, repeat=1):
+    """
+    Compare serial and parallel fitting of title and description vectorizers.
+
+
+    :param n_docs: Number of synthetic documents.
+    :param pool_process: Number of parallel processes. Default: number of available CPUs.
+    :param repeat: Number of repeated runs - the fastest is reported.
+    :return: A dict of benchmark results.
+    """
+
+    import numpy as np
+    from src.vectorizer import create_vectorizer
+
+    documents = synthetic_tokenized_documents(n_docs)
+
+    serial_time, serial_vect = time_function(create_vectorizer, documents, repeat=repeat, pool_process=0)
+    parallel_time, parallel_vect = time_function(create_vectorizer, documents, repeat=repeat,
+                                                 pool_process=pool_process)
+
+    same_vocabulary = \
+        serial_vect.title_vectorizer.vocabulary_ == parallel_vect.title_vectorizer.vocabulary_ and \
+        serial_vect.desc_vectorizer.vocabulary_ == parallel_vect.desc_vectorizer.vocabulary_
+    same_idf = same_vocabulary and \
+        np.allclose(serial_vect.title_vectorizer.idf_, parallel_vect.title_vectorizer.idf_) and \
+        np.allclose(serial_vect.desc_vectorizer.idf_, parallel_vect.desc_vectorizer.idf_)
+    if not same_idf:  # a parallel fit must not change the features - the benchmark run fails.
+        raise AssertionError('parallel vectorizers differ from serial vectorizers: same vocabulary {}'
+                             .format(same_vocabulary))
+
+    return {'benchmark': 'vectorizer_fit',
+            'n_docs': n_docs,
+            'serial_sec': serial_time,
+            'parallel_sec': parallel_time,
+            'speedup': serial_time / parallel_time,
+            'same_vocabulary': same_vocabulary,
+            'same_idf': same_idf}
+
+
+def synthetic_raw_documents(n_docs, desc_sentences=10, seed=0):
+    """
+    Generate synthetic raw Thai/English job postings for benchmarking.
+
+
+    :param n_docs: Number of documents to generate.
+    :param desc_sentences: Average number of sentences in each job description.
+    :param seed: Random seed.
+    :return: List of documents in dict format with keys: 'title' and 'desc'.
+    """
+
+    import random
+
+    rand = random.Random(seed)
+    en_titles = ['Software Engineer', 'Web Developer', 'Data Analyst', 'System Administrator',
+                 'Network Engineer', 'Sales Executive', 'Accountant', 'Marketing Officer']
+    th_titles = ['โปรแกรมเมอร์',
+                 'พนักงานขาย',
+                 'นักบัญชี']
+    en_sentences = ['Develop and maintain web applications using Java and Python.',
+                    'Bachelor degree in Computer Science or related field.',
+                    'At least 2 years experience in software development.',
+                    'Good command of English and teamwork skills.',
+                    'Contact us at jobs@example.com or www.example.com/careers.',
+                    'Analyze business requirements and design database systems.']
+    th_sentences = ['มีประสบการณ์ด้านการเขียนโปรแกรม 2 ปี',
+                    'วุฒิปริญญาตรีสาขาวิศวกรรมคอมพิวเตอร์',
+                    'สามารถทำงานเป็นทีมได้']
+
+    documents = []
+    for _ in range(n_docs):
+        thai = rand.random() < 0.5
+        title = rand.choice(th_titles if thai else en_titles)
+        sentences = [rand.choice(th_sentences) if thai and rand.random() < 0.7 else rand.choice(en_sentences)
+                     for _ in range(max(1, int(rand.expovariate(1.0 / desc_sentences))))]
+        documents.append({'title': title, 'desc': ' '.join(sentences)})
+    return documents
+
+
+def benchmark_classify_service(n_docs=2000, concurrency=32, host='127.0.0.1', port=8000, unix_path=None):
+    """
+    Generate load against a running classification service (see main_classify_service.py).
+
+
+    :param n_docs: Number of requests - each request carries one synthetic document.
+    :param concurrency: Number of concurrent client connections.
+    :param host: Host name of the service.
+    :param port: TCP port of the service.
+    :param unix_path: Path to the Unix socket of the service. If provided, host and port are ignored.
+    :return: A dict of client-side latency and throughput together with the service metrics.
+    """
+
+    import asyncio
+    from time import perf_counter
+    from src.service import request_service, percentile
+
+    documents = synthetic_raw_documents(n_docs)
+
+    async def connect():
+        if unix_path:
+            return await asyncio.open_unix_connection(unix_path)
+        return await asyncio.open_connection(host, port)
+
+    async def client(queue, latencies):
+        connection = await connect()
+        try:
+            while not queue.empty():
+                document = queue.get_nowait()
+                begin = perf_counter()
+                await request_service(connection, 'POST', '/classify', document)
+                latencies.append(perf_counter() - begin)
+        finally:
+            connection[1].close()
+
+    async def run():
+        queue = asyncio.Queue()
+        for document in documents:
+            queue.put_nowait(document)
+        latencies = []
+        begin = perf_counter()
+        await asyncio.gather(*[client(queue, latencies) for _ in range(concurrency)])
+        elapsed = perf_counter() - begin
+        connection = await connect()
+        service_metrics = await request_service(connection, 'GET', '/metrics')
+        connection[1].close()
+        return latencies, elapsed, service_metrics
+
+    loop = asyncio.new_event_loop()
+    try:
+        latencies, elapsed, service_metrics = loop.run_until_complete(run())
+    finally:
+        loop.close()
+
+    return {'benchmark': 'classify_service',
+            'n_docs': n_docs,
+            'concurrency': concurrency,
+            'latency_p50_ms': percentile(latencies, 50) * 1000,
+            'latency_p99_ms': percentile(latencies, 99) * 1000,
+            'throughput_rps': len(latencies) / elapsed,
+            'service': service_metrics}
+
+
+CORPUS_SIZES = {'small': 500, 'medium': 5000, 'large': 50000}  # number of documents in synthetic corpora.
+
+
+def measure_stage(func, items, repeat=1, memory=True):
+    """
+    Time a pipeline stage and measure its peak memory.
+
+
+    :param func: Function which runs the stage over items and returns its output.
+    :param items: Input of the stage - its length is used for throughput.
+    :param repeat: Number of repeated runs - the fastest is reported.
+    :param memory: True will run the stage once more under tracemalloc to measure peak memory.
+    :return: (dict {'sec', 'items_per_sec', 'peak_mb'}, output of the stage).
+    """
+
+    import tracemalloc
+
+    elapsed, output = time_function(func, items, repeat=repeat)
+    result = {'sec': elapsed,
+              'items': len(items),
+              'items_per_sec': len(items) / elapsed if elapsed > 0 else None,
+              'peak_mb': None}
+    if memory:  # tracemalloc slows the stage down, so memory is measured in a separate run.
+        tracemalloc.start()
+        func(items)
+        result['peak_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return result, output
+
+
+def benchmark_pipeline(size='small', stages=None, repeat=1, memory=True, output=None, seed=0):
+    """
+    Benchmark each stage of the pipeline separately and end to end on a synthetic corpus.
+    Stages: cleaner, tokenize, n_grams_compile, fit_tfidf_vectorizer, predict_documents,
+    fuzzy_match and end_to_end. A stage whose dependency or resource is missing is recorded as skipped;
+    any other error of a stage fails the benchmark.
+
+
+    :param size: Corpus size - one of CORPUS_SIZES or a number of documents.
+    :param stages: A list of stages to be run. Default: all stages.
+    :param repeat: Number of repeated runs - the fastest is reported.
+    :param memory: True will measure peak memory of each stage.
+    :param output: Path to a json file into which results are written.
+    :param seed: Random seed of the synthetic corpus.
+    :return: A dict of benchmark results.
+    """
+
+    import json
+    import platform
+    import re
+    import traceback
+    from datetime import datetime
+
+    n_docs = CORPUS_SIZES[size] if size in CORPUS_SIZES else int(size)
+    raw_docs = synthetic_raw_documents(n_docs, seed=seed)
+    tokenized_docs = synthetic_tokenized_documents(n_docs, seed=seed)
+    shared = {}  # outputs of stages reused by later stages.
+
+    def run_cleaner(docs):
+        from src.tokenizer import cleaner_generator
+        cleaner = cleaner_generator('./Resource/misc/charset')
+        return [cleaner(doc['desc']) for doc in docs]
+
+    def run_tokenize(docs):
+        from src.tokenizer import generate_tokenizer
+        tokenizer = generate_tokenizer(ngram=4)
+        return [tokenizer(doc['desc']) for doc in docs]
+
+    def run_n_grams_compile(docs):
+        from src.tokenizer import n_grams_compile
+        th_pattern = re.compile(u'[\u0e00-\u0e7f]')
+        return [n_grams_compile(doc['desc_seg'], 4, th_pattern) for doc in docs]
+
+    def run_fit_tfidf_vectorizer(docs):
+        from src.vectorizer import create_vectorizer
+        shared['vectorizer'] = create_vectorizer(docs, title_min_df=1, desc_min_df=1)
+        return shared['vectorizer']
+
+    def run_predict_documents(docs):
+        return shared['classifier'].predict_documents(docs)
+
+    def run_fuzzy_match(words):
+        from src.fuzzy_match import FuzzyMatch
+        matcher = FuzzyMatch()
+        matcher.set_keyword(shared['keywords'])
+        return [matcher.fuzzy_match(word) for word in words]
+
+    def run_end_to_end(docs):
+        from src.tokenizer import tokenize_document
+        docs = [tokenize_document(doc) for doc in docs]
+        return shared['classifier'].predict_documents(docs)
+
+    def build_classifier():
+        # a bank of classifiers trained on random labels - prediction cost does not depend on accuracy.
+        import random
+        from sklearn.naive_bayes import MultinomialNB
+        from src.classifier import Classifier
+        if 'vectorizer' not in shared:
+            run_fit_tfidf_vectorizer(tokenized_docs)
+        classifier = Classifier(shared['vectorizer'])
+        data_vec = classifier._extract_features(tokenized_docs)
+        rand = random.Random(seed)
+        for class_index in range(5):
+            labels = ['class' + str(class_index) if rand.random() < 0.3 else '!class' + str(class_index)
+                      for _ in tokenized_docs]
+            classifier.append(MultinomialNB().fit(data_vec, labels))
+        shared['classifier'] = classifier
+
+    def build_keywords():
+        with open('./Resource/misc/IT_occupations.json', 'rt', encoding='utf-8') as f_in:
+            occupations = json.load(f_in)
+        shared['keywords'] = [occupation['occupation_name'].lower() for occupation in occupations]
+
+    all_stages = [('cleaner', run_cleaner, lambda: raw_docs, None),
+                  ('tokenize', run_tokenize, lambda: raw_docs, None),
+                  ('n_grams_compile', run_n_grams_compile, lambda: tokenized_docs, None),
+                  ('fit_tfidf_vectorizer', run_fit_tfidf_vectorizer, lambda: tokenized_docs, None),
+                  ('predict_documents', run_predict_documents, lambda: tokenized_docs, build_classifier),
+                  ('fuzzy_match', run_fuzzy_match,
+                   lambda: [word.lower() for doc in raw_docs[:200] for word in doc['title'].split()],
+                   build_keywords),
+                  ('end_to_end', run_end_to_end, lambda: raw_docs, build_classifier)]
+
+    results = {'benchmark': 'pipeline',
+               'size': size,
+               'n_docs': n_docs,
+               'date': datetime.now().isoformat(),
+               'python': platform.python_version(),
+               'stages': {}}
+    for name, func, get_items, prepare in all_stages:
+        if stages and name not in stages:
+            continue
+        print('Benchmarking ' + name)
+        try:
+            if prepare:
+                prepare()
+            results['stages'][name], _ = measure_stage(func, get_items(), repeat=repeat, memory=memory)
+        except (ImportError, LookupError, OSError):  # a missing module, NLTK corpus or resource file.
+            results['stages'][name] = {'skipped': traceback.format_exc(limit=1).strip()}
+            print('Skipped ' + name + ': ' + results['stages'][name]['skipped'].splitlines()[-1])
+
+    if output:
+        with open(output, 'wt', encoding='utf-8') as f_out:
+            json.dump(results, f_out, indent=4)
+    return results
+
+
+def compare_benchmarks(baseline, current, tolerance=0.1):
+    """
+    Compare two pipeline benchmark results saved by benchmark_pipeline().
+
+
+    :param baseline: Path to the json file of the baseline run.
+    :param current: Path to the json file of the current run.
+    :param tolerance: Relative slowdown or memory growth above which a stage is flagged as a regression.
+    :return: A dict {stage: {'time_ratio', 'memory_ratio', 'regression'}}.
+    """
+
+    import json
+
+    with open(baseline, 'rt', encoding='utf-8') as f_in:
+        baseline = json.load(f_in)
+    with open(current, 'rt', encoding='utf-8') as f_in:
+        current = json.load(f_in)
+
+    comparison = {}
+    for stage, base in baseline['stages'].items():
+        curr = current['stages'].get(stage)
+        if not curr or {'error', 'skipped'} & (set(base) | set(curr)):
+            continue
+        time_ratio = curr['sec'] / base['sec'] if base['sec'] else None
+        memory_ratio = curr['peak_mb'] / base['peak_mb'] if base.get('peak_mb') and curr.get('peak_mb') else None
+        comparison[stage] = {'time_ratio': time_ratio,
+                             'memory_ratio': memory_ratio,
+                             'regression': bool((time_ratio and time_ratio > 1 + tolerance) or
+                                                (memory_ratio and memory_ratio > 1 + tolerance))}
+    return comparison
+
+
+def benchmark_import_time(repeat=3):
+    """
+    Measure cold start of entry points in fresh interpreters against their budgets (see src/preload.py).
+
+
+    :param repeat: Number of repeated runs - the fastest is reported.
+    :return: A dict of benchmark results.
+    """
+
+    from src.preload import COLD_START_BUDGET, measure_cold_start
+
+    results = {'benchmark': 'import_time', 'entry_points': {}}
+    for entry_point in sorted(COLD_START_BUDGET):
+        runs = [measure_cold_start(entry_point) for _ in range(repeat)]
+        results['entry_points'][entry_point] = min(runs, key=lambda run: run['total_sec'])
+    return results
+
+
+_copied = {}  # classifiers and features copied into a pool process, set by _init_copied.
+
+
+def _init_copied(classifiers, data_vec):
+    """Store a private copy of classifiers and features in a pool process - the baseline of shared scoring."""
+    _copied.update({'classifiers': classifiers, 'data_vec': data_vec})
+
+
+def _score_copied(row_range):
+    """Score a range of rows with private copies; return (begin, probabilities, process id, memory usage)."""
+    import os
+    import numpy as np
+    from src.preload import memory_usage
+    begin, end = row_range
+    data_vec = _copied['data_vec'][begin:end]
+    proba = np.column_stack([clf.predict_proba(data_vec)[:, 1] for clf in _copied['classifiers']])
+    return begin, proba, os.getpid(), memory_usage()
+
+
+def benchmark_shared_scoring(n_docs=20000, pool_processes=(1, 2, 4), n_classes=5, seed=0):
+    """
+    Compare scoring in pool processes holding private copies of features and classifiers
+    with scoring from shared memory (see src/shared_scoring.py), as the number of processes grows.
+
+
+    :param n_docs: Number of synthetic documents.
+    :param pool_processes: Numbers of parallel processes to be benchmarked.
+    :param n_classes: Number of classifiers in the bank.
+    :param seed: Random seed.
+    :return: A dict of benchmark results - private memory is summed over pool processes.
+    """
+
+    import random
+    import numpy as np
+    from multiprocessing import Pool
+    from sklearn.naive_bayes import MultinomialNB
+    from src.classifier import Classifier
+    from src.vectorizer import create_vectorizer
+    from src.shared_scoring import predict_proba_shared
+
+    documents = synthetic_tokenized_documents(n_docs, seed=seed)
+    classifier = Classifier(create_vectorizer(documents, title_min_df=1, desc_min_df=1))
+    data_vec = classifier._extract_features(documents)
+    rand = random.Random(seed)
+    for class_index in range(n_classes):
+        labels = ['class' + str(class_index) if rand.random() < 0.3 else '!class' + str(class_index)
+                  for _ in documents]
+        classifier.append(MultinomialNB().fit(data_vec, labels))
+
+    def run_copied(pool_process):
+        rows_per_task = max(-(-n_docs // (pool_process * 4)), 1)
+        proba = np.empty((n_docs, n_classes))
+        memory = {}
+        with Pool(processes=pool_process, initializer=_init_copied,
+                  initargs=(classifier.classifiers, data_vec)) as pool:
+            for begin, chunk, pid, usage in pool.imap_unordered(
+                    _score_copied, [(begin, min(begin + rows_per_task, n_docs))
+                                    for begin in range(0, n_docs, rows_per_task)]):
+                proba[begin:begin + len(chunk)] = chunk
+                memory[pid] = usage
+        return proba, memory
+
+    def run_shared(pool_process):
+        memory = {}
+        _, proba = predict_proba_shared(classifier, data_vec=data_vec, pool_process=pool_process, memory=memory)
+        return proba, memory
+
+    results = {'benchmark': 'shared_scoring', 'n_docs': n_docs, 'n_classes': n_classes,
+               'data_mb': (data_vec.data.nbytes + data_vec.indices.nbytes + data_vec.indptr.nbytes) / 2 ** 20,
+               'runs': []}
+    for pool_process in pool_processes:
+        outputs = {}
+        for mode, run in (('copied', run_copied), ('shared', run_shared)):
+            elapsed, (proba, memory) = time_function(run, pool_process)
+            outputs[mode] = proba
+            results['runs'].append({'mode': mode, 'pool_process': pool_process, 'sec': elapsed,
+                                    'private_mb': sum(usage['private_mb'] or 0 for usage in memory.values())})
+        results['runs'][-1]['max_abs_diff'] = float(np.abs(outputs['copied'] - outputs['shared']).max())
+    return results
+
+
+def benchmark_pipelined_io(n_docs=20000, chunk_size=1000, compression='gzip', depth=2, seed=0):
+    """
+    Compare reading, processing and writing a corpus one step after the other with pipelined I/O
+    (see src/pipeline_io.py), where reading the next chunk and writing the previous one overlap with processing.
+    Processing is character counting and n-gram compilation, which needs no external resources.
+
+
+    :param n_docs: Number of synthetic documents.
+    :param chunk_size: Number of documents in a chunk.
+    :param compression: Compression of input and output files - None, 'gzip', 'bz2', 'xz' or 'zstd'.
+    :param depth: Number of chunks read ahead and waiting to be written.
+    :param seed: Random seed of the synthetic corpus.
+    :return: A dict of benchmark results.
+    """
+
+    import os
+    import re
+    import json
+    import tempfile
+    from src.pipeline_io import iter_json_records, open_input, JsonArrayWriter, run_pipeline
+    from src.tokenizer import n_grams_compile
+    from src.utils import count_en_th
+
+    extension = {None: '', 'gzip': '.gz', 'bz2': '.bz2', 'xz': '.xz', 'zstd': '.zst'}[compression]
+    th_pattern = re.compile(u'[\u0e00-\u0e7f]')
+
+    def process(docs):
+        return [{'title': doc['title'], 'counts': count_en_th(doc['desc']),
+                 'n_grams': len(n_grams_compile(doc['desc'].replace(' ', '|'), 3, th_pattern))} for doc in docs]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        in_filename = os.path.join(tmp_dir, 'corpus.json' + extension)
+        with JsonArrayWriter(in_filename) as writer:
+            for doc in synthetic_raw_documents(n_docs, seed=seed):
+                writer.write(doc)
+        in_mb = os.path.getsize(in_filename) / 2 ** 20
+
+        def run_serial():
+            with open_input(in_filename) as f_in:
+                results = process(json.load(f_in))
+            with JsonArrayWriter(os.path.join(tmp_dir, 'serial.json' + extension)) as writer:
+                for result in results:
+                    writer.write(result)
+
+        def run_pipelined():
+            with JsonArrayWriter(os.path.join(tmp_dir, 'pipelined.json' + extension)) as writer:
+                return run_pipeline(iter_json_records(in_filename), process,
+                                    lambda results: [writer.write(result) for result in results],
+                                    chunk_size=chunk_size, depth=depth)
+
+        serial_sec, _ = time_function(run_serial)
+        pipelined_sec, report = time_function(run_pipelined)
+
+    return {'benchmark': 'pipelined_io', 'n_docs': n_docs, 'compression': compression, 'input_mb': in_mb,
+            'serial_sec': serial_sec, 'pipelined_sec': pipelined_sec,
+            'serial_docs_per_sec': n_docs / serial_sec, 'pipelined_docs_per_sec': n_docs / pipelined_sec,
+            'pipelined_mb_per_sec': in_mb / pipelined_sec, 'pipeline': report}
+
+
+def benchmark_similarity_index(n_docs=20000, n_queries=200, k=10, n_tables=16, n_bits=16, max_candidates=1000,
+                               noise=0.3, seed=0):
+    """
+    Compare top-k similar posting queries of the approximate index (see src/similarity_index.py) with exact
+    brute force search. Queries are copies of indexed documents with a fraction of their tokens replaced,
+    so that each query has a known near-duplicate.
+
+
+    :param n_docs: Number of synthetic documents indexed.
+    :param n_queries: Number of queries.
+    :param k: Number of similar postings per query.
+    :param n_tables: Number of hash tables of the index.
+    :param n_bits: Number of bits of a key of the index.
+    :param max_candidates: Maximum number of candidates per query.
+    :param noise: Fraction of the tokens of a query replaced by random tokens.
+    :param seed: Random seed.
+    :return: A dict of benchmark results - recall is the fraction of exact top-k found by the index.
+    """
+
+    import os
+    import random
+    import tempfile
+    import numpy as np
+    from src.vectorizer import create_vectorizer
+    from src.similarity_index import posting_vectors, SimilarityIndex
+
+    documents = synthetic_tokenized_documents(n_docs, seed=seed)
+    vectorizer = create_vectorizer(documents, title_min_df=1, desc_min_df=1)
+    vectors = posting_vectors(vectorizer, documents)
+
+    rand = random.Random(seed)
+    sources = rand.sample(range(n_docs), min(n_queries, n_docs))
+    vocabulary = ['tok' + str(index) for index in range(20000)]
+
+    def perturb(text):
+        return '|'.join(rand.choice(vocabulary) if rand.random() < noise else token for token in text.split('|'))
+    queries = posting_vectors(vectorizer, [{'title_seg': perturb(documents[source]['title_seg']),
+                                            'desc_seg': perturb(documents[source]['desc_seg'])}
+                                           for source in sources])
+
+    def run_exact():
+        scores = (queries @ vectors.T).toarray()
+        return np.argsort(-scores, axis=1, kind='stable')[:, :k]
+
+    build_sec, index = time_function(SimilarityIndex.build, vectors, n_tables=n_tables, n_bits=n_bits, seed=seed)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index.save(tmp_dir)
+        load_sec, index = time_function(SimilarityIndex.load, tmp_dir)
+        query_sec, (rows, _) = time_function(index.query, queries, k=k, max_candidates=max_candidates)
+        exact_sec, exact_rows = time_function(run_exact)
+        index_mb = sum(os.path.getsize(os.path.join(tmp_dir, name)) for name in os.listdir(tmp_dir)) / 2 ** 20
+
+    recall = np.mean([len(set(rows[query]) & set(exact_rows[query])) / k for query in range(len(sources))])
+    source_found = np.mean([source in rows[query] for query, source in enumerate(sources)])
+    return {'benchmark': 'similarity_index', 'n_docs': n_docs, 'n_queries': len(sources), 'k': k,
+            'n_tables': n_tables, 'n_bits': n_bits, 'index_mb': index_mb, 'build_sec': build_sec,
+            'load_sec': load_sec, 'index_ms_per_query': query_sec * 1000 / len(sources),
+            'exact_ms_per_query': exact_sec * 1000 / len(sources),
+            'recall_at_k': float(recall), 'near_duplicate_found': float(source_found)}
+
+
+def benchmark_reduction(n_docs=20000, n_classes=5, methods=('chi2', 'random_projection'), n_components=2000,
+                        signal=0.05, seed=0):
+    """
+    Compare classifier banks trained on the full TF-IDF features with banks trained on reduced features
+    (see src/reduction.py): time to fit the reduction and the bank, size, load time, prediction latency,
+    memory of the feature matrix and accuracy. Each synthetic document belongs to one class whose own tokens
+    replace a fraction of its description tokens. Banks are logistic regressions, which accept the negative
+    features of random projection.
+
+
+    :param n_docs: Number of synthetic documents - 70% for training, 30% for testing.
+    :param n_classes: Number of classes.
+    :param methods: Reduction methods to be benchmarked.
+    :param n_components: Number of features after reduction.
+    :param signal: Fraction of the description tokens of a document replaced by tokens of its class.
+    :param seed: Random seed.
+    :return: A dict of benchmark results - see compare_classifiers() for the reports of each method.
+    """
+
+    import random
+    from copy import copy
+    import numpy as np
+    from sklearn.linear_model import LogisticRegression
+    from src.classifier import Classifier
+    from src.compaction import compare_classifiers
+    from src.reduction import fit_reducer
+    from src.vectorizer import create_vectorizer
+
+    rand = random.Random(seed)
+    documents = synthetic_tokenized_documents(n_docs, seed=seed)
+    for doc in documents:
+        class_index = rand.randrange(n_classes)
+        doc['label'] = 'class' + str(class_index)
+        doc['desc_seg'] = '|'.join('cls{}_tok{}'.format(class_index, rand.randrange(200))
+                                   if rand.random() < signal else token for token in doc['desc_seg'].split('|'))
+    n_train = int(n_docs * 0.7)
+    train, test = documents[:n_train], documents[n_train:]
+    test_labels = [doc['label'] for doc in test]
+    vectorizer = create_vectorizer(train, title_min_df=1, desc_min_df=1)
+
+    def train_bank(bank_vectorizer):
+        classifier = Classifier(bank_vectorizer)
+        data_vec = classifier._extract_features(train)
+        for class_index in range(n_classes):
+            class_ = 'class' + str(class_index)
+            labels = np.where([doc['label'] == class_ for doc in train], class_, '!' + class_)
+            classifier.append(LogisticRegression(solver='liblinear').fit(data_vec, labels))
+        return classifier, (data_vec.data.nbytes + data_vec.indices.nbytes + data_vec.indptr.nbytes) / 2 ** 20
+
+    train_sec, (original, original_mb) = time_function(train_bank, vectorizer)
+    results = {'benchmark': 'reduction', 'n_docs': n_docs, 'n_classes': n_classes, 'n_components': n_components,
+               'train_sec': train_sec, 'features_mb': original_mb, 'methods': {}}
+    original_features = original._extract_features(train)
+    for method in methods:
+        reduced_vectorizer = copy(vectorizer)  # shares the fitted title and description vectorizers.
+        fit_sec, reduced_vectorizer.reducer = time_function(fit_reducer, original_features, method, n_components,
+                                                            labels=[doc['label'] for doc in train], seed=seed)
+        train_sec, (reduced, reduced_mb) = time_function(train_bank, reduced_vectorizer)
+        report = compare_classifiers(original, reduced, test, labels=test_labels)
+        report['compact'].update({'fit_reducer_sec': fit_sec, 'train_sec': train_sec, 'features_mb': reduced_mb})
+        results['methods'][method] = report
+    return results
@@ -24,16 +24,28 @@ class Classifier:
 
         :param documents: Documents in json format with keys: 'title_seg' and 'desc_seg'.
         :param thres: probability threshold over which the document will be assigned a class.
-        :return: JSON documents - each of which contain addition key 'predicted'
-                    of which value is a dict with {'class': float<prob>} pair.
+        :return: JSON documents - each of which contain additional keys 'predicted', the predicted class
+                    ('None' if no probability is over thres), and 'proba', a dict with {'class': float<prob>} pair
+                    - as predict_document.
         """
 
         documents = self.copy(documents)
         if not type(documents) in (list, tuple):
             documents = [documents]
-
-        for document in documents:
-            document.update(self.predict_document(document, thres))
+        if not documents:
+            return documents
+
+        # extract features and call each classifier once for the whole batch.
+        classes, proba = self.predict_proba_documents(documents)
+        for document, doc_proba in zip(documents, proba):
+            doc_class = {'None': thres}  # default class whose probability equals thres.
+            doc_class.update((class_, float(prob)) for class_, prob in zip(classes, doc_proba))
+            predicted = 'None'
+            for key in list(doc_class):
+                if doc_class[key] > doc_class[predicted]:
+                    predicted = key
+            document['predicted'] = predicted
+            document['proba'] = doc_class
 
         return documents
 
@@ -50,7 +62,7 @@ class Classifier:
         document = self.copy(document)
 
         # extract features into numpy array.
-        data_vec = self._extract_features(document)
+        data_vec = self._extract_features([document])
 
         doc_class = {'None': thres}  # set default class to 'None'
         # for each classifier, classify the document.
@@ -59,7 +71,7 @@ class Classifier:
             # only store positive class from the result from .predict_proba method.
             # since the name of positive class must begins with [A-Za-z], the location of class
             # in .predict_proba method return will be at location 1.
-            doc_class[clf.classess_[1]] = clf.predict_proba(data_vec)[0, 1]
+            doc_class[clf.classes_[1]] = clf.predict_proba(data_vec)[0, 1]
 
         # Find the class with max predicted probability - including the default class
         # whose probability equals thres.
@@ -70,39 +82,99 @@ class Classifier:
 
         return predicted, doc_class
 
+    def predict_proba_documents(self, documents):
+        """
+        Predict the positive class probability of every classifier for a batch of documents.
+        Features are extracted once and each classifier is called once for the whole batch.
+
+
+        :param documents: A list of documents in dict format with keys 'title_seg' and 'desc_seg'.
+        :return: (list of class names, numpy array of shape (number of documents, number of classifiers)).
+        """
+
+        import numpy as np
+
+        data_vec = self._extract_features(documents)
+
+        classes = [clf.classes_[1] for clf in self.classifiers]
+        proba = np.empty((data_vec.shape[0], len(self.classifiers)))
+        for index, clf in enumerate(self.classifiers):
+            proba[:, index] = clf.predict_proba(data_vec)[:, 1]  # positive class is at location 1.
+
+        return classes, proba
+
+    def predict_top_k(self, documents, k=3, thres=0.5, class_thres=None):
+        """
+        Predict the top-k classes of each of a batch of documents whose probability is over a threshold.
+        Class names are not repeated in the result: label ids index into the returned list of class names.
+
+
+        :param documents: A list of documents in dict format with keys 'title_seg' and 'desc_seg'.
+        :param k: Maximum number of classes returned for a document.
+        :param thres: probability threshold over which the document will be assigned a class.
+        :param class_thres: A dict {class: threshold} overriding thres for some classes.
+        :return: (list of class names,
+                    numpy int32 array of label ids of shape (number of documents, k) - -1 where no class is assigned,
+                    numpy float32 array of probabilities of the same shape - 0 where no class is assigned),
+                    classes of each document are ordered by decreasing probability.
+        """
+
+        import numpy as np
+
+        classes, proba = self.predict_proba_documents(documents)
+        n_docs, n_classes = proba.shape
+        k = min(k, n_classes)
+
+        # apply per-class thresholds at once - classes at or below threshold are never selected.
+        thresholds = np.full(n_classes, thres, dtype=np.float64)
+        for index, class_ in enumerate(classes):
+            if class_thres and class_ in class_thres:
+                thresholds[index] = class_thres[class_]
+        proba = np.where(proba > thresholds, proba, -np.inf)
+
+        # partial selection of the k highest probabilities, then sort only those k.
+        if k < n_classes:
+            top = np.argpartition(-proba, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(n_classes), (n_docs, 1))
+        top_proba = np.take_along_axis(proba, top, axis=1)
+        order = np.argsort(-top_proba, axis=1, kind='mergesort')
+        top = np.take_along_axis(top, order, axis=1)
+        top_proba = np.take_along_axis(top_proba, order, axis=1)
+
+        assigned = np.isfinite(top_proba)
+        label_ids = np.where(assigned, top, -1).astype(np.int32)
+        scores = np.where(assigned, top_proba, 0).astype(np.float32)
+        return classes, label_ids, scores
+
     def _extract_features(self, documents):
         """
-        Extract features from documents using specified vectorizer into numpy array.
+        Extract features from documents using specified vectorizer into numpy array,
+        reduced by the reducer of the vectorizer if any (see src/reduction.py).
 
 
-        :param documents: The documents in dict format with keys 'title_seg' and 'desc_seg'.
-        :return: numpy array
+        :param documents: A list of documents in dict format with keys 'title_seg' and 'desc_seg'.
+        :return: scipy.sparse.csr_matrix
         """
 
         from scipy.sparse import hstack
 
-        documents = self.copy(documents)
-
         title_data = [doc['title_seg'] for doc in documents]  # create a list of title data from documents.
         desc_data = [doc['desc_seg'] for doc in documents]  # create a list of desc data from documents.
 
         # transform-vectorize
-        title_vec = self.vectorizer.vectorize_title.transform(title_data)
-        desc_vec = self.vectorizer.vectorize_desc.transform(desc_data)
+        title_vec = self.vectorizer.title_vectorizer.transform(title_data)
+        desc_vec = self.vectorizer.desc_vectorizer.transform(desc_data)
         # stack title onto desc
-        data_vec = hstack([title_vec, desc_vec])
+        data_vec = hstack([title_vec, desc_vec], format='csr')
+        # reduce features of the batch - vectorizers saved before reduction existed have no reducer.
+        reducer = getattr(self.vectorizer, 'reducer', None)
+        if reducer is not None:
+            data_vec = reducer.transform(data_vec).tocsr()
 
         return data_vec
 
-    @staticmethod
-    def _sample(dataset, size):
-        """Return a random sample of size=size from a list dataset."""
-
-        import random
-
-        return [dataset[i] for i in sorted(random.sample(len(dataset), size))]
-
-    def train_classifier(self, documents, pos_label, classifier):
+    def train_classifier(self, documents, pos_label, classifier, seed=None):
         """
         Train the classifier.
 
@@ -112,50 +184,39 @@ class Classifier:
         :param pos_label: Positive label on which classifier is to be trained.
         :param classifier: A classifier object with method fit, predict and predict_proba.
                             If not specified MultinomialNB from scikit-learn will be used.
+        :param seed: Seed of the random number generator used for class balancing.
         :return: Trained classifier object.
         """
 
+        import numpy as np
         from sklearn.model_selection import train_test_split
         from sklearn.metrics import classification_report
+        from src.utils import balance_indices
 
-        documents = self.copy(documents)
         if not classifier:
             from sklearn.naive_bayes import MultinomialNB
             classifier = MultinomialNB()
 
-        # ========== separate classes of documents ==========
-        pos_doc = []
-        neg_doc = []
-        for doc in documents:
-            if doc['label'] == pos_doc:
-                pos_doc.append(doc)
-            else:
-                neg_doc.append(doc)
-        # ====================================================
-
         # =========== balancing between two classes ==========
-        if len(pos_doc) > len(neg_doc):
-            pos_doc = self._sample(pos_doc, len(neg_doc))
-        elif len(pos_doc) < len(neg_doc):
-            neg_doc = self._sample(neg_doc, len(pos_doc))
+        # select rows rather than copying documents - positive class against the rest.
+        is_positive = np.array([doc['label'] == pos_label for doc in documents])
+        indices = balance_indices(is_positive, target=True, seed=seed)
+        documents = [documents[index] for index in indices]
         # ====================================================
 
-        # rename all negative labels.
-        for index, _ in enumerate(neg_doc):
-            neg_doc[index]['label'] = '!' + pos_label
-        documents = pos_doc + neg_doc  # rejoin two classes.
-
         data_vec = self._extract_features(documents)  # extract feature from the documents.
-        label_vec = [doc['label'] for doc in documents]  # create a table of document labels/classes.
+        # create a table of document labels/classes - all negative labels are renamed.
+        label_vec = np.where(is_positive[indices], pos_label, '!' + pos_label)
 
         # === fit and show accuracy using train-test split. ===
         # split sample into train_set and test_set.
-        desc_train, desc_test, label_train, label_test = train_test_split(data_vec, label_vec, test_size=0.3)
+        desc_train, desc_test, label_train, label_test = train_test_split(data_vec, label_vec, test_size=0.3,
+                                                                          random_state=seed)
         model_split = classifier
         model_split.fit(desc_train, label_train)  # fit using training split.
         label_predict = model_split.predict(desc_test)  # predict the label of test set.
         print('============== Classification accuracy report for the Test Set. ==============')
-        print(classification_report(label_vec, label_predict))  # print accuracy report for the test set.
+        print(classification_report(label_test, label_predict))  # print accuracy report for the test set.
         print('==============================================================================')
 
         # fit the model using the whole labeled data.
@@ -191,7 +252,7 @@ class Classifier:
             return None
 
         for index, clf in enumerate(self.classifiers):
-            if clf.classess_[1] == classifier_name:
+            if clf.classes_[1] == classifier_name:
                 self.classifiers.pop(index)
         self.classes_.remove(classifier_name)
 
@@ -210,7 +271,7 @@ class Classifier:
         if filename.find('.') == -1:
             filename += '.clfs'
         filename = filepath + filename
-        with open(filename, 'rb') as f_out:
+        with open(filename, 'wb') as f_out:
             dill.dump(self, f_out)
 
     @staticmethod
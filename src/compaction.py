@@ -0,0 +1,163 @@
+def feature_contribution(classifier):
+    """
+    Estimate how much each feature can move the decision of a binary classifier.
+    For naive Bayes it is the absolute log-likelihood ratio of the feature between the two classes;
+    for linear models it is the absolute coefficient.
+
+
+    :param classifier: A fitted binary classifier - MultinomialNB-like (feature_log_prob_) or linear (coef_).
+    :return: numpy array of contributions, one for each feature, or None if it cannot be estimated.
+    """
+
+    import numpy as np
+
+    if hasattr(classifier, 'feature_log_prob_'):
+        return np.abs(classifier.feature_log_prob_[1] - classifier.feature_log_prob_[0])
+    if hasattr(classifier, 'coef_'):
+        return np.abs(np.asarray(classifier.coef_)).max(axis=0)
+    return None
+
+
+def select_features(classifiers, n_features, threshold):
+    """
+    Select features whose contribution is at least threshold in at least one classifier of a bank.
+
+
+    :param classifiers: A list of fitted binary classifiers.
+    :param n_features: Number of features of the classifiers.
+    :param threshold: Minimum contribution of a feature to be kept.
+    :return: numpy boolean mask of kept features.
+    """
+
+    import numpy as np
+
+    keep = np.zeros(n_features, dtype=bool)
+    for clf in classifiers:
+        contribution = feature_contribution(clf)
+        if contribution is None:  # unknown classifier - every feature may matter.
+            return np.ones(n_features, dtype=bool)
+        keep |= contribution >= threshold
+    return keep
+
+
+def _compact_tfidf_vectorizer(tfidf_vectorize, keep):
+    """Return a copy of a fitted TfidfVectorizer keeping only features in the boolean mask keep."""
+
+    from copy import deepcopy
+    import numpy as np
+    from src.vectorizer import set_vocabulary
+
+    new_index = np.cumsum(keep) - 1  # new feature index of each kept feature.
+    vocabulary = {term: int(new_index[index]) for term, index in tfidf_vectorize.vocabulary_.items()
+                  if keep[index]}
+    compact = deepcopy(tfidf_vectorize)
+    if hasattr(compact, 'stop_words_'):
+        compact.stop_words_ = set()  # terms pruned at fitting time are not needed for transform.
+    set_vocabulary(compact, vocabulary, np.asarray(tfidf_vectorize.idf_)[keep])
+    return compact
+
+
+def _compact_estimator(classifier, keep):
+    """Return a copy of a fitted classifier keeping only weights of features in the boolean mask keep."""
+
+    from copy import deepcopy
+
+    compact = deepcopy(classifier)
+    for attribute in ('feature_count_', 'feature_log_prob_', 'coef_'):
+        if attribute in compact.__dict__:  # properties, e.g. coef_ of naive Bayes, follow the other attributes.
+            setattr(compact, attribute, getattr(compact, attribute)[:, keep])
+    for attribute in ('n_features_', 'n_features_in_'):
+        if attribute in compact.__dict__:
+            setattr(compact, attribute, int(keep.sum()))
+    return compact
+
+
+def compact_classifier(classifier, threshold=0.1):
+    """
+    Prune features which contribute little to every classifier of a Classifier object.
+    Returns a new Classifier object whose title and description vectorizers only know the kept terms
+    and whose classifiers only hold weights of the kept features.
+    Note: TF-IDF vectors are l2-normalized over the kept terms, so probabilities change slightly -
+    see compare_classifiers() for the effect on predictions.
+
+
+    :param classifier: Classifier object.
+    :param threshold: Minimum contribution of a feature (see feature_contribution) to be kept.
+    :return: (compact Classifier object, a dict with feature counts before and after).
+    """
+
+    from src.classifier import Classifier
+    from src.vectorizer import VectorizerTFIDF
+
+    vectorizer = classifier.vectorizer
+    if getattr(vectorizer, 'reducer', None) is not None:
+        raise ValueError('features of a vectorizer with a reducer cannot be compacted')
+    n_title = len(vectorizer.title_vectorizer.vocabulary_)
+    n_desc = len(vectorizer.desc_vectorizer.vocabulary_)
+    # features are title features followed by description features - see Classifier._extract_features.
+    keep = select_features(classifier.classifiers, n_title + n_desc, threshold)
+
+    compact_vectorizer = VectorizerTFIDF(_compact_tfidf_vectorizer(vectorizer.title_vectorizer, keep[:n_title]),
+                                         _compact_tfidf_vectorizer(vectorizer.desc_vectorizer, keep[n_title:]),
+                                         vectorizer.date_created)
+    compact = Classifier(compact_vectorizer)
+    for clf in classifier.classifiers:
+        compact.append(_compact_estimator(clf, keep))
+
+    features = {'title_before': n_title, 'title_after': int(keep[:n_title].sum()),
+                'desc_before': n_desc, 'desc_after': int(keep[n_title:].sum())}
+    return compact, features
+
+
+def n_features(classifier):
+    """Return the number of features seen by the classifiers of a Classifier object."""
+    reducer = getattr(classifier.vectorizer, 'reducer', None)
+    if reducer is not None:
+        return reducer.n_components_
+    return sum(len(vect.vocabulary_) for vect in (classifier.vectorizer.title_vectorizer,
+                                                  classifier.vectorizer.desc_vectorizer))
+
+
+def compare_classifiers(original, compact, documents, labels=None, thres=0.5):
+    """
+    Compare size, load time, prediction latency and predictions of two Classifier objects.
+
+
+    :param original: Classifier object.
+    :param compact: Classifier object, e.g. from compact_classifier().
+    :param documents: A list of documents in dict format with keys 'title_seg' and 'desc_seg'.
+    :param labels: A list of true classes of the documents ('None' if no class). If provided, accuracy is reported.
+    :param thres: probability threshold over which the document will be assigned a class.
+    :return: A dict {'original': {...}, 'compact': {...}, 'agreement': fraction of equal predicted classes}.
+    """
+
+    import dill
+    import numpy as np
+    from time import perf_counter
+
+    report = {}
+    predictions = {}
+    for name, clf in (('original', original), ('compact', compact)):
+        pickled = dill.dumps(clf)
+        begin = perf_counter()
+        dill.loads(pickled)
+        load_sec = perf_counter() - begin
+
+        begin = perf_counter()
+        classes, proba = clf.predict_proba_documents(documents)
+        latency_sec = perf_counter() - begin
+
+        # predicted class - 'None' unless a probability is over thres, as in Classifier.predict_document.
+        best = proba.argmax(axis=1)
+        predicted = np.where(proba[np.arange(len(documents)), best] > thres,
+                             np.array(classes, dtype=object)[best], 'None')
+        predictions[name] = predicted
+        report[name] = {'size_mb': len(pickled) / 2 ** 20,
+                        'load_sec': load_sec,
+                        'predict_ms_per_doc': latency_sec / len(documents) * 1000,
+                        'n_features': n_features(clf)}
+        if labels is not None:
+            report[name]['accuracy'] = float(np.mean(predicted == np.array(labels, dtype=object)))
+
+    report['agreement'] = float(np.mean(predictions['original'] == predictions['compact']))
+    return report
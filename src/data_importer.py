@@ -1,14 +1,10 @@
 
 def import_raw_data(filename):
 
-    import json
+    from src.pipeline_io import iter_json_records
 
-    with open(filename, 'rt', encoding='utf-8') as fin:
-        dataset = fin.read()
-
-    dataset = dataset.replace('}\n{', '},\n{')
-    dataset = '[\n' + dataset[:-1] + '\n]'
-    return json.loads(dataset)
+    # objects are streamed one at a time - the file may be compressed.
+    return list(iter_json_records(filename))
 
 
 def restructure_data(json_dataset, date_pat='./Resource/date_pattern.pck'):
@@ -92,7 +88,7 @@ def restructure_data(json_dataset, date_pat='./Resource/date_pattern.pck'):
 
     date_pat = pickle.load(open(date_pat, 'rb'))
 
-    #date_pat = [re.compile(r'(20[0-9]{2})(\s|\-|\/)([0-9]{2})(\s|\-|\/)([0-9]{2})'),
+    # date_pat = [re.compile(r'(20[0-9]{2})(\s|\-|\/)([0-9]{2})(\s|\-|\/)([0-9]{2})'),
     #            re.compile(r'([0-9]{2})(\s|\-|\/)([0-1]{1}[0-9]{1})(\s|\-|\/)(25[0-9]{2})'),
     #            re.compile(r'([0-9]{2})(\s|\-|\/)([0-1]{1}[0-9]{1})(\s|\-|\/)(20[0-9]{2})'),
     #            re.compile(r'([0-9]{1,2})(\s|\-|\/)([\u0e00-\u0e7f]{1,})(\s|\-|\/)([5-9]{1}[0-9]{1})'),
@@ -0,0 +1,174 @@
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def _normalize_text(document):
+    """Return 'title' and 'desc' of a document lower-cased with white space collapsed."""
+    return ' '.join((document['title'] + ' ' + document['desc']).lower().split())
+
+
+def minhash_signature(text, coefficients, shingle_size=5):
+    """
+    Compute the MinHash signature of the set of character shingles of a text.
+
+
+    :param text: A string.
+    :param coefficients: (a, b) numpy uint64 arrays of the hash functions h(x) = (a * x + b) mod (2^61 - 1).
+    :param shingle_size: Number of characters in a shingle.
+    :return: numpy uint64 array - one minimum hash value for each hash function.
+    """
+
+    import zlib
+    import numpy as np
+
+    a, b = coefficients
+    shingles = {text[pos:pos + shingle_size] for pos in range(max(len(text) - shingle_size + 1, 1))}
+    hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+                         dtype=np.uint64, count=len(shingles))
+    return ((a[:, None] * hashes[None, :] + b[:, None]) % np.uint64(_MERSENNE_PRIME)).min(axis=1)
+
+
+def find_duplicates(documents, threshold=0.8, num_perm=64, bands=16, shingle_size=5, seed=0):
+    """
+    Find exact and near-duplicate documents.
+    Exact duplicates are found by content hash of 'title' and 'desc'; near-duplicates by MinHash over character
+    shingles with locality-sensitive hashing (bands of the signature) so that only candidate pairs are compared.
+
+
+    :param documents: List of documents, each of which are in dict format with keys: 'title' and 'desc'.
+    :param threshold: Estimated Jaccard similarity of shingles at or above which documents are duplicates.
+    :param num_perm: Number of hash functions of a MinHash signature.
+    :param bands: Number of LSH bands - num_perm must be divisible by bands.
+                    More bands find pairs of lower similarity as candidates.
+    :param shingle_size: Number of characters in a shingle.
+    :param seed: Seed of the random hash functions.
+    :return: (list of the index of the representative - first occurrence - of each document,
+                a dict with the number of exact and near duplicates).
+    """
+
+    import numpy as np
+    from src.tokenizer import content_hash
+
+    if num_perm % bands:
+        raise ValueError('num_perm must be divisible by bands')
+
+    parent = list(range(len(documents)))  # union-find forest - the root is the smallest index.
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    def union(index, other):
+        root, other_root = find(index), find(other)
+        if root != other_root:
+            parent[max(root, other_root)] = min(root, other_root)
+
+    # exact duplicates.
+    first_seen = {}
+    unique = []
+    for index, document in enumerate(documents):
+        digest = content_hash(document)
+        if digest in first_seen:
+            union(first_seen[digest], index)
+        else:
+            first_seen[digest] = index
+            unique.append(index)
+    exact = len(documents) - len(unique)
+
+    # near-duplicates among exactly unique documents.
+    rand = np.random.RandomState(seed)
+    coefficients = (rand.randint(1, 2 ** 31, size=num_perm).astype(np.uint64),
+                    rand.randint(0, 2 ** 31, size=num_perm).astype(np.uint64))
+    signatures = {index: minhash_signature(_normalize_text(documents[index]), coefficients, shingle_size)
+                  for index in unique}
+    rows = num_perm // bands
+    for band in range(bands):
+        buckets = {}
+        for index in unique:
+            key = signatures[index][band * rows:(band + 1) * rows].tobytes()
+            bucket = buckets.setdefault(key, [])
+            for member in bucket:
+                # members already joined to the document are skipped - members of other groups are each
+                # verified by the estimated Jaccard similarity of the whole signature.
+                if find(member) != find(index) and np.mean(signatures[member] == signatures[index]) >= threshold:
+                    union(member, index)
+            bucket.append(index)
+
+    representatives = [find(index) for index in range(len(documents))]
+    near = sum(1 for index in unique if representatives[index] != index)
+    return representatives, {'documents': len(documents), 'exact_duplicates': exact, 'near_duplicates': near}
+
+
+def dedup_tokenize(documents, tokenize_func=None, mode='link', **kwargs):
+    """
+    Tokenize only one document of each group of duplicates and reuse its tokenization for the others.
+    To be used between restructure_data() and tokenize_documents().
+
+
+    :param documents: List of documents, each of which are in dict format with keys: 'title' and 'desc'.
+    :param tokenize_func: Function tokenizing a list of documents. Default: tokenize_documents.
+    :param mode: 'link' returns every document - duplicates get 'title_seg' and 'desc_seg' of their representative
+                    and key 'duplicate_of' with its index; 'skip' returns representatives only.
+    :param kwargs: Keyword arguments of find_duplicates().
+    :return: (list of tokenized documents, a dict with dedup rate and estimated time saved).
+    """
+
+    from time import perf_counter
+
+    if tokenize_func is None:
+        from src.tokenizer import tokenize_documents as tokenize_func
+
+    begin = perf_counter()
+    representatives, report = find_duplicates(documents, **kwargs)
+    dedup_sec = perf_counter() - begin
+
+    unique = [index for index, representative in enumerate(representatives) if representative == index]
+    begin = perf_counter()
+    tokenized = tokenize_func([documents[index] for index in unique])
+    tokenize_sec = perf_counter() - begin
+
+    # estimate time saved from the character count of skipped documents.
+    unique_chars = sum(len(documents[index]['title']) + len(documents[index]['desc']) for index in unique)
+    skipped_chars = sum(len(document['title']) + len(document['desc']) for document in documents) - unique_chars
+    report.update({'dedup_rate': 1 - len(unique) / len(documents) if documents else 0.0,
+                   'dedup_sec': dedup_sec,
+                   'tokenize_sec': tokenize_sec,
+                   'saved_sec': tokenize_sec * skipped_chars / unique_chars if unique_chars else 0.0})
+
+    if mode == 'skip':
+        return tokenized, report
+    if mode != 'link':
+        raise ValueError("mode must be 'link' or 'skip'")
+
+    tokenized_by_index = dict(zip(unique, tokenized))
+    linked = []
+    for index, document in enumerate(documents):
+        representative = representatives[index]
+        if representative == index:
+            linked.append(tokenized_by_index[index])
+        else:
+            document = dict(document)
+            document['title_seg'] = tokenized_by_index[representative]['title_seg']
+            document['desc_seg'] = tokenized_by_index[representative]['desc_seg']
+            document['duplicate_of'] = representative
+            linked.append(document)
+    return linked, report
+
+
+def propagate_predictions(documents, fields=('predicted',)):
+    """
+    Copy prediction fields from representatives onto documents linked by dedup_tokenize(mode='link').
+
+
+    :param documents: List of documents from dedup_tokenize(mode='link') of which representatives are classified.
+    :param fields: Keys to be copied from representative onto duplicates.
+    :return: None - documents are updated in place.
+    """
+
+    for document in documents:
+        if 'duplicate_of' in document:
+            representative = documents[document['duplicate_of']]
+            for field in fields:
+                if field in representative:
+                    document[field] = representative[field]
@@ -0,0 +1,178 @@
+def label_matrix(labels, classes):
+    """
+    One-hot encode document labels.
+
+
+    :param labels: A list of the class of each document.
+    :param classes: A list of class names.
+    :return: numpy boolean array of shape (number of documents, number of classes).
+    """
+
+    import numpy as np
+
+    return np.asarray(labels, dtype=object)[:, None] == np.asarray(classes, dtype=object)[None, :]
+
+
+def precision_recall_curves(proba, truth):
+    """
+    Compute precision and recall at every cutoff of every class at once from sorted scores.
+
+
+    :param proba: numpy array of positive class probabilities of shape (number of documents, number of classes).
+    :param truth: numpy boolean array of the same shape - True where the document belongs to the class.
+    :return: (scores sorted in decreasing order, precision, recall, valid) - arrays of the same shape as proba,
+                where row i of a class holds precision and recall when the i + 1 highest scored documents are
+                predicted positive; valid is False where the next document has the same score,
+                since no cutoff separates them.
+    """
+
+    import numpy as np
+
+    order = np.argsort(-proba, axis=0, kind='mergesort')
+    scores = np.take_along_axis(proba, order, axis=0)
+    truth = np.take_along_axis(truth, order, axis=0)
+
+    true_pos = np.cumsum(truth, axis=0)
+    predicted_pos = np.arange(1, len(proba) + 1)[:, None]
+    precision = true_pos / predicted_pos
+    recall = true_pos / np.maximum(true_pos[-1:], 1)
+
+    valid = np.ones(proba.shape, dtype=bool)
+    valid[:-1] = scores[:-1] != scores[1:]
+    return scores, precision, recall, valid
+
+
+def tune_cutoffs(proba, labels, classes, beta=1.0):
+    """
+    Choose the cutoff of each class maximizing its F-beta score, for all classes at once.
+    A document is predicted positive when its probability is strictly greater than the cutoff.
+
+
+    :param proba: numpy array of positive class probabilities of shape (number of documents, number of classes),
+                    e.g. from Classifier.predict_proba_documents or cross_validate_proba.
+    :param labels: A list of the class of each document.
+    :param classes: A list of class names - one for each column of proba.
+    :param beta: Weight of recall relative to precision.
+    :return: A dict {class: {'cutoff', 'precision', 'recall', 'f_score'}}.
+    """
+
+    import numpy as np
+
+    scores, precision, recall, valid = precision_recall_curves(proba, label_matrix(labels, classes))
+    denominator = beta ** 2 * precision + recall
+    f_score = np.where(denominator > 0, (1 + beta ** 2) * precision * recall / np.maximum(denominator, 1e-12), 0)
+    f_score[~valid] = -1
+    best = f_score.argmax(axis=0)
+
+    columns = np.arange(len(classes))
+    # cutoff half way between the last document predicted positive and the next one.
+    lower = np.where(best + 1 < len(proba), scores[np.minimum(best + 1, len(proba) - 1), columns],
+                     np.nextafter(scores[best, columns], -np.inf))
+    middle = (scores[best, columns] + lower) / 2
+    # the midpoint of adjacent floats rounds back to the score when the best row is the last row.
+    cutoffs = np.where(middle < scores[best, columns], middle, lower)
+
+    return {class_: {'cutoff': float(cutoffs[index]),
+                     'precision': float(precision[best[index], index]),
+                     'recall': float(recall[best[index], index]),
+                     'f_score': float(f_score[best[index], index])}
+            for index, class_ in enumerate(classes)}
+
+
+def evaluate_cutoffs(proba, labels, classes, cutoffs):
+    """
+    Compute precision, recall and F1 score of every class at given cutoffs at once.
+
+
+    :param proba: numpy array of positive class probabilities of shape (number of documents, number of classes).
+    :param labels: A list of the class of each document.
+    :param classes: A list of class names - one for each column of proba.
+    :param cutoffs: A dict {class: cutoff}.
+    :return: A dict {class: {'precision', 'recall', 'f_score', 'support'}}.
+    """
+
+    import numpy as np
+
+    truth = label_matrix(labels, classes)
+    predicted = proba > np.array([cutoffs[class_] for class_ in classes])
+    true_pos = (predicted & truth).sum(axis=0)
+    precision = true_pos / np.maximum(predicted.sum(axis=0), 1)
+    recall = true_pos / np.maximum(truth.sum(axis=0), 1)
+    f_score = np.where(precision + recall > 0, 2 * precision * recall / np.maximum(precision + recall, 1e-12), 0)
+    return {class_: {'precision': float(precision[index]), 'recall': float(recall[index]),
+                     'f_score': float(f_score[index]), 'support': int(truth[:, index].sum())}
+            for index, class_ in enumerate(classes)}
+
+
+def multinb_cutoff(class_, cutoff):
+    """Return the cutoff dict of a binary MultiNB object whose positive class is class_."""
+    return {class_: cutoff, '!' + class_: 1 - cutoff}
+
+
+_cv_data = {}  # data shared with pool processes of cross_validate_proba, set by _init_cv.
+
+
+def _init_cv(data_vec, labels, classes, folds, seed):
+    """Store cross-validation data in a pool process - it is sent once per process, not once per fold."""
+    _cv_data.update({'data_vec': data_vec, 'labels': labels, 'classes': classes, 'folds': folds, 'seed': seed})
+
+
+def _fit_fold(fold_index):
+    """
+    Fit a balanced binary MultinomialNB for every class on all folds but one and score the held-out fold.
+
+
+    :param fold_index: Index of the held-out fold.
+    :return: (row indices of the held-out fold, numpy array of positive class probabilities).
+    """
+
+    import numpy as np
+    from sklearn.naive_bayes import MultinomialNB
+    from src.utils import balance_indices
+
+    data_vec, labels, classes = _cv_data['data_vec'], _cv_data['labels'], _cv_data['classes']
+    folds = _cv_data['folds']
+    test_rows = folds[fold_index]
+    train_rows = np.concatenate([fold for index, fold in enumerate(folds) if index != fold_index])
+    test_vec = data_vec[test_rows]
+
+    proba = np.empty((len(test_rows), len(classes)))
+    for class_index, class_ in enumerate(classes):
+        is_positive = labels[train_rows] == class_
+        if not is_positive.any() or is_positive.all():  # a single class cannot be fitted.
+            proba[:, class_index] = float(is_positive.all())
+            continue
+        rows = train_rows[balance_indices(is_positive, target=True, seed=_cv_data['seed'])]
+        classifier = MultinomialNB().fit(data_vec[rows], labels[rows] == class_)
+        proba[:, class_index] = classifier.predict_proba(test_vec)[:, list(classifier.classes_).index(True)]
+    return test_rows, proba
+
+
+def cross_validate_proba(data_vec, labels, classes, n_folds=5, pool_process=None, seed=None):
+    """
+    Compute out-of-fold positive class probabilities of every class by k-fold cross-validation,
+    fitting folds in parallel processes. The result can be passed on to tune_cutoffs()
+    so that cutoffs are tuned without refitting for each candidate value.
+
+
+    :param data_vec: scipy CSR matrix of document features, e.g. from Classifier._extract_features.
+    :param labels: A list of the class of each document.
+    :param classes: A list of class names to be evaluated.
+    :param n_folds: Number of folds.
+    :param pool_process: Number of parallel processes. Default: number of folds.
+    :param seed: Seed of the random number generator used for folds and class balancing.
+    :return: numpy array of shape (number of documents, number of classes).
+    """
+
+    import numpy as np
+    from multiprocessing import Pool
+
+    labels = np.asarray(labels, dtype=object)
+    folds = np.array_split(np.random.RandomState(seed).permutation(len(labels)), n_folds)
+
+    proba = np.empty((len(labels), len(classes)))
+    with Pool(processes=pool_process or n_folds, initializer=_init_cv,
+              initargs=(data_vec, labels, list(classes), folds, seed)) as pool:
+        for test_rows, fold_proba in pool.imap_unordered(_fit_fold, range(n_folds)):
+            proba[test_rows] = fold_proba
+    return proba
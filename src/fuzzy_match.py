@@ -10,7 +10,7 @@ class FuzzyMatch:
         use Levenshtein implementation from python-Levenshtein.
         :param cosine_cut: Cosine similarity cut-off considered too dissimilar.
         """
-        if not leven_func:
+        if leven_func:
             self.leven_dis = leven_func
         else:
             from Levenshtein import distance
@@ -18,6 +18,7 @@ class FuzzyMatch:
         self.cosine_cut = cosine_cut
         self.lexicon = {}
         self.keywords = set()
+        self._keyword_order = None  # sorted keywords, built once per change of keywords.
 
     def set_keyword(self, keywords):
         """
@@ -27,6 +28,28 @@ class FuzzyMatch:
         """
         self.keywords = set(keywords)
         self.keywords.add('')
+        self._keyword_order = None
+
+    def set_keyword_file(self, filename):
+        """
+        Set object keyword from a keywords file, shared through the resource registry (see src.resources)
+        instead of being copied into this object.
+        :param filename: (str) path to keywords file.
+        :return:
+        """
+        from src.resources import REGISTRY
+        self.keywords = REGISTRY.get('word_list', filename)
+        self._keyword_order = None
+
+    def _sorted_keywords(self):
+        """
+        Return keywords in sorted order, including the empty keyword.
+        :return: (tuple) keywords.
+        """
+        if self._keyword_order is None:
+            keywords = tuple(sorted(self.keywords))
+            self._keyword_order = keywords if '' in self.keywords else ('',) + keywords
+        return self._keyword_order
 
     def _add_word(self, word):
         """
@@ -39,7 +62,7 @@ class FuzzyMatch:
         self.lexicon[word] = {'keyword': '_',
                               'cosine': 1.0,
                               'leven': 10**3}
-        for keyword in sorted(list(self.keywords)):
+        for keyword in self._sorted_keywords():
             cosine = self.cosine_dis(word, keyword)
             if cosine > self.cosine_cut:
                 leven = len(word) + len(keyword)
@@ -75,7 +98,10 @@ class FuzzyMatch:
         :return: None
         """
 
+        if not isinstance(self.keywords, set):  # copy keywords shared through the registry before changing them.
+            self.keywords = set(self._sorted_keywords())
         self.keywords.add(keyword)
+        self._keyword_order = None
 
         for word in self.lexicon.keys():
             cosine = self.cosine_dis(word, keyword)
@@ -130,13 +156,12 @@ class FuzzyMatch:
         :param word2: (str) Second word.
         :return: (float) cosine similarity.
         """
-        from scipy.sparse import csc_matrix
         from scipy.spatial.distance import cosine
         from sklearn.feature_extraction.text import CountVectorizer
 
         vectorizer = CountVectorizer(analyzer='char')
         word_vec = vectorizer.fit_transform([word1, word2])
-        word_vec = csc_matrix.todense(word_vec)
+        word_vec = word_vec.toarray()  # rows of an array are 1-D vectors, as scipy requires - unlike np.matrix.
         word_dis = cosine(word_vec[0], word_vec[1])
 
         return word_dis
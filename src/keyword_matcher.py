@@ -0,0 +1,143 @@
+class KeywordMatcher:
+    """
+    Case-insensitive multi-keyword matcher (Aho-Corasick automaton). All occurrences of all keywords are found
+    in one pass over a text, however many keywords there are.
+    English keywords only match whole words: a keyword starting or ending with an English letter or digit
+    does not match next to another English letter or digit.
+    """
+
+    def __init__(self, keywords):
+        """
+        Build the automaton.
+
+
+        :param keywords: An iterable of keywords.
+        """
+
+        from collections import deque
+
+        self.keywords = sorted({keyword.lower() for keyword in keywords if keyword.strip()})
+        goto = [{}]  # transitions of each state.
+        length = [0]  # length of the keyword ending at each state, 0 if none.
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                if char not in goto[state]:
+                    goto.append({})
+                    length.append(0)
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            length[state] = len(keyword)
+
+        # failure links in breadth-first order; outputs of a state include those of its failure state.
+        fail = [0] * len(goto)
+        outputs = [(length[state],) if length[state] else () for state in range(len(goto))]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in goto[state].items():
+                queue.append(child)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[child] = goto[fallback].get(char, 0)
+                outputs[child] = outputs[child] + outputs[fail[child]]
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = outputs
+
+    def __len__(self):
+        return len(self.keywords)
+
+    @staticmethod
+    def _lower(text):
+        """Lower-case text keeping its length, so that positions in both strings match."""
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            return lowered
+        return ''.join(char if len(char.lower()) != 1 else char.lower() for char in text)
+
+    def find(self, text):
+        """
+        Find keyword occurrences - leftmost, and longest among those starting at the same position,
+        not overlapping each other.
+
+
+        :param text: A string.
+        :return: A list of (start, end) positions of occurrences in text.
+        """
+
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        lowered = self._lower(text)
+        matches = []
+        state = 0
+        for position, char in enumerate(lowered):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length in outputs[state]:
+                start = position + 1 - length
+                if self._at_word_boundary(lowered, start, position + 1):
+                    matches.append((start, position + 1))
+
+        # leftmost-longest selection of non-overlapping occurrences.
+        matches.sort(key=lambda match: (match[0], -match[1]))
+        selected = []
+        covered = 0
+        for start, end in matches:
+            if start >= covered:
+                selected.append((start, end))
+                covered = end
+        return selected
+
+    @staticmethod
+    def _at_word_boundary(text, start, end):
+        """Whether an occurrence does not cut an English word or number."""
+        def is_word_char(char):
+            return char < '\x80' and char.isalnum()
+        if start > 0 and is_word_char(text[start]) and is_word_char(text[start - 1]):
+            return False
+        if end < len(text) and is_word_char(text[end - 1]) and is_word_char(text[end]):
+            return False
+        return True
+
+    def lower(self, text):
+        """Return text with every keyword occurrence in lower case."""
+        spans = self.find(text)
+        if not spans:
+            return text
+        parts = []
+        previous = 0
+        for start, end in spans:
+            parts.append(text[previous:start])
+            parts.append(text[start:end].lower())
+            previous = end
+        parts.append(text[previous:])
+        return ''.join(parts)
+
+    def protected_tokens(self, tokens):
+        """
+        Find tokens which are part of a keyword occurrence, e.g. not to be lemmatized.
+
+
+        :param tokens: A list of tokens of a text separated by ' '.
+        :return: A set of indices of protected tokens.
+        """
+
+        from bisect import bisect_right
+
+        protected = set()
+        if not self.keywords:
+            return protected
+        # start position of each token in the text joined by ' '.
+        starts = []
+        position = 0
+        for token in tokens:
+            starts.append(position)
+            position += len(token) + 1
+        for start, end in self.find(' '.join(tokens)):
+            first = bisect_right(starts, start) - 1
+            last = bisect_right(starts, end - 1) - 1
+            protected.update(range(first, last + 1))
+        return protected
@@ -0,0 +1,290 @@
+"""
+Pipelined I/O: reading the next chunk of input, computing on the current chunk and writing the previous results
+overlap, each in its own thread connected by bounded queues. Compressed files (gzip, bz2, xz and zstd - the
+latter requires the zstandard package) are read and written transparently.
+"""
+
+_MAGIC = [(b'\x1f\x8b', 'gzip'), (b'BZh', 'bz2'), (b'\xfd7zXZ\x00', 'xz'), (b'\x28\xb5\x2f\xfd', 'zstd')]
+_EXTENSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.zst': 'zstd'}
+_END = object()  # end of stream marker of queues.
+
+
+def _open_compressed(filename, compression, mode, encoding):
+    """Open a file with the given compression - None for plain files."""
+    import io
+
+    binary = 'b' in mode
+    if compression is None:
+        return open(filename, mode, encoding=None if binary else encoding)
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError('reading or writing zstd files requires the zstandard package')
+        raw = open(filename, mode[0] + 'b')
+        stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True) if mode[0] == 'r' \
+            else zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        return stream if binary else io.TextIOWrapper(stream, encoding=encoding)
+    module = __import__({'gzip': 'gzip', 'bz2': 'bz2', 'xz': 'lzma'}[compression])
+    return module.open(filename, mode if binary else mode[0] + 't', encoding=None if binary else encoding)
+
+
+def open_input(filename, mode='rt', encoding='utf-8'):
+    """
+    Open a file for reading, decompressing it transparently - compression is detected from its first bytes.
+
+
+    :param filename: Path to the file.
+    :param mode: 'rt' or 'rb'.
+    :param encoding: Text encoding.
+    :return: File object.
+    """
+
+    with open(filename, 'rb') as f_in:
+        head = f_in.read(6)
+    compression = next((name for magic, name in _MAGIC if head.startswith(magic)), None)
+    return _open_compressed(filename, compression, mode, encoding)
+
+
+def open_output(filename, mode='wt', encoding='utf-8'):
+    """
+    Open a file for writing, compressing it according to its extension (.gz, .bz2, .xz, .zst).
+
+
+    :param filename: Path to the file.
+    :param mode: 'wt' or 'wb'.
+    :param encoding: Text encoding.
+    :return: File object.
+    """
+
+    import os
+
+    return _open_compressed(filename, _EXTENSIONS.get(os.path.splitext(filename)[1]), mode, encoding)
+
+
+def iter_json_records(filename, buffer_size=1 << 20):
+    """
+    Stream JSON objects from a file without loading the whole file: a JSON array of objects,
+    JSON lines, or objects one after the other as written by the crawler (see import_raw_data).
+
+
+    :param filename: Path to the file, possibly compressed.
+    :param buffer_size: Number of characters read at a time.
+    :return: Generator of objects.
+    """
+
+    import json
+
+    decoder = json.JSONDecoder()
+    with open_input(filename) as f_in:
+        buffer = ''
+        position = 0
+        eof = False
+        while True:
+            # skip separators between objects.
+            while position < len(buffer) and buffer[position] in ' \t\r\n,[]':
+                position += 1
+            if position == len(buffer) or not eof and len(buffer) - position < buffer_size // 2:
+                if eof:
+                    return
+                chunk = f_in.read(buffer_size)
+                eof = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if eof:
+                    raise
+                chunk = f_in.read(buffer_size)  # an object longer than the buffer.
+                eof = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            position = end
+            yield record
+
+
+class JsonArrayWriter:
+    """Write objects one at a time as a JSON array, so that the file can be read by json.load."""
+
+    def __init__(self, filename):
+        """
+        Open a JSON array file for writing.
+
+
+        :param filename: Path to the file - compressed according to its extension.
+        """
+
+        self.file = open_output(filename)
+        self.file.write('[')
+        self.count = 0
+
+    def write(self, record):
+        import json
+        self.file.write((',\n' if self.count else '\n') + json.dumps(record, ensure_ascii=False))
+        self.count += 1
+
+    def close(self):
+        self.file.write('\n]\n')
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _chunks(iterable, chunk_size):
+    """Group an iterable into lists of chunk_size items."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def read_ahead(iterable, chunk_size=1000, depth=2):
+    """
+    Read chunks of an iterable in a background thread, at most depth chunks ahead of the consumer.
+
+
+    :param iterable: An iterable of items, e.g. iter_json_records().
+    :param chunk_size: Number of items in a chunk.
+    :param depth: Number of chunks read ahead - bounds the memory used by read-ahead.
+    :return: Generator of lists of items.
+    """
+
+    import threading
+    from queue import Queue
+
+    queue = Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def reader():
+        try:
+            for chunk in _chunks(iterable, chunk_size):
+                queue.put(chunk)
+                if stop.is_set():
+                    return
+            queue.put(_END)
+        except BaseException as error:  # re-raised in the consumer.
+            queue.put(error)
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    try:
+        while True:
+            chunk = queue.get()
+            if chunk is _END:
+                return
+            if isinstance(chunk, BaseException):
+                raise chunk
+            yield chunk
+    finally:
+        stop.set()
+        while thread.is_alive():  # unblock a reader waiting on a full queue.
+            try:
+                queue.get_nowait()
+            except Exception:
+                pass
+            thread.join(0.01)
+
+
+class WriteBehind:
+    """
+    Write items in a background thread. put() returns as soon as the item is queued,
+    unless depth items are already waiting to be written.
+    """
+
+    def __init__(self, write_func, depth=2):
+        """
+        Start the writer thread.
+
+
+        :param write_func: Function writing an item.
+        :param depth: Maximum number of items waiting to be written - bounds the memory used by write-behind.
+        """
+
+        import threading
+        from queue import Queue
+
+        self.queue = Queue(maxsize=depth)
+        self.error = None
+        self.write_func = write_func
+        self.thread = threading.Thread(target=self._writer, daemon=True)
+        self.thread.start()
+
+    def _writer(self):
+        while True:
+            item = self.queue.get()
+            if item is _END:
+                return
+            if self.error is None:
+                try:
+                    self.write_func(item)
+                except BaseException as error:  # re-raised by put() or close().
+                    self.error = error
+
+    def put(self, item):
+        """Queue an item to be written."""
+        if self.error is not None:
+            raise self.error
+        self.queue.put(item)
+
+    def close(self):
+        """Wait until queued items are written."""
+        self.queue.put(_END)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def run_pipeline(records, compute, write, chunk_size=1000, depth=2):
+    """
+    Run compute over chunks of records, reading the next chunk and writing the previous results meanwhile.
+
+
+    :param records: An iterable of input items, e.g. iter_json_records().
+    :param compute: Function taking a list of items and returning a list of results.
+    :param write: Function writing a list of results.
+    :param chunk_size: Number of items in a chunk.
+    :param depth: Number of chunks read ahead and waiting to be written.
+    :return: A dict with item count and seconds spent waiting for input, computing and waiting for output.
+    """
+
+    from time import perf_counter
+
+    report = {'items': 0, 'chunks': 0, 'read_wait_sec': 0.0, 'compute_sec': 0.0, 'write_wait_sec': 0.0}
+    begin = perf_counter()
+    with WriteBehind(write, depth) as writer:
+        chunks = read_ahead(records, chunk_size, depth)
+        while True:
+            clock = perf_counter()
+            chunk = next(chunks, None)
+            report['read_wait_sec'] += perf_counter() - clock
+            if chunk is None:
+                break
+            clock = perf_counter()
+            results = compute(chunk)
+            report['compute_sec'] += perf_counter() - clock
+            clock = perf_counter()
+            writer.put(results)
+            report['write_wait_sec'] += perf_counter() - clock
+            report['items'] += len(chunk)
+            report['chunks'] += 1
+        clock = perf_counter()
+    report['write_wait_sec'] += perf_counter() - clock  # flushing the last results.
+    report['total_sec'] = perf_counter() - begin
+    return report
@@ -0,0 +1,181 @@
+"""
+Import strategy of the package.
+Modules in src/ import heavy dependencies lazily - inside the functions using them - so that importing src
+is cheap. Before a Pool is forked, the parent imports the heavy dependencies of the work once with preload(),
+so that forked workers share the imported modules copy-on-write instead of each importing them again.
+"""
+
+# heavy dependencies of each part of the pipeline.
+HEAVY_MODULES = {'tokenize': ['nltk', 'nltk.stem.wordnet', 'tltk', 'tqdm'],
+                 'vectorize': ['numpy', 'scipy.sparse', 'sklearn.feature_extraction.text', 'dill'],
+                 'classify': ['numpy', 'scipy.sparse', 'sklearn.naive_bayes', 'dill']}
+
+# cold-start budgets (seconds) of entry points: interpreter start-up, package import and preload.
+COLD_START_BUDGET = {'create_vectorizer': {'modules': ['src.tokenizer', 'src.vectorizer'],
+                                           'preload': ['tokenize', 'vectorize'],
+                                           'budget_sec': 3.0},
+                     'classify_service': {'modules': ['src.service', 'src.classifier'],
+                                          'preload': ['tokenize', 'classify'],
+                                          'budget_sec': 3.0}}
+
+
+def preload(*groups):
+    """
+    Import heavy dependencies of the given groups into the current process.
+    Modules already imported cost nothing; missing modules are skipped.
+
+
+    :param groups: Names of groups in HEAVY_MODULES. Default: all groups.
+    :return: A dict {module: import time in seconds or None if the module is missing}.
+    """
+
+    import importlib
+    import sys
+    from time import perf_counter
+
+    timings = {}
+    for group in groups or sorted(HEAVY_MODULES):
+        for module in HEAVY_MODULES[group]:
+            if module in timings:
+                continue
+            if module in sys.modules:
+                timings[module] = 0.0
+                continue
+            begin = perf_counter()
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                timings[module] = None
+                continue
+            timings[module] = perf_counter() - begin
+    return timings
+
+
+def measure_cold_start(entry_point):
+    """
+    Measure the cold start of an entry point in a fresh interpreter.
+
+
+    :param entry_point: Name of an entry point in COLD_START_BUDGET.
+    :return: A dict with interpreter start-up, package import and preload times (seconds),
+                per-module preload times, whether the total is within the budget
+                and modules which are missing (a cold start missing modules is not representative).
+    """
+
+    import json
+    import os
+    import subprocess
+    import sys
+    from time import perf_counter
+
+    spec = COLD_START_BUDGET[entry_point]
+    script = ('import json, importlib\n'
+              'from time import perf_counter\n'
+              'begin = perf_counter()\n'
+              'for module in {modules!r}:\n'
+              '    importlib.import_module(module)\n'
+              'package_sec = perf_counter() - begin\n'
+              'from src.preload import preload\n'
+              'begin = perf_counter()\n'
+              'modules = preload(*{groups!r})\n'
+              'print(json.dumps({{"package_sec": package_sec, "preload_sec": perf_counter() - begin,'
+              ' "modules": modules}}))\n').format(modules=spec['modules'], groups=spec['preload'])
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    begin = perf_counter()
+    output = subprocess.run([sys.executable, '-c', script], cwd=root, check=True,
+                            stdout=subprocess.PIPE, universal_newlines=True).stdout
+    total = perf_counter() - begin
+
+    result = json.loads(output.strip().split('\n')[-1])
+    result['entry_point'] = entry_point
+    result['total_sec'] = total
+    result['startup_sec'] = total - result['package_sec'] - result['preload_sec']
+    result['budget_sec'] = spec['budget_sec']
+    result['within_budget'] = total <= spec['budget_sec']
+    result['missing'] = [module for module, seconds in result['modules'].items() if seconds is None]
+    return result
+
+
+def preload_resources(char_set_filename='./Resource/misc/charset',
+                      stop_en_filename='./Resource/WordList/stopwords_en_.txt',
+                      stop_th_filename=None, keywords_filename=None, freeze=False):
+    """
+    Load read-only resources of the tokenizer into the current process: the character set, word lists,
+    NLTK WordNet data and tltk dictionaries. Loaded in the parent before a Pool is forked (or in the
+    forkserver), they are shared by pool processes copy-on-write instead of being loaded by each of them.
+
+
+    :param char_set_filename: Path to a text file containing a valid character set.
+    :param stop_en_filename: Path to txt file containing English stop word.
+    :param stop_th_filename: Path to txt file containing Thai stop word.
+    :param keywords_filename: Path to txt file containing keywords.
+    :param freeze: True will move every object of the process out of the garbage collector's reach
+                        (gc.freeze), so that collections in forked processes do not write to - and thereby copy -
+                        the shared pages. Frozen objects are never collected until gc.unfreeze() is called:
+                        only for a process which does nothing but fork workers, e.g. the forkserver.
+    :return: A dict {resource: load time in seconds or None if it is unavailable}.
+    """
+
+    import gc
+    from time import perf_counter
+    from src.tokenizer import shared_char_set, shared_word_list, shared_keyword_matcher, english_normalizer
+
+    def load_wordnet():
+        lemmatize, _ = english_normalizer()
+        lemmatize.__wrapped__('jobs')  # WordNet is loaded lazily on first use - bypass the lemma cache.
+
+    def load_tltk():
+        import tltk
+        tltk.segment(u'งาน')
+
+    loaders = [('charset', lambda: shared_char_set(char_set_filename)),
+               ('stopwords_en', lambda: shared_word_list(stop_en_filename) if stop_en_filename else None),
+               ('stopwords_th', lambda: shared_word_list(stop_th_filename) if stop_th_filename else None),
+               ('keywords', lambda: shared_keyword_matcher(keywords_filename) if keywords_filename else None),
+               ('wordnet', load_wordnet),
+               ('tltk', load_tltk)]
+
+    timings = {}
+    for resource, loader in loaders:
+        begin = perf_counter()
+        try:
+            loader()
+        except (ImportError, LookupError, OSError):
+            timings[resource] = None
+            continue
+        timings[resource] = perf_counter() - begin
+
+    if freeze and hasattr(gc, 'freeze'):
+        gc.collect()
+        gc.freeze()
+    return timings
+
+
+def memory_usage():
+    """
+    Return memory usage of the current process in MB.
+    On Linux, memory shared with other processes (e.g. pages inherited copy-on-write) is reported separately
+    from private memory; elsewhere only peak RSS is available.
+
+
+    :return: A dict {'rss_mb', 'private_mb', 'shared_mb'}.
+    """
+
+    usage = {'rss_mb': None, 'private_mb': None, 'shared_mb': None}
+    try:
+        with open('/proc/self/smaps_rollup', 'rt') as f_smaps:
+            fields = {}
+            for line in f_smaps:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+        usage['rss_mb'] = fields.get('Rss')
+        usage['private_mb'] = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+        usage['shared_mb'] = fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)
+    except OSError:
+        import resource
+        import sys
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        usage['rss_mb'] = max_rss / 2 ** 20 if sys.platform == 'darwin' else max_rss / 1024
+    return usage
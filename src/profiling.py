@@ -0,0 +1,116 @@
+class StageProfiler:
+    """
+    Opt-in per-stage wall time, call count and token count of the tokenization pipeline.
+    When disabled, clock() and record() return immediately so that instrumented code pays almost nothing.
+    Each process has its own PROFILER; pool processes send their counts to the parent with pop().
+    """
+
+    def __init__(self, enabled=False):
+        """
+        Init StageProfiler.
+
+
+        :param enabled: True will record stages.
+        """
+
+        from time import perf_counter
+
+        self._perf_counter = perf_counter
+        self.enabled = enabled
+        self.stages = {}  # {stage: [calls, seconds, tokens]}
+
+    def clock(self):
+        """Return the current time if enabled, else 0."""
+        return self._perf_counter() if self.enabled else 0
+
+    def record(self, stage, begin, tokens=0):
+        """
+        Record a call of a stage.
+
+
+        :param stage: Name of the stage.
+        :param begin: Return value of clock() at the beginning of the stage.
+        :param tokens: Number of tokens produced by the stage.
+        :return: None
+        """
+
+        if not self.enabled:
+            return
+        elapsed = self._perf_counter() - begin
+        counts = self.stages.get(stage)
+        if counts is None:
+            self.stages[stage] = [1, elapsed, tokens]
+        else:
+            counts[0] += 1
+            counts[1] += elapsed
+            counts[2] += tokens
+
+    def count(self, stage, tokens):
+        """Record a count without wall time, e.g. cache hits."""
+        if not self.enabled:
+            return
+        counts = self.stages.setdefault(stage, [0, 0.0, 0])
+        counts[0] += 1
+        counts[2] += tokens
+
+    def pop(self):
+        """Return the recorded counts and reset them."""
+        stages = self.stages
+        self.stages = {}
+        return stages
+
+    def merge(self, stages):
+        """Add counts returned by pop() - e.g. from a pool process - to this profiler."""
+        for stage, (calls, seconds, tokens) in stages.items():
+            counts = self.stages.setdefault(stage, [0, 0.0, 0])
+            counts[0] += calls
+            counts[1] += seconds
+            counts[2] += tokens
+
+    def summary(self):
+        """
+        Summarize recorded stages.
+
+
+        :return: A dict {stage: {'calls', 'seconds', 'tokens', 'ms_per_call'}}.
+        """
+
+        return {stage: {'calls': calls,
+                        'seconds': seconds,
+                        'tokens': tokens,
+                        'ms_per_call': seconds / calls * 1000 if calls else 0.0}
+                for stage, (calls, seconds, tokens) in sorted(self.stages.items())}
+
+    def report(self):
+        """Return a human-readable table of recorded stages, slowest first."""
+        summary = self.summary()
+        total = sum(stage['seconds'] for stage in summary.values()) or 1.0
+        lines = ['{:<16}{:>10}{:>12}{:>8}{:>14}{:>12}'.format('stage', 'calls', 'seconds', '%', 'tokens',
+                                                              'ms/call')]
+        for stage, counts in sorted(summary.items(), key=lambda item: -item[1]['seconds']):
+            lines.append('{:<16}{:>10}{:>12.2f}{:>8.1%}{:>14}{:>12.3f}'.format(
+                stage, counts['calls'], counts['seconds'], counts['seconds'] / total, counts['tokens'],
+                counts['ms_per_call']))
+        return '\n'.join(lines)
+
+    def prometheus(self, prefix='tokenizer'):
+        """Return recorded stages in Prometheus text exposition format."""
+        metrics = [('stage_calls_total', 'Number of calls of a pipeline stage.', 0),
+                   ('stage_seconds_total', 'Wall time spent in a pipeline stage.', 1),
+                   ('stage_tokens_total', 'Number of tokens produced by a pipeline stage.', 2)]
+        lines = []
+        for name, help_text, position in metrics:
+            lines.append('# HELP {}_{} {}'.format(prefix, name, help_text))
+            lines.append('# TYPE {}_{} counter'.format(prefix, name))
+            for stage, counts in sorted(self.stages.items()):
+                lines.append('{}_{}{{stage="{}"}} {}'.format(prefix, name, stage, counts[position]))
+        return '\n'.join(lines) + '\n'
+
+
+PROFILER = StageProfiler()  # profiler of the current process - disabled unless enable_profiling() is called.
+COUNTERS = StageProfiler(enabled=True)  # always-on event counts of the current process, e.g. limits which fired.
+
+
+def enable_profiling(enabled=True):
+    """Enable (or disable) PROFILER of the current process - also used as Pool initializer."""
+    PROFILER.enabled = enabled
@@ -0,0 +1,111 @@
+"""
+Optional reduction of the stacked title and description TF-IDF features (see Classifier._extract_features)
+before they reach the classifiers: every classifier of a bank then works on n_components features instead of
+the whole vocabulary. The fitted reducer is kept by the VectorizerTFIDF object as its 'reducer' attribute.
+"""
+
+
+class FeatureSelector:
+    """
+    Keep the features most dependent on any class by the chi-squared statistic: features are ranked for each
+    class (one class against the rest) and those ranked best for some class are kept. Features stay
+    non-negative, so that naive Bayes classifiers can still be used.
+    """
+
+    def __init__(self, keep, n_features):
+        """
+        Init FeatureSelector - use fit_chi2_selector().
+
+
+        :param keep: Sorted numpy array of indices of kept features.
+        :param n_features: Number of features before selection.
+        """
+
+        import numpy as np
+        from scipy.sparse import csr_matrix
+
+        self.keep = keep
+        self.n_features_in_ = n_features
+        self.n_components_ = len(keep)
+        # selecting columns by a sparse matrix product is faster than column indexing of CSR matrices.
+        self._selection = csr_matrix((np.ones(len(keep), dtype=np.float64), (keep, np.arange(len(keep)))),
+                                     shape=(n_features, len(keep)))
+
+    def transform(self, data_vec):
+        """
+        Select features of a batch of feature vectors.
+
+
+        :param data_vec: scipy sparse matrix of shape (number of documents, n_features_in_).
+        :return: scipy.sparse.csr_matrix of shape (number of documents, n_components_).
+        """
+
+        return (data_vec @ self._selection).tocsr()
+
+
+def fit_chi2_selector(data_vec, labels, n_components):
+    """
+    Fit a FeatureSelector by chi-squared statistics of features against each class.
+
+
+    :param data_vec: scipy sparse matrix of non-negative features, e.g. from Classifier._extract_features.
+    :param labels: A list of classes of the documents - None for documents without class.
+    :param n_components: Number of features to keep.
+    :return: FeatureSelector object.
+    """
+
+    import numpy as np
+    from sklearn.feature_selection import chi2
+
+    labelled = np.array([label is not None for label in labels])
+    labels = np.array(labels, dtype=object)[labelled]
+    data_vec = data_vec.tocsr()[np.flatnonzero(labelled)]
+    classes = sorted(set(labels))
+    if len(classes) < 2:
+        raise ValueError('chi2 selection requires documents of at least two classes')
+
+    n_features = data_vec.shape[1]
+    n_components = min(n_components, n_features)
+    best_rank = np.full(n_features, n_features, dtype=np.int64)
+    best_score = np.zeros(n_features)
+    for class_ in classes:
+        scores, _ = chi2(data_vec, labels == class_)
+        scores = np.nan_to_num(scores)  # features absent from every document have no statistic.
+        ranks = np.empty(n_features, dtype=np.int64)
+        ranks[np.argsort(-scores, kind='stable')] = np.arange(n_features)
+        best_rank = np.minimum(best_rank, ranks)
+        best_score = np.maximum(best_score, scores)
+    # best-ranked features of every class first - the union of the top n_components / classes of each class.
+    keep = np.lexsort((-best_score, best_rank))[:n_components]
+    return FeatureSelector(np.sort(keep), n_features)
+
+
+def fit_reducer(data_vec, method, n_components, labels=None, seed=0):
+    """
+    Fit a reduction of features.
+
+
+    :param data_vec: scipy sparse matrix of features, e.g. from Classifier._extract_features.
+    :param method: 'chi2' - select n_components features by chi-squared statistics per class (requires labels);
+                    'random_projection' - project features onto n_components sparse random directions.
+                    Projected features may be negative: classifiers must accept them, e.g. logistic regression
+                    rather than naive Bayes.
+    :param n_components: Number of features after reduction - a positive integer.
+    :param labels: A list of classes of the documents, for 'chi2'.
+    :param seed: Random seed of 'random_projection'.
+    :return: Fitted object with a transform method taking and returning scipy sparse matrices, and
+                an n_components_ attribute.
+    """
+
+    from numbers import Integral
+
+    if not (isinstance(n_components, Integral) and n_components > 0):
+        raise ValueError('n_components must be a positive integer')
+    if method == 'chi2':
+        if labels is None:
+            raise ValueError('chi2 reduction requires labels')
+        return fit_chi2_selector(data_vec, labels, n_components)
+    if method == 'random_projection':
+        from sklearn.random_projection import SparseRandomProjection
+        return SparseRandomProjection(n_components=n_components, dense_output=False, random_state=seed).fit(data_vec)
+    raise ValueError('reduction method must be chi2 or random_projection')
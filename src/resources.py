@@ -0,0 +1,146 @@
+"""
+Registry of read-only tokenizer resources: the character set, word lists and keyword matchers are loaded once
+per process into frozen forms and shared by the tokenizer, the cleaner and FuzzyMatch. Word lists are frozensets,
+since membership is tested for every token. Resources loaded in the parent before a Pool is forked are shared by
+pool processes copy-on-write (see preload_resources).
+"""
+
+from bisect import bisect_right
+
+
+class FrozenCharSet:
+    """
+    Immutable set of valid characters stored as ranges of code points. Invalid characters are removed from a
+    text by one compiled regular expression instead of a lookup per character.
+    """
+
+    def __init__(self, charset):
+        """
+        Freeze a character set.
+
+
+        :param charset: A dict of characters with ord value (see load_char_set) - characters with value 0 are
+                        not valid, as in the dict.
+        """
+
+        import re
+
+        codes = sorted(code for code in set(charset.values()) if code)
+        self.ranges = []  # [first, last] code points of consecutive valid characters.
+        for code in codes:
+            if self.ranges and self.ranges[-1][1] == code - 1:
+                self.ranges[-1][1] = code
+            else:
+                self.ranges.append([code, code])
+        self.ranges = tuple(tuple(code_range) for code_range in self.ranges)
+        self._invalid = re.compile('[^' + ''.join('\\U{:08x}-\\U{:08x}'.format(first, last)
+                                                  for first, last in self.ranges) + ']+') \
+            if self.ranges else re.compile('.+', re.DOTALL)
+
+    def __contains__(self, char):
+        code = ord(char)
+        index = bisect_right(self.ranges, (code, 0x10ffff)) - 1
+        return index >= 0 and self.ranges[index][0] <= code <= self.ranges[index][1]
+
+    def get(self, char, default=None):
+        """Return the ord value of a valid character, else default - as the dict of load_char_set()."""
+        return ord(char) if len(char) == 1 and char in self else default
+
+    def __len__(self):
+        return sum(last - first + 1 for first, last in self.ranges)
+
+    def filter(self, text):
+        """Return text without its invalid characters."""
+        return self._invalid.sub('', text)
+
+
+def _deep_size(obj):
+    """Return the size in bytes of an object and of the objects it contains, each counted once."""
+    import sys
+
+    seen = set()
+    stack = [obj]
+    size = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, '__dict__'):
+            stack.append(vars(item))
+    return size
+
+
+def _load_charset(filename):
+    from src.tokenizer import load_char_set
+    return FrozenCharSet(load_char_set(filename))
+
+
+def _load_word_list(filename):
+    from src.tokenizer import get_word_list
+    return frozenset(get_word_list(filename))
+
+
+def _load_keyword_matcher(filename):
+    from src.keyword_matcher import KeywordMatcher
+    return KeywordMatcher(REGISTRY.get('word_list', filename))
+
+
+class ResourceRegistry:
+    """Process-wide cache of read-only resources, each loaded once, with its load time and memory footprint."""
+
+    loaders = {'charset': _load_charset,
+               'word_list': _load_word_list,
+               'keyword_matcher': _load_keyword_matcher}
+
+    def __init__(self):
+        self._resources = {}  # {(kind, filename): resource}
+        self._stats = {}  # {(kind, filename): {'load_sec', 'size_bytes', 'items'}}
+
+    def get(self, kind, filename):
+        """
+        Return a resource, loading it on first use.
+
+
+        :param kind: 'charset', 'word_list' or 'keyword_matcher'.
+        :param filename: Path to the resource file.
+        :return: FrozenCharSet, frozenset of words or KeywordMatcher object.
+        """
+
+        from time import perf_counter
+
+        key = (kind, filename)
+        if key not in self._resources:
+            begin = perf_counter()
+            resource = self.loaders[kind](filename)
+            load_sec = perf_counter() - begin
+            self._resources[key] = resource
+            self._stats[key] = {'load_sec': load_sec, 'size_bytes': _deep_size(resource), 'items': len(resource)}
+        return self._resources[key]
+
+    def stats(self):
+        """Return a list of dicts {'kind', 'filename', 'items', 'size_bytes', 'load_sec'} of loaded resources."""
+        return [dict(kind=kind, filename=filename, **stats) for (kind, filename), stats in self._stats.items()]
+
+    def report(self):
+        """Return a table of loaded resources with their memory footprint and load time."""
+        lines = ['{:<16} {:>9} {:>10} {:>9}  {}'.format('resource', 'items', 'size_kb', 'load_ms', 'file')]
+        for stats in self.stats():
+            lines.append('{:<16} {:>9} {:>10.1f} {:>9.1f}  {}'.format(
+                stats['kind'], stats['items'], stats['size_bytes'] / 1024, stats['load_sec'] * 1000,
+                stats['filename']))
+        return '\n'.join(lines)
+
+    def clear(self):
+        """Forget loaded resources, e.g. after resource files changed."""
+        self._resources.clear()
+        self._stats.clear()
+
+
+REGISTRY = ResourceRegistry()
@@ -0,0 +1,253 @@
+_worker = {}  # state of a pool process set by _init_worker.
+
+
+def _init_worker(profile, track_memory):
+    """
+    Initialize a pool process.
+
+
+    :param profile: True will enable the stage profiler of the process.
+    :param track_memory: True will record memory usage of the process at start-up.
+    :return: None
+    """
+
+    from src.profiling import enable_profiling
+    from src.preload import memory_usage
+
+    enable_profiling(profile)
+    _worker['memory_start'] = memory_usage() if track_memory else None
+
+
+def _run_batch(func, begin, items):
+    """
+    Apply func to a batch of items in a pool process.
+
+
+    :param func: Function to be applied to each item.
+    :param begin: Index of the first item of the batch in the input list.
+    :param items: A list of items.
+    :return: (begin, list of results, process id, wall time in seconds,
+                stage counts recorded by the process profiler or None if profiling is disabled,
+                (memory usage at start-up, current memory usage) or None if memory is not tracked,
+                event counts recorded by the process COUNTERS).
+    """
+
+    import os
+    from time import perf_counter
+    from src.profiling import PROFILER, COUNTERS
+    from src.preload import memory_usage
+
+    start = perf_counter()
+    results = [func(item) for item in items]
+    elapsed = perf_counter() - start
+    memory = (_worker['memory_start'], memory_usage()) if _worker.get('memory_start') else None
+    return begin, results, os.getpid(), elapsed, PROFILER.pop() if PROFILER.enabled else None, memory, \
+        COUNTERS.pop()
+
+
+class PoolStats:
+    """Per-worker throughput and overall utilization of a pool run."""
+
+    def __init__(self, pool_process):
+        """
+        Init PoolStats.
+
+
+        :param pool_process: Number of pool processes.
+        """
+
+        from time import perf_counter
+
+        self.clock = perf_counter
+        self.pool_process = pool_process
+        self.begin = perf_counter()
+        self.end = None
+        self.workers = {}
+
+    def record(self, pid, elapsed, cost, items, memory=None):
+        """Record a completed batch of a worker and its (start-up, current) memory usage if tracked."""
+        worker = self.workers.setdefault(pid, {'batches': 0, 'items': 0, 'cost': 0, 'busy_sec': 0.0})
+        worker['batches'] += 1
+        worker['items'] += items
+        worker['cost'] += cost
+        worker['busy_sec'] += elapsed
+        if memory:
+            worker['memory_before'], worker['memory_after'] = memory
+
+    def stop(self):
+        """Mark the end of the run."""
+        self.end = self.clock()
+
+    def summary(self):
+        """
+        Summarize the run.
+
+
+        :return: A dict with wall time, utilization (busy time over available worker time)
+                    and per-worker throughput (cost unit per second).
+        """
+
+        wall = (self.end or self.clock()) - self.begin
+        busy = sum(worker['busy_sec'] for worker in self.workers.values())
+        per_worker = {}
+        for pid, worker in sorted(self.workers.items()):
+            per_worker[pid] = dict(worker)
+            per_worker[pid]['throughput'] = worker['cost'] / worker['busy_sec'] if worker['busy_sec'] else 0.0
+        return {'wall_sec': wall,
+                'pool_process': self.pool_process,
+                'batches': sum(worker['batches'] for worker in self.workers.values()),
+                'utilization': busy / (wall * self.pool_process) if wall > 0 else 0.0,
+                'per_worker': per_worker}
+
+    def report(self):
+        """Return a human-readable utilization report."""
+        summary = self.summary()
+        lines = ['Pool utilization: {:.1%} of {} processes over {:.1f} s in {} batches'.format(
+            summary['utilization'], summary['pool_process'], summary['wall_sec'], summary['batches'])]
+        for pid, worker in summary['per_worker'].items():
+            lines.append('    pid {}: {} items in {} batches, busy {:.1f} s, {:.0f} cost/s'.format(
+                pid, worker['items'], worker['batches'], worker['busy_sec'], worker['throughput']))
+            if 'memory_before' in worker:
+                before, after = worker['memory_before'], worker['memory_after']
+                lines[-1] += ', RSS {} -> {} MB'.format(_format_mb(before['rss_mb']), _format_mb(after['rss_mb']))
+                if after['private_mb'] is not None:
+                    lines[-1] += ' (private {} -> {} MB, shared {} MB)'.format(
+                        _format_mb(before['private_mb']), _format_mb(after['private_mb']),
+                        _format_mb(after['shared_mb']))
+        return '\n'.join(lines)
+
+
+def _format_mb(value):
+    """Format a size in MB, which may be unknown."""
+    return '?' if value is None else '{:.0f}'.format(value)
+
+
+def open_pool(pool_process=None, pool_mode=None, preload_modules=None, profile=False, track_memory=False):
+    """
+    Open a multiprocessing Pool of processes initialized for imap_adaptive(), so that successive calls,
+    e.g. for chunks of a stream, share its processes.
+
+
+    :param pool_process: Number of parallel processes. Default: number of available CPUs.
+    :param pool_mode: Start method of pool processes - 'fork', 'forkserver' or 'spawn'.
+                        Default: the platform default.
+    :param preload_modules: Modules imported by the forkserver before it forks pool processes
+                        (pool_mode='forkserver' only).
+    :param profile: True will enable the stage profiler of pool processes.
+    :param track_memory: True will record memory usage of each pool process at start-up.
+    :return: multiprocessing Pool object - to be closed by the caller, e.g. by a with statement.
+    """
+
+    import os
+    import multiprocessing
+
+    context = multiprocessing.get_context(pool_mode)
+    if pool_mode == 'forkserver' and preload_modules:
+        context.set_forkserver_preload(preload_modules)
+    return context.Pool(processes=pool_process or os.cpu_count() or 1, initializer=_init_worker,
+                        initargs=(profile, track_memory))
+
+
+def imap_adaptive(func, items, cost_func=len, pool_process=None, batch_size=None,
+                  target_seconds=0.5, stats=None, profiler=None, pool_mode=None, preload_modules=None,
+                  track_memory=False, counters=None, pool=None):
+    """
+    Apply func to items in a multiprocessing Pool and yield results in input order.
+    Items are grouped into batches sized by estimated cost rather than by item count:
+    batches are sized from the observed throughput so that each takes about target_seconds,
+    and shrink as the remaining work runs out so that no worker is left with a straggler.
+    Batches are pulled by idle workers, so faster workers take on more of the work.
+
+
+    :param func: Function to be applied to each item - must be picklable.
+    :param items: A list of items.
+    :param cost_func: Function returning the estimated cost of an item, e.g. its character count.
+    :param pool_process: Number of parallel processes. Default: number of available CPUs.
+    :param batch_size: If provided, use fixed batches of batch_size items instead of cost-sized batches.
+    :param target_seconds: Targeted wall time of a batch.
+    :param stats: PoolStats object to be filled. If None, statistics are collected but not returned.
+    :param profiler: StageProfiler object into which stage counts of pool processes are merged.
+                        If None, pool processes do not profile.
+    :param pool_mode: Start method of pool processes - 'fork', 'forkserver' or 'spawn'.
+                        Default: the platform default.
+    :param preload_modules: Modules imported by the forkserver before it forks pool processes
+                        (pool_mode='forkserver' only).
+    :param track_memory: True will record memory usage of each pool process in stats.
+    :param counters: StageProfiler object into which event counts of pool processes (COUNTERS) are merged.
+    :param pool: Pool from open_pool() to run batches in, which is left open - it must have been opened with
+                        profile=True if profiler is provided. Default: a Pool is opened for this call
+                        with pool_process, pool_mode, preload_modules and track_memory.
+    :return: Generator of func(item) in the order of items.
+    """
+
+    import os
+    from queue import Queue
+    from contextlib import nullcontext
+
+    pool_process = pool_process or os.cpu_count() or 1
+    stats = stats if stats is not None else PoolStats(pool_process)
+    costs = [max(cost_func(item), 1) for item in items]
+    remaining_cost = sum(costs)
+    # until throughput is known, split the work into several batches per worker.
+    initial_cost = remaining_cost / (pool_process * 8) if remaining_cost else 1
+    throughput = None  # estimated cost per second of a worker.
+    next_index = 0
+
+    def next_batch():
+        nonlocal next_index, remaining_cost
+        if batch_size:
+            end = min(next_index + batch_size, len(items))
+        else:
+            target = throughput * target_seconds if throughput else initial_cost
+            target = min(target, remaining_cost / (2 * pool_process))  # guided: shrink towards the end.
+            end = next_index
+            batch_cost = 0
+            while end < len(items) and (end == next_index or batch_cost + costs[end] <= target):
+                batch_cost += costs[end]
+                end += 1
+        begin = next_index
+        next_index = end
+        remaining_cost -= sum(costs[begin:end])
+        return begin, end
+
+    if not items:
+        stats.stop()
+        return
+
+    done = Queue()
+    pending = {}
+    next_yield = 0
+    outstanding = 0
+    with nullcontext(pool) if pool is not None else \
+            open_pool(pool_process, pool_mode, preload_modules, profiler is not None, track_memory) as pool:
+        while next_index < len(items) or outstanding:
+            # keep two batches queued per worker so that no worker waits for the scheduler.
+            while next_index < len(items) and outstanding < 2 * pool_process:
+                begin, end = next_batch()
+                pool.apply_async(_run_batch, (func, begin, items[begin:end]),
+                                 callback=done.put, error_callback=done.put)
+                outstanding += 1
+
+            result = done.get()
+            outstanding -= 1
+            if isinstance(result, BaseException):
+                raise result
+            begin, results, pid, elapsed, profile, memory, counts = result
+            if profile:
+                profiler.merge(profile)
+            if counts and counters is not None:
+                counters.merge(counts)
+            batch_cost = sum(costs[begin:begin + len(results)])
+            stats.record(pid, elapsed, batch_cost, len(results), memory)
+            if elapsed > 0:  # exponential moving average of worker throughput.
+                rate = batch_cost / elapsed
+                throughput = rate if throughput is None else 0.7 * throughput + 0.3 * rate
+
+            # yield completed batches in input order.
+            pending[begin] = results
+            while next_yield in pending:
+                results = pending.pop(next_yield)
+                next_yield += len(results)
+                for ret in results:
+                    yield ret
+    stats.stop()
@@ -0,0 +1,444 @@
+_worker_state = {}  # per-process classifier and tokenizer parameters set by _init_worker.
+
+
+def _init_worker(classifier_filename, title_ngram, desc_ngram):
+    """
+    Load Classifier object into a pool process and warm it up
+    so that the first request does not pay for imports and dictionary loading.
+
+
+    :param classifier_filename: Path to the file containing Classifier object.
+    :param title_ngram: n-gram length for job title data.
+    :param desc_ngram: n-gram length for job description data.
+    :return: None
+    """
+
+    from src.classifier import Classifier
+
+    _worker_state['classifier'] = Classifier.read_pickle(classifier_filename)
+    _worker_state['ngram'] = {'title_ngram': title_ngram, 'desc_ngram': desc_ngram}
+    _classify_batch([{'title': 'warm up', 'desc': 'warm up'}])
+
+
+def _ping():
+    """No-op task used to start every pool process ahead of the first request."""
+    return True
+
+
+def _classify_batch(documents):
+    """
+    Tokenize and classify a batch of raw documents in a pool process.
+    A document failing to tokenize does not fail the others of the batch.
+
+
+    :param documents: A list of documents in dict format with keys: 'title' and 'desc'.
+    :return: (list of class names, numpy array of shape (number of documents, number of classifiers) - rows of
+                failed documents are undefined, a dict {index of a failed document: error message}).
+    """
+
+    import numpy as np
+    from src.tokenizer import tokenize_document
+
+    tokenized = []
+    errors = {}
+    for index, doc in enumerate(documents):
+        try:
+            tokenized.append(tokenize_document(doc, **_worker_state['ngram']))
+        except Exception as error:
+            errors[index] = type(error).__name__ + ': ' + str(error)
+    classifier = _worker_state['classifier']
+    if not tokenized:
+        classes = [clf.classes_[1] for clf in classifier.classifiers]
+        return classes, np.zeros((len(documents), len(classes))), errors
+    classes, proba = classifier.predict_proba_documents(tokenized)
+    if errors:
+        # put rows back at the position of their documents.
+        rows = [index for index in range(len(documents)) if index not in errors]
+        full = np.zeros((len(documents), proba.shape[1]))
+        full[rows] = proba
+        proba = full
+    return classes, proba, errors
+
+
+def validate_document(document):
+    """
+    Check that a request document can be classified.
+
+
+    :param document: A decoded json value.
+    :return: An error message, or None if the document is valid.
+    """
+
+    if type(document) is not dict:
+        return 'a document must be a json object'
+    for key in ('title', 'desc'):
+        if not isinstance(document.get(key), str):
+            return 'a document must have a string "' + key + '"'
+    return None
+
+
+def percentile(values, q):
+    """
+    Return the q-th percentile of values using nearest-rank method.
+
+
+    :param values: A list of numbers.
+    :param q: Percentile between 0 and 100.
+    :return: The q-th percentile or None if values is empty.
+    """
+
+    if not values:
+        return None
+    values = sorted(values)
+    rank = max(int(round(q / 100 * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+class ServiceMetrics:
+    """Latency and throughput metrics over a window of the most recent requests."""
+
+    def __init__(self, window=10000):
+        """
+        Init ServiceMetrics.
+
+
+        :param window: Number of the most recent request latencies used for percentiles.
+        """
+
+        from collections import deque
+        from time import perf_counter
+
+        self.clock = perf_counter
+        self.begin = perf_counter()
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_requests = 0
+
+    def record_request(self, latency, error=False):
+        """Record the latency (in seconds) of a completed request."""
+        self.latencies.append(latency)
+        self.requests += 1
+        if error:
+            self.errors += 1
+
+    def record_batch(self, size):
+        """Record the size of a batch sent to the pool."""
+        self.batches += 1
+        self.batched_requests += size
+
+    def summary(self):
+        """
+        Summarize metrics.
+
+
+        :return: A dict with request count, p50 and p99 latency (ms), throughput (requests/s)
+                    and mean batch size.
+        """
+
+        latencies = list(self.latencies)
+        elapsed = self.clock() - self.begin
+        p50 = percentile(latencies, 50)
+        p99 = percentile(latencies, 99)
+        return {'requests': self.requests,
+                'errors': self.errors,
+                'latency_p50_ms': p50 * 1000 if p50 is not None else None,
+                'latency_p99_ms': p99 * 1000 if p99 is not None else None,
+                'throughput_rps': self.requests / elapsed if elapsed > 0 else 0.0,
+                'batches': self.batches,
+                'mean_batch_size': self.batched_requests / self.batches if self.batches else 0.0,
+                'uptime_sec': elapsed}
+
+
+class ClassificationService:
+    """
+    Asyncio front end which accepts raw job postings over HTTP and classifies them in a pre-warmed pool.
+    Concurrent requests are micro-batched so that each pool task runs one batched predict_proba call
+    per classifier.
+    """
+
+    def __init__(self, classifier_filename, pool_process=None, max_batch=64, max_wait=0.005,
+                 thres=0.5, title_ngram=5, desc_ngram=4):
+        """
+        Init ClassificationService.
+
+
+        :param classifier_filename: Path to the file containing Classifier object.
+        :param pool_process: Number of pool processes. Default: number of available CPUs.
+        :param max_batch: Maximum number of documents in a batch.
+        :param max_wait: Maximum time (in seconds) to wait for a batch to fill up.
+        :param thres: probability threshold over which the document will be assigned a class.
+        :param title_ngram: n-gram length for job title data.
+        :param desc_ngram: n-gram length for job description data.
+        """
+
+        import os
+
+        self.classifier_filename = classifier_filename
+        self.pool_process = pool_process or os.cpu_count() or 1
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.thres = thres
+        self.ngram = (title_ngram, desc_ngram)
+        self.metrics = ServiceMetrics()
+        self.executor = None
+        self.queue = None
+        self.server = None
+        self._batch_task = None
+
+    async def start(self, host='127.0.0.1', port=8000, unix_path=None):
+        """
+        Start pool processes and listen on a TCP port or a Unix socket.
+
+
+        :param host: Host name to listen on.
+        :param port: TCP port to listen on.
+        :param unix_path: Path to a Unix socket. If provided, host and port are ignored.
+        :return: None
+        """
+
+        import asyncio
+        from concurrent.futures import ProcessPoolExecutor
+        from src.preload import preload
+
+        loop = asyncio.get_event_loop()
+        preload('tokenize', 'classify')  # import once in the parent so that pool processes share the modules.
+        self.executor = ProcessPoolExecutor(max_workers=self.pool_process, initializer=_init_worker,
+                                            initargs=(self.classifier_filename,) + self.ngram)
+        # start and warm up every pool process before accepting requests.
+        await asyncio.gather(*[loop.run_in_executor(self.executor, _ping) for _ in range(self.pool_process)])
+
+        self.queue = asyncio.Queue()
+        self._batch_task = asyncio.ensure_future(self._batch_loop())
+        if unix_path:
+            self.server = await asyncio.start_unix_server(self._handle_connection, path=unix_path)
+        else:
+            self.server = await asyncio.start_server(self._handle_connection, host=host, port=port)
+
+    async def close(self):
+        """Stop accepting requests and shut down pool processes."""
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        if self._batch_task:
+            self._batch_task.cancel()
+        if self.executor:
+            self.executor.shutdown()
+
+    async def classify(self, document):
+        """
+        Classify a raw document.
+
+
+        :param document: Document in dict format with keys: 'title' and 'desc'.
+        :return: A dict {'predicted': predicted class, 'proba': {class: probability}}.
+        """
+
+        import asyncio
+
+        future = asyncio.get_event_loop().create_future()
+        await self.queue.put((document, future, self.metrics.clock()))
+        return await future
+
+    async def _batch_loop(self):
+        """Collect queued requests into batches and dispatch them to the pool."""
+
+        import asyncio
+
+        loop = asyncio.get_event_loop()
+        # allow one batch in flight per pool process - while all are busy, requests accumulate in the queue.
+        free_process = asyncio.Semaphore(self.pool_process)
+        while True:
+            await free_process.acquire()
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            asyncio.ensure_future(self._run_batch(batch, free_process))
+
+    async def _run_batch(self, batch, free_process):
+        """Classify a batch in the pool and resolve the futures of its requests."""
+
+        import asyncio
+
+        loop = asyncio.get_event_loop()
+        self.metrics.record_batch(len(batch))
+        try:
+            classes, proba, errors = await loop.run_in_executor(self.executor, _classify_batch,
+                                                                [document for document, _, _ in batch])
+        except Exception as error:
+            for _, future, begin in batch:
+                self.metrics.record_request(self.metrics.clock() - begin, error=True)
+                if not future.done():
+                    future.set_exception(error)
+            return
+        finally:
+            free_process.release()
+
+        for index, (doc_proba, (_, future, begin)) in enumerate(zip(proba, batch)):
+            if index in errors:
+                self.metrics.record_request(self.metrics.clock() - begin, error=True)
+                if not future.done():
+                    future.set_exception(RuntimeError(errors[index]))
+                continue
+            # the default class 'None' has probability equals thres.
+            doc_class = {'None': self.thres}
+            doc_class.update(zip(classes, doc_proba.tolist()))
+            predicted = 'None'
+            for key in doc_class:
+                if doc_class[key] > doc_class[predicted]:
+                    predicted = key
+            self.metrics.record_request(self.metrics.clock() - begin)
+            if not future.done():
+                future.set_result({'predicted': predicted, 'proba': doc_class})
+
+    async def _respond(self, method, path, body):
+        """
+        Answer a request.
+
+
+        :param method: HTTP method.
+        :param path: Request path.
+        :param body: Request body in bytes.
+        :return: (HTTP status, object to be sent in json format).
+        """
+
+        import asyncio
+        import json
+
+        if method == 'GET' and path == '/metrics':
+            return '200 OK', self.metrics.summary()
+        if method != 'POST' or path != '/classify':
+            return '404 Not Found', {'error': 'unknown endpoint'}
+        try:
+            documents = json.loads(body.decode('utf-8'))
+        except ValueError:
+            return '400 Bad Request', {'error': 'invalid json'}
+
+        # validate every document before queueing any, so that bad input never reaches a batch.
+        for index, document in enumerate(documents if type(documents) is list else [documents]):
+            error = validate_document(document)
+            if error:
+                return '400 Bad Request', {'error': error, 'index': index}
+        if type(documents) is list:
+            return '200 OK', await asyncio.gather(*[self.classify(doc) for doc in documents])
+        return '200 OK', await self.classify(documents)
+
+    async def _handle_connection(self, reader, writer):
+        """
+        Serve HTTP/1.1 requests on a connection.
+        POST /classify accepts a document or a list of documents in json format with keys 'title' and 'desc' -
+        invalid input is answered with 400, an error while classifying with 500.
+        GET /metrics returns latency and throughput metrics.
+        """
+
+        import asyncio
+        import json
+
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                try:
+                    status, payload = await self._respond(method, path, body)
+                except Exception as error:  # the client always gets an answer.
+                    status, payload = '500 Internal Server Error', {'error': type(error).__name__ + ': ' + str(error)}
+
+                payload = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(('HTTP/1.1 ' + status + '\r\n'
+                              'Content-Type: application/json\r\n'
+                              'Content-Length: ' + str(len(payload)) + '\r\n'
+                              'Connection: ' + ('keep-alive' if keep_alive else 'close') + '\r\n'
+                              '\r\n').encode('latin-1') + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def request_service(connection, method, path, payload=None):
+    """
+    Send a request to ClassificationService on an open keep-alive connection.
+
+
+    :param connection: (reader, writer) pair from asyncio.open_connection or asyncio.open_unix_connection.
+    :param method: HTTP method.
+    :param path: Request path.
+    :param payload: Object to be sent in json format.
+    :return: Decoded json response.
+    """
+
+    import json
+
+    reader, writer = connection
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8') if payload is not None else b''
+    writer.write((method + ' ' + path + ' HTTP/1.1\r\n'
+                  'Content-Type: application/json\r\n'
+                  'Content-Length: ' + str(len(body)) + '\r\n'
+                  '\r\n').encode('latin-1') + body)
+    await writer.drain()
+
+    await reader.readline()  # status line
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        key, _, value = line.decode('latin-1').partition(':')
+        headers[key.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return json.loads(body.decode('utf-8'))
+
+
+def serve(classifier_filename, host='127.0.0.1', port=8000, unix_path=None, **kwargs):
+    """
+    Run ClassificationService until interrupted.
+
+
+    :param classifier_filename: Path to the file containing Classifier object.
+    :param host: Host name to listen on.
+    :param port: TCP port to listen on.
+    :param unix_path: Path to a Unix socket. If provided, host and port are ignored.
+    :param kwargs: Keyword arguments of ClassificationService.
+    :return: None
+    """
+
+    import asyncio
+
+    service = ClassificationService(classifier_filename, **kwargs)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(service.start(host, port, unix_path))
+    print('Classification service listening on ' + (unix_path or host + ':' + str(port)))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(service.close())
+        print(service.metrics.summary())
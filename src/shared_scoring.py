@@ -0,0 +1,169 @@
+def stack_weights(classifier):
+    """
+    Stack the classifiers of a Classifier object into one weight matrix, so that the positive class probability
+    of every classifier is sigmoid(data_vec @ weights + bias). It is exact for binary naive Bayes
+    (log-likelihood ratio of the two classes) and logistic regression.
+
+
+    :param classifier: Classifier object.
+    :return: (list of class names, numpy float64 array of weights of shape (number of features,
+                number of classifiers), numpy float64 array of biases of shape (number of classifiers,)).
+    """
+
+    import numpy as np
+
+    columns = []
+    biases = []
+    for clf in classifier.classifiers:
+        if hasattr(clf, 'feature_log_prob_'):
+            columns.append(clf.feature_log_prob_[1] - clf.feature_log_prob_[0])
+            biases.append(clf.class_log_prior_[1] - clf.class_log_prior_[0])
+        elif hasattr(clf, 'coef_') and hasattr(clf, 'intercept_'):
+            columns.append(np.ravel(clf.coef_))
+            biases.append(float(np.ravel(clf.intercept_)[0]))
+        else:
+            raise ValueError('cannot stack weights of ' + type(clf).__name__)
+    classes = [clf.classes_[1] for clf in classifier.classifiers]
+    return classes, np.ascontiguousarray(np.column_stack(columns), dtype=np.float64), np.array(biases)
+
+
+def share_arrays(arrays):
+    """
+    Copy numpy arrays into new shared memory blocks.
+
+
+    :param arrays: A dict {name: numpy array}.
+    :return: (list of SharedMemory objects - to be closed and unlinked by the caller,
+                a dict {name: (block name, shape, dtype)} to be passed on to attach_arrays()).
+    """
+
+    import numpy as np
+    from multiprocessing import shared_memory
+
+    blocks = []
+    specs = {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        blocks.append(block)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        specs[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, specs
+
+
+def attach_arrays(specs):
+    """
+    Attach shared memory blocks created by share_arrays() as numpy arrays, without copying.
+
+
+    :param specs: A dict {name: (block name, shape, dtype)} from share_arrays().
+    :return: (list of SharedMemory objects - to be kept alive while the arrays are in use,
+                a dict {name: numpy array}).
+    """
+
+    import os
+    import numpy as np
+    from multiprocessing import shared_memory, resource_tracker
+
+    # before Python 3.13, attaching registers a block with the resource tracker of the process. Pool processes
+    # share the tracker of their parent, but a process with a tracker of its own would have it unlink the blocks
+    # when the process exits, while the creator still uses them - they are unregistered there.
+    own_tracker = os.name == 'posix' and getattr(resource_tracker._resource_tracker, '_fd', None) is None
+    blocks = []
+    arrays = {}
+    for name, (block_name, shape, dtype) in specs.items():
+        try:
+            block = shared_memory.SharedMemory(name=block_name, track=False)  # the creator unlinks it.
+        except TypeError:  # Python < 3.13 has no track argument.
+            block = shared_memory.SharedMemory(name=block_name)
+            if own_tracker:
+                resource_tracker.unregister(block._name, 'shared_memory')
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    return blocks, arrays
+
+
+_shared = {}  # shared arrays attached in a pool process, set by _init_shared.
+
+
+def _init_shared(specs, n_features, track_memory=False):
+    """Attach shared arrays in a pool process."""
+    _shared['blocks'], _shared['arrays'] = attach_arrays(specs)
+    _shared['n_features'] = n_features
+    _shared['track_memory'] = track_memory
+
+
+def _score_rows(row_range):
+    """
+    Score a range of rows of the shared CSR matrix and write probabilities into the shared output array.
+
+
+    :param row_range: (first row, row after the last row).
+    :return: (process id, memory usage of the process (see memory_usage) or None)
+                - results are in the shared output array.
+    """
+
+    import os
+    import numpy as np
+    from scipy.sparse import csr_matrix
+
+    begin, end = row_range
+    arrays = _shared['arrays']
+    indptr = arrays['indptr'][begin:end + 1]
+    # views of the rows in shared memory - only indptr is rebased into a small private copy.
+    data_vec = csr_matrix((arrays['data'][indptr[0]:indptr[-1]], arrays['indices'][indptr[0]:indptr[-1]],
+                           indptr - indptr[0]), shape=(end - begin, _shared['n_features']), copy=False)
+    scores = data_vec @ arrays['weights'] + arrays['bias']
+    arrays['proba'][begin:end] = 1 / (1 + np.exp(-scores))
+    if _shared['track_memory']:
+        from src.preload import memory_usage
+        return os.getpid(), memory_usage()
+    return os.getpid(), None
+
+
+def predict_proba_shared(classifier, documents=None, data_vec=None, pool_process=None, rows_per_task=None,
+                         memory=None):
+    """
+    Predict the positive class probability of every classifier in parallel processes sharing memory.
+    The CSR feature matrix, the stacked weights and the output are placed in shared memory blocks which pool
+    processes attach without copying; each task scores a disjoint range of rows. Memory of pool processes
+    therefore does not grow with the number of documents or classifiers.
+
+
+    :param classifier: Classifier object whose classifiers can be stacked (see stack_weights).
+    :param documents: A list of documents in dict format with keys 'title_seg' and 'desc_seg'.
+    :param data_vec: scipy CSR matrix of features, e.g. from Classifier._extract_features - instead of documents.
+    :param pool_process: Number of parallel processes. Default: number of available CPUs.
+    :param rows_per_task: Number of rows scored by a task. Default: rows are split into 4 tasks per process.
+    :param memory: A dict into which memory usage of each pool process {pid: memory usage} is written.
+    :return: (list of class names, numpy array of shape (number of documents, number of classifiers)).
+    """
+
+    import os
+    import numpy as np
+    from multiprocessing import Pool
+
+    if data_vec is None:
+        data_vec = classifier._extract_features(documents)
+    data_vec = data_vec.tocsr()
+    classes, weights, bias = stack_weights(classifier)
+    n_rows = data_vec.shape[0]
+    pool_process = pool_process or os.cpu_count() or 1
+    rows_per_task = rows_per_task or max(-(-n_rows // (pool_process * 4)), 1)
+
+    blocks, specs = share_arrays({'data': data_vec.data, 'indices': data_vec.indices, 'indptr': data_vec.indptr,
+                                  'weights': weights, 'bias': bias,
+                                  'proba': np.empty((n_rows, len(classes)), dtype=np.float64)})
+    try:
+        with Pool(processes=pool_process, initializer=_init_shared,
+                  initargs=(specs, data_vec.shape[1], memory is not None)) as pool:
+            for pid, usage in pool.imap_unordered(_score_rows, [(begin, min(begin + rows_per_task, n_rows))
+                                                                for begin in range(0, n_rows, rows_per_task)]):
+                if memory is not None:
+                    memory[pid] = usage
+        proba = np.ndarray((n_rows, len(classes)), dtype=np.float64, buffer=blocks[-1].buf).copy()
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return classes, proba
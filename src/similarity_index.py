@@ -0,0 +1,233 @@
+"""
+Approximate nearest-neighbour search of similar postings by cosine similarity of their TF-IDF vectors.
+Vectors are hashed by random hyperplane (sign random projection) signatures into several tables; postings
+sharing a bucket with a query in any table are candidates, ranked by exact cosine similarity.
+"""
+
+
+def posting_vectors(vectorizer, documents):
+    """
+    Stack title and description TF-IDF vectors of documents (see Classifier._extract_features) and
+    normalize them, so that the cosine similarity of two postings is the dot product of their vectors.
+
+
+    :param vectorizer: VectorizerTFIDF object.
+    :param documents: A list of documents in dict format with keys 'title_seg' and 'desc_seg'.
+    :return: scipy.sparse.csr_matrix of float32.
+    """
+
+    import numpy as np
+    from sklearn.preprocessing import normalize
+    from src.classifier import Classifier
+
+    return normalize(Classifier(vectorizer)._extract_features(documents)).astype(np.float32)
+
+
+class SimilarityIndex:
+    """
+    Index of normalized sparse vectors for top-k cosine similarity queries.
+    Each of n_tables tables keys a vector by n_bits signs of its projections onto random hyperplanes; the
+    inverted index of a table is the vector rows sorted by key, so that a bucket is found by binary search.
+    The index is saved as a directory of numpy arrays which load() maps into memory.
+    """
+
+    def __init__(self, projection, vectors, sorted_keys, order):
+        """
+        Init SimilarityIndex - use build() or load().
+
+
+        :param projection: int8 array of random signs of shape (number of features, n_tables * n_bits).
+        :param vectors: scipy.sparse.csr_matrix of normalized vectors.
+        :param sorted_keys: int64 array of shape (n_tables, number of vectors) - keys of each table in order.
+        :param order: array of shape (n_tables, number of vectors) - rows of each table sorted by key.
+        """
+
+        self.projection = projection
+        self.vectors = vectors
+        self.sorted_keys = sorted_keys
+        self.order = order
+        self.n_tables = sorted_keys.shape[0]
+        self.n_bits = projection.shape[1] // self.n_tables
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @classmethod
+    def build(cls, vectors, n_tables=16, n_bits=16, seed=0):
+        """
+        Build an index.
+
+
+        :param vectors: scipy sparse matrix of vectors, e.g. from posting_vectors() - rows are normalized.
+        :param n_tables: Number of hash tables. More tables find more of the true neighbours.
+        :param n_bits: Number of bits of a key (at most 62). More bits make buckets smaller and queries faster.
+        :param seed: Seed of the random hyperplanes.
+        :return: SimilarityIndex object.
+        """
+
+        import numpy as np
+        from sklearn.preprocessing import normalize
+
+        if not 0 < n_bits <= 62:
+            raise ValueError('n_bits must be between 1 and 62')
+        vectors = normalize(vectors.tocsr()).astype(np.float32)
+        rand = np.random.RandomState(seed)
+        projection = np.where(rand.randint(0, 2, size=(vectors.shape[1], n_tables * n_bits)), 1, -1)
+        projection = projection.astype(np.int8)
+        index = cls(projection, vectors, np.zeros((n_tables, 0), dtype=np.int64), np.zeros((n_tables, 0)))
+
+        keys = index._keys(vectors)
+        order = np.argsort(keys, axis=0, kind='stable').T
+        index.order = np.ascontiguousarray(order, dtype=np.int32 if len(keys) < 2 ** 31 else np.int64)
+        index.sorted_keys = np.take_along_axis(keys, order.T, axis=0).T.copy()
+        return index
+
+    def _keys(self, vectors, batch_size=10000):
+        """Return int64 keys of shape (number of vectors, n_tables)."""
+        import numpy as np
+
+        n_rows = vectors.shape[0]
+        keys = np.empty((n_rows, self.n_tables), dtype=np.int64)
+        weights = np.left_shift(1, np.arange(self.n_bits, dtype=np.int64))
+        for table in range(self.n_tables):
+            # one table at a time, so that only its hyperplanes are converted to float.
+            hyperplanes = self.projection[:, table * self.n_bits:(table + 1) * self.n_bits].astype(np.float32)
+            for begin in range(0, n_rows, batch_size):
+                signs = np.asarray(vectors[begin:begin + batch_size] @ hyperplanes) > 0
+                keys[begin:begin + batch_size, table] = signs @ weights
+        return keys
+
+    def _candidates(self, keys, max_candidates):
+        """
+        Find candidate rows sharing a bucket with a query in any table.
+
+
+        :param keys: int64 keys of a query, one per table.
+        :param max_candidates: Maximum number of candidates - those sharing buckets in most tables are kept.
+                                It also bounds the rows taken from a single bucket.
+        :return: int64 array of rows.
+        """
+
+        import numpy as np
+
+        hits = []
+        for table in range(self.n_tables):
+            bucket = self.sorted_keys[table]
+            begin = np.searchsorted(bucket, keys[table], 'left')
+            end = np.searchsorted(bucket, keys[table], 'right')
+            hits.append(self.order[table][begin:min(end, begin + max_candidates)])
+        rows, collisions = np.unique(np.concatenate(hits).astype(np.int64), return_counts=True)
+        if len(rows) > max_candidates:
+            rows = rows[np.argpartition(-collisions, max_candidates - 1)[:max_candidates]]
+        return rows
+
+    def query(self, vectors, k=10, max_candidates=1000, exclude=None):
+        """
+        Find the k most similar indexed vectors of each of a batch of query vectors.
+
+
+        :param vectors: scipy sparse matrix of query vectors with the features of the index,
+                        e.g. from posting_vectors().
+        :param k: Number of similar vectors.
+        :param max_candidates: Maximum number of candidates ranked by exact cosine similarity per query.
+        :param exclude: A sequence of one row to leave out of the result of each query, e.g. the query itself,
+                        or None.
+        :return: (int64 array of rows of shape (number of queries, k) - -1 where fewer than k are found,
+                    float32 array of cosine similarities of the same shape - in decreasing order).
+        """
+
+        import numpy as np
+        from sklearn.preprocessing import normalize
+
+        vectors = normalize(vectors.tocsr()).astype(np.float32)
+        n_queries = vectors.shape[0]
+        keys = self._keys(vectors)
+        rows = np.full((n_queries, k), -1, dtype=np.int64)
+        similarities = np.zeros((n_queries, k), dtype=np.float32)
+        dense = np.zeros(self.vectors.shape[1], dtype=np.float32)
+        for query in range(n_queries):
+            candidates = self._candidates(keys[query], max_candidates)
+            if exclude is not None:
+                candidates = candidates[candidates != exclude[query]]
+            if not len(candidates):
+                continue
+            # cosine similarity of the candidates against the query scattered into a dense vector.
+            row = vectors[query]
+            dense[row.indices] = row.data
+            scores = self.vectors[candidates] @ dense
+            dense[row.indices] = 0
+            top = np.argsort(-scores, kind='stable')[:k] if len(scores) <= k \
+                else np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind='stable')]
+            rows[query, :len(top)] = candidates[top]
+            similarities[query, :len(top)] = scores[top]
+        return rows, similarities
+
+    def neighbours(self, rows, k=10, max_candidates=1000):
+        """
+        Find the k most similar other indexed vectors of indexed rows, e.g. for duplicate review.
+
+
+        :param rows: A sequence of rows of the index.
+        :param k: Number of similar vectors.
+        :param max_candidates: Maximum number of candidates per query (see query).
+        :return: See query().
+        """
+
+        import numpy as np
+
+        rows = np.asarray(rows, dtype=np.int64)
+        return self.query(self.vectors[rows], k, max_candidates, exclude=rows)
+
+    def nbytes(self):
+        """Return the size of the index arrays in bytes."""
+        return sum(array.nbytes for array in (self.projection, self.sorted_keys, self.order, self.vectors.data,
+                                              self.vectors.indices, self.vectors.indptr))
+
+    def save(self, index_dir):
+        """
+        Save the index into a directory.
+
+
+        :param index_dir: Path to the directory.
+        :return: None
+        """
+
+        import os
+        import json
+        import numpy as np
+
+        os.makedirs(index_dir, exist_ok=True)
+        arrays = {'projection': self.projection, 'sorted_keys': self.sorted_keys, 'order': self.order,
+                  'data': self.vectors.data, 'indices': self.vectors.indices, 'indptr': self.vectors.indptr}
+        for name, array in arrays.items():
+            np.save(os.path.join(index_dir, name + '.npy'), array)
+        # meta.json is written last - a directory without it is an incomplete index.
+        with open(os.path.join(index_dir, 'meta.json'), 'wt', encoding='utf-8') as f_meta:
+            json.dump({'n_vectors': len(self), 'n_features': self.vectors.shape[1],
+                       'n_tables': self.n_tables, 'n_bits': self.n_bits}, f_meta)
+
+    @classmethod
+    def load(cls, index_dir, mmap=True):
+        """
+        Load an index saved by save().
+
+
+        :param index_dir: Path to the directory.
+        :param mmap: True maps arrays into memory instead of reading them, so that opening a large index is
+                        immediate and processes opening the same index share its pages.
+        :return: SimilarityIndex object.
+        """
+
+        import os
+        import json
+        import numpy as np
+        from scipy.sparse import csr_matrix
+
+        with open(os.path.join(index_dir, 'meta.json'), 'rt', encoding='utf-8') as f_meta:
+            meta = json.load(f_meta)
+        arrays = {name: np.load(os.path.join(index_dir, name + '.npy'), mmap_mode='r' if mmap else None)
+                  for name in ('projection', 'sorted_keys', 'order', 'data', 'indices', 'indptr')}
+        vectors = csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']),
+                             shape=(meta['n_vectors'], meta['n_features']), copy=False)
+        return cls(arrays['projection'], vectors, arrays['sorted_keys'], arrays['order'])
@@ -0,0 +1,398 @@
+def _write_values(out_dir, name, encoded_values, n_rows):
+    """Write encoded values of a column as concatenated bytes with int64 offsets."""
+    import os
+    import numpy as np
+
+    offsets = np.zeros(n_rows + 1, dtype=np.int64)
+    with open(os.path.join(out_dir, name + '.bytes'), 'wb') as f_bytes:
+        for row, encoded in enumerate(encoded_values):
+            f_bytes.write(encoded)
+            offsets[row + 1] = offsets[row] + len(encoded)
+    np.save(os.path.join(out_dir, name + '.offsets.npy'), offsets)
+
+
+def convert_to_columnar(data_filename, out_dir, text_columns=('title', 'desc'), category_columns=('predict', 'tag')):
+    """
+    Convert a pandas DataFrame pickle into a columnar directory which ColumnarData opens memory-mapped.
+    Text columns are stored as concatenated UTF-8 bytes with int64 offsets, category columns as int32 codes.
+    Missing values are stored as '' and None respectively. Every other column, and the index of the DataFrame,
+    is stored as pickled values with offsets, so that exported tags keep all columns of the source data.
+
+
+    :param data_filename: Path to a pickle file of a pandas DataFrame.
+    :param out_dir: Path to the output directory.
+    :param text_columns: Names of free text columns - those missing from the DataFrame are skipped.
+    :param category_columns: Names of columns with few distinct values, used for filtering.
+    :return: None
+    """
+
+    import os
+    import json
+    import pickle
+    import numpy as np
+    import pandas
+
+    data = pandas.read_pickle(data_filename)
+    os.makedirs(out_dir, exist_ok=True)
+    # columns are kept in the order of the DataFrame, with their dtypes to be restored on export.
+    meta = {'n_rows': len(data), 'columns': {},
+            'dtypes': {str(column): str(dtype) for column, dtype in data.dtypes.items()}}
+
+    for column in data.columns:
+        name = str(column)
+        if column in text_columns:
+            _write_values(out_dir, name, (value.encode('utf-8') if isinstance(value, str) else b''
+                                          for value in data[column].values), len(data))
+            meta['columns'][name] = {'kind': 'text'}
+        elif column in category_columns:
+            values = data[column].where(data[column].notnull(), None).values
+            categories = sorted({str(value) for value in values if value is not None})
+            code_of = {category: code for code, category in enumerate(categories)}
+            codes = np.fromiter((code_of[str(value)] if value is not None else -1 for value in values),
+                                dtype=np.int32, count=len(values))
+            np.save(os.path.join(out_dir, name + '.codes.npy'), codes)
+            meta['columns'][name] = {'kind': 'category', 'categories': categories}
+        else:
+            _write_values(out_dir, name, (pickle.dumps(value) for value in data[column].values), len(data))
+            meta['columns'][name] = {'kind': 'object'}
+    _write_values(out_dir, '.index', (pickle.dumps(value) for value in data.index), len(data))
+    meta['index'] = '.index'
+
+    # meta.json is written last - a directory without it is an incomplete conversion.
+    with open(os.path.join(out_dir, 'meta.json'), 'wt', encoding='utf-8') as f_meta:
+        json.dump(meta, f_meta, ensure_ascii=False)
+
+
+class ColumnarData:
+    """
+    Read-only, memory-mapped view of a directory written by convert_to_columnar().
+    Opening it reads no rows; fetching a row reads only the bytes of that row, whatever the size of the file.
+    """
+
+    def __init__(self, data_dir):
+        """
+        Open a columnar directory.
+
+
+        :param data_dir: Path to a directory written by convert_to_columnar().
+        """
+
+        import os
+        import json
+        import numpy as np
+
+        with open(os.path.join(data_dir, 'meta.json'), 'rt', encoding='utf-8') as f_meta:
+            self.meta = json.load(f_meta)
+        self.n_rows = self.meta['n_rows']
+        self._bytes = {}  # {column: (bytes, offsets)} of text and object columns.
+        self._codes = {}
+        # directories converted before the index was stored have none.
+        names = list(self.meta['columns']) + ([self.meta['index']] if 'index' in self.meta else [])
+        for column in names:
+            if column in self.meta['columns'] and self.meta['columns'][column]['kind'] == 'category':
+                self._codes[column] = np.load(os.path.join(data_dir, column + '.codes.npy'), mmap_mode='r')
+                continue
+            filename = os.path.join(data_dir, column + '.bytes')
+            offsets = np.load(os.path.join(data_dir, column + '.offsets.npy'), mmap_mode='r')
+            # np.memmap cannot map an empty file.
+            values = np.memmap(filename, dtype=np.uint8, mode='r') if offsets[-1] else np.zeros(0, np.uint8)
+            self._bytes[column] = (values, offsets)
+
+    def __len__(self):
+        return self.n_rows
+
+    @property
+    def columns(self):
+        return list(self.meta['columns'])
+
+    def _decode(self, column, row):
+        values, offsets = self._bytes[column]
+        return bytes(values[offsets[row]:offsets[row + 1]])
+
+    def value(self, column, row):
+        """Return the value of a column in a row."""
+        import pickle
+        if column in self._bytes:
+            encoded = self._decode(column, row)
+            return encoded.decode('utf-8') if self.meta['columns'][column]['kind'] == 'text' else pickle.loads(encoded)
+        code = int(self._codes[column][row])
+        return self.meta['columns'][column]['categories'][code] if code >= 0 else None
+
+    def record(self, row):
+        """Return a row as a dict {column: value}."""
+        return {column: self.value(column, row) for column in self.columns}
+
+    def index(self, row):
+        """Return the index label of a row in the source DataFrame - the row itself if it was not stored."""
+        import pickle
+        return pickle.loads(self._decode(self.meta['index'], row)) if 'index' in self.meta else row
+
+    def select(self, filter_value=None, filter_column='predict', begin=None, end=None, sampling=1.0, seed=None):
+        """
+        Select row indices by range, filter and random sampling without reading text columns.
+
+
+        :param filter_value: Keep rows whose filter_column equals this value. Default: keep all rows.
+        :param filter_column: A category column.
+        :param begin: First row of the range.
+        :param end: Row after the last row of the range.
+        :param sampling: int - number of rows to sample; float - fraction of rows to sample.
+        :param seed: Seed of the random number generator.
+        :return: numpy int64 array of row indices, in random order if sampled.
+        """
+
+        import numpy as np
+
+        rows = np.arange(self.n_rows, dtype=np.int64)[begin:end]
+        if filter_value is not None:
+            categories = self.meta['columns'][filter_column]['categories']
+            if filter_value not in categories:
+                return rows[:0]
+            rows = rows[np.asarray(self._codes[filter_column][rows]) == categories.index(filter_value)]
+
+        if type(sampling) is int:
+            size = min(sampling, len(rows))
+        elif type(sampling) is float:
+            size = int(round(len(rows) * sampling))
+        else:
+            raise ValueError('invalid sampling parameter')
+        return np.random.RandomState(seed).choice(rows, size=size, replace=False)
+
+
+class TagJournal:
+    """
+    Append-only journal of a tagging session. The first line holds the selected row indices; each tag is
+    appended and flushed to disk as it is entered, so that a session can be resumed after a crash.
+    """
+
+    def __init__(self, filename):
+        """
+        Open (or create) a journal and read the selection and tags recorded so far.
+
+
+        :param filename: Path to the journal file.
+        """
+
+        import os
+        import json
+
+        self.filename = filename
+        self.selection = None
+        self.tags = {}  # {row index: tag} - the last entry of a row wins.
+        if os.path.exists(filename):
+            with open(filename, 'rt', encoding='utf-8') as f_journal:
+                for line in f_journal:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # a line cut short by a crash.
+                    if 'selection' in entry:
+                        self.selection = entry['selection']
+                    else:
+                        self.tags[entry['row']] = entry['tag']
+        self._file = open(filename, 'at', encoding='utf-8')
+
+    def _append(self, entry):
+        import os
+        import json
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def start(self, selection):
+        """Record the selected row indices of a new session."""
+        self.selection = [int(row) for row in selection]
+        self._append({'selection': self.selection})
+
+    def record(self, row, tag):
+        """Record the tag of a row."""
+        self.tags[int(row)] = tag
+        self._append({'row': int(row), 'tag': tag})
+
+    def close(self):
+        self._file.close()
+
+
+def export_tags(data, journal, out_filename):
+    """
+    Write tagged rows into a pandas DataFrame pickle, in the order of the selection.
+    Rows keep every column of the source DataFrame, with its dtype where the values allow it, and its index.
+
+
+    :param data: ColumnarData object.
+    :param journal: TagJournal object.
+    :param out_filename: Path to the output pickle file.
+    :return: pandas DataFrame of tagged rows with their original columns and column 'tag'.
+    """
+
+    import pandas
+
+    rows = [row for row in journal.selection if row in journal.tags]
+    records = []
+    for row in rows:
+        record = data.record(row)
+        record['tag'] = journal.tags[row]
+        records.append(record)
+    columns = data.columns + ([] if 'tag' in data.columns else ['tag'])
+    tagged = pandas.DataFrame(records, index=[data.index(row) for row in rows], columns=columns)
+    for column, dtype in data.meta.get('dtypes', {}).items():
+        if column != 'tag' and str(tagged[column].dtype) != dtype:
+            try:
+                tagged[column] = tagged[column].astype(dtype)
+            except (TypeError, ValueError):
+                pass  # e.g. missing values of an integer column - the values are kept as they are.
+    tagged.to_pickle(out_filename)
+    return tagged
+
+
+def uncertainty(proba, thres=0.5):
+    """
+    Score how uncertain the classifier bank is about documents - lower is more uncertain.
+    A document is uncertain when a probability is close to thres or when its two highest probabilities
+    are close to each other.
+
+
+    :param proba: numpy array of positive class probabilities of shape (number of documents, number of classes).
+    :param thres: probability threshold over which the document will be assigned a class.
+    :return: numpy array of scores, one for each document.
+    """
+
+    import numpy as np
+
+    distance = np.abs(proba - thres).min(axis=1)
+    if proba.shape[1] < 2:
+        return distance
+    top_two = -np.partition(-proba, 1, axis=1)[:, :2]
+    return np.minimum(distance, top_two[:, 0] - top_two[:, 1])
+
+
+class UncertaintyQueue:
+    """
+    Active-learning queue serving the postings the classifier bank is least certain about first.
+    The whole selection is scored before the first posting is served, so that the first posting is the most
+    uncertain of the selection. Labels update classifiers supporting partial_fit (e.g. MultinomialNB) and the
+    most uncertain queued rows are re-scored every rescore_every labels.
+    """
+
+    def __init__(self, classifier, fetch, thres=0.5, batch_size=256, rescore_every=20,
+                 ignore_tags=(None, 'not sure'), max_features=10000):
+        """
+        Init UncertaintyQueue.
+
+
+        :param classifier: Classifier object - its classifiers are updated in place by label().
+        :param fetch: Function returning a list of tokenized documents (keys 'title_seg' and 'desc_seg')
+                        from a list of row indices.
+        :param thres: probability threshold over which the document will be assigned a class.
+        :param batch_size: Number of rows fetched and scored at a time.
+        :param rescore_every: Number of labels after which queued rows are re-scored.
+        :param ignore_tags: Tags which do not update classifiers.
+        :param max_features: Maximum number of rows whose feature vectors are kept - those of the most uncertain
+                        rows. Only these rows update classifiers when labelled and are re-scored;
+                        the others keep their first score.
+        """
+
+        from collections import deque
+
+        self.classifier = classifier
+        self.fetch = fetch
+        self.thres = thres
+        self.batch_size = batch_size
+        self.rescore_every = rescore_every
+        self.ignore_tags = ignore_tags
+        self.max_features = max_features
+        self.pending = deque()  # rows not scored yet.
+        self.heap = []  # [(score, row)] of scored rows not served yet.
+        self.features = None  # scipy.sparse.csr_matrix of kept feature vectors.
+        self.positions = {}  # {row: position in features} of kept rows not labelled yet.
+        self._scores = {}  # {row: latest score} of kept rows.
+        self.n_updates = 0
+
+    def _proba(self, data_vec):
+        import numpy as np
+        return np.column_stack([clf.predict_proba(data_vec)[:, 1] for clf in self.classifier.classifiers])
+
+    def extend(self, rows):
+        """Add rows to be scored."""
+        self.pending.extend(int(row) for row in rows)
+
+    def _keep_features(self, rows, data_vec, scores):
+        """Keep feature vectors of the max_features most uncertain rows among kept rows and new rows."""
+        import numpy as np
+        from scipy.sparse import vstack
+
+        kept_rows = list(self.positions)
+        if kept_rows:
+            data_vec = vstack([self.features[[self.positions[row] for row in kept_rows]], data_vec], format='csr')
+            scores = np.concatenate([[self._scores[row] for row in kept_rows], scores])
+            rows = kept_rows + list(rows)
+        keep = np.argsort(scores, kind='stable')[:self.max_features]
+        self.features = data_vec[keep]
+        self.positions = {rows[index]: position for position, index in enumerate(keep)}
+
+    def score_all(self):
+        """Score every pending row, batch by batch, and push them onto the heap."""
+        import heapq
+        while self.pending:
+            rows = [self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))]
+            data_vec = self.classifier._extract_features(self.fetch(rows))
+            scores = uncertainty(self._proba(data_vec), self.thres)
+            for row, score in zip(rows, scores):
+                heapq.heappush(self.heap, (float(score), row))
+            self._scores.update(zip(rows, scores.tolist()))
+            self._keep_features(rows, data_vec, scores)
+            self._scores = {row: self._scores[row] for row in self.positions}
+
+    def _rescore(self):
+        """Re-score queued rows with kept features with the updated classifiers."""
+        import heapq
+        rows = [row for _, row in self.heap if row in self.positions]
+        if not rows:
+            return
+        scores = uncertainty(self._proba(self.features[[self.positions[row] for row in rows]]), self.thres)
+        self._scores.update(zip(rows, scores.tolist()))
+        rescored = set(rows)
+        self.heap = [(score, row) for score, row in self.heap if row not in rescored] + \
+            [(float(score), row) for row, score in zip(rows, scores)]
+        heapq.heapify(self.heap)
+
+    def pop(self):
+        """
+        Serve the most uncertain row - pending rows are all scored first.
+
+
+        :return: (row index, uncertainty score) or None if no row is left.
+        """
+
+        import heapq
+        if self.pending:
+            self.score_all()
+        if not self.heap:
+            return None
+        score, row = heapq.heappop(self.heap)
+        return row, score
+
+    def label(self, row, tag):
+        """
+        Update classifiers with the tag of a served row: it is positive for the classifier of its class
+        and negative for the others.
+
+
+        :param row: Row index returned by pop().
+        :param tag: Tag of the row.
+        :return: None
+        """
+
+        position = self.positions.pop(row, None)
+        if position is None or tag in self.ignore_tags:
+            return
+        data_vec = self.features[position]
+        updated = False
+        for clf in self.classifier.classifiers:
+            if hasattr(clf, 'partial_fit'):
+                clf.partial_fit(data_vec, [clf.classes_[1] if clf.classes_[1] == tag else clf.classes_[0]])
+                updated = True
+        if updated:
+            self.n_updates += 1
+            if self.n_updates % self.rescore_every == 0:
+                self._rescore()
@@ -0,0 +1,148 @@
+def _file_digest(filename):
+    """
+    Return the sha1 hex digest of a file's content, or None if no file is given.
+    As the resource loaders of the tokenizer, a file which is not found is looked up at '.' + filename.
+    """
+    import hashlib
+    if not filename:
+        return None
+    digest = hashlib.sha1()
+    try:
+        f_in = open(filename, 'rb')
+    except FileNotFoundError:
+        f_in = open('.' + filename, 'rb')
+    with f_in:
+        for block in iter(lambda: f_in.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def tokenizer_config(title_ngram=5, desc_ngram=4,
+                     char_set_filename='./Resource/misc/charset',
+                     stop_en_filename='./Resource/WordList/stopwords_en_.txt',
+                     stop_th_filename=None, keywords_filename=None, limits=None):
+    """
+    Describe a tokenizer configuration - defaults are those of wrapper_tokenize_doc().
+    Resource files are identified by the digest of their content and the tokenizer by the digest of its source
+    and of the modules building its resources (src/resources.py, src/keyword_matcher.py), so that editing a word
+    list or the tokenizer changes the configuration.
+
+
+    :param title_ngram: n-gram length for job title data.
+    :param desc_ngram: n-gram length for job description data.
+    :param char_set_filename: Path to a text file containing a valid character set.
+    :param stop_en_filename: Path to txt file containing English stop word.
+    :param stop_th_filename: Path to txt file containing Thai stop word.
+    :param keywords_filename: Path to txt file containing keywords.
+    :param limits: Per-field limits of the tokenizer (see TOKENIZE_LIMITS). Default: no limit.
+    :return: A dict describing the configuration.
+    """
+
+    import src.tokenizer
+    import src.resources
+    import src.keyword_matcher
+
+    return {'title_ngram': title_ngram, 'desc_ngram': desc_ngram,
+            'limits': limits,
+            'charset': _file_digest(char_set_filename),
+            'stopwords_en': _file_digest(stop_en_filename),
+            'stopwords_th': _file_digest(stop_th_filename),
+            'keywords': _file_digest(keywords_filename),
+            'tokenizer': _file_digest(src.tokenizer.__file__),
+            'resources': _file_digest(src.resources.__file__),
+            'keyword_matcher': _file_digest(src.keyword_matcher.__file__)}
+
+
+class TokenStore:
+    """
+    Persistent store of tokenized documents in an SQLite file, keyed by content hash of 'title' and 'desc'
+    (see content_hash). The store belongs to one tokenizer configuration: opening it with a different
+    configuration empties it, so that stale tokens are never returned.
+    """
+
+    def __init__(self, filename, config=None):
+        """
+        Open (or create) a store.
+
+
+        :param filename: Path to the SQLite file.
+        :param config: Tokenizer configuration from tokenizer_config(). Default: tokenizer_config().
+        """
+
+        import hashlib
+        import json
+        import sqlite3
+
+        config = tokenizer_config() if config is None else config
+        self.config_digest = hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
+        self.filename = filename
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = False
+
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute('PRAGMA journal_mode=WAL')  # readers are not blocked by a running writer.
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS tokens '
+                                '(hash TEXT PRIMARY KEY, title_seg TEXT, desc_seg TEXT)')
+        row = self.connection.execute("SELECT value FROM meta WHERE name = 'config'").fetchone()
+        if row is None or row[0] != self.config_digest:
+            # the configuration changed - tokens in the store are stale.
+            self.invalidated = row is not None
+            self.connection.execute('DELETE FROM tokens')
+            self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('config', ?)", (self.config_digest,))
+        self.connection.commit()
+
+    def get_many(self, hashes, batch_size=500):
+        """
+        Look up tokenized documents.
+
+
+        :param hashes: An iterable of content hashes.
+        :param batch_size: Number of hashes looked up in a query.
+        :return: A dict {content hash: (title_seg, desc_seg)} of hashes found in the store.
+        """
+
+        hashes = list(dict.fromkeys(hashes))
+        found = {}
+        for begin in range(0, len(hashes), batch_size):
+            batch = hashes[begin:begin + batch_size]
+            query = 'SELECT hash, title_seg, desc_seg FROM tokens WHERE hash IN ({})'.format(
+                ','.join('?' * len(batch)))
+            for doc_hash, title_seg, desc_seg in self.connection.execute(query, batch):
+                found[doc_hash] = (title_seg, desc_seg)
+        self.hits += len(found)
+        self.misses += len(hashes) - len(found)
+        return found
+
+    def put_many(self, records):
+        """
+        Add tokenized documents to the store and commit.
+
+
+        :param records: An iterable of (content hash, title_seg, desc_seg).
+        :return: None
+        """
+
+        with self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO tokens VALUES (?, ?, ?)', records)
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM tokens').fetchone()[0]
+
+    def report(self):
+        """Return a one-line summary of lookups."""
+        lookups = self.hits + self.misses
+        return 'Token store {}: {} hits, {} misses ({:.1%} hit rate){}'.format(
+            self.filename, self.hits, self.misses, self.hits / lookups if lookups else 0.0,
+            ' - invalidated by a configuration change' if self.invalidated else '')
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
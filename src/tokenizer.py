@@ -1,7 +1,10 @@
 def tokenize(document, cleaner, th_tokenizer, n_grams,
-             stop_en_filename='./Resource/WordList/stopwords_en_.txt', stop_th_filename=None, keywords_filename=None):
+             stop_en_filename='./Resource/WordList/stopwords_en_.txt', stop_th_filename=None, keywords_filename=None,
+             limits=None, field='document'):
     """
     Clean, tokenize, and generate n-gram from a document (string).
+    Limits (see TOKENIZE_LIMITS) bound the work spent on a document; each limit which fires is counted
+    in COUNTERS as '<field>.<limit>'.
 
 
     :param document: String containing a document.
@@ -11,18 +14,32 @@ def tokenize(document, cleaner, th_tokenizer, n_grams,
     :param stop_en_filename: Path to txt file containing English stop word.
     :param stop_th_filename: Path to txt file containing Thai stop word.
     :param keywords_filename: Path to txt file containing keywords.
+    :param limits: A dict of limits of the field - see TOKENIZE_LIMITS. Default: no limit.
+    :param field: Name of the field in limit counters.
     :return: String of tokens separated by '|'.
     """
 
     import re
     from copy import deepcopy
+    from time import perf_counter
+    from src.profiling import PROFILER, COUNTERS
 
     document = deepcopy(document)  # make a copy of text.
+    limits = limits or {}
+    started = perf_counter()
+
+    # bound the characters before the quadratic helpers of the cleaner.
+    max_chars = limits.get('max_chars')
+    if max_chars and len(document) > max_chars:
+        document = _limit(document, max_chars, limits.get('mode'), ' . ')  # windows are separate sentences.
+        COUNTERS.count(field + '.max_chars', 1)
 
     # load word lis from txt file.
-    stopwords_en = get_word_list(stop_en_filename) if stop_en_filename else set()
-    stopwords_th = get_word_list(stop_th_filename) if stop_th_filename else set()
-    keywords = get_word_list(keywords_filename) if stop_th_filename else set()
+    begin = PROFILER.clock()
+    stopwords_en = shared_word_list(stop_en_filename) if stop_en_filename else set()
+    stopwords_th = shared_word_list(stop_th_filename) if stop_th_filename else set()
+    keywords = shared_keyword_matcher(keywords_filename) if keywords_filename else set()
+    PROFILER.record('load_word_list', begin)
     # create re.compile for Thai text pattern.
     re_pattern_th = re.compile(u'[\u0e00-\u0e7f]')
 
@@ -32,31 +49,134 @@ def tokenize(document, cleaner, th_tokenizer, n_grams,
     # (3) split adjunct English - Thai tokens,
     # (4) remove unuseful string pattern, e.g.names,
     # (5) split sentences joined by bullet markers
+    begin = PROFILER.clock()
     document = cleaner(document)
+    if PROFILER.enabled:  # counting words scans the whole text.
+        PROFILER.record('clean', begin, document.count(' ') + 1)
 
     # tokenize document
     # (1) lemmatize English token excluding keywords
     # (2) segment words
     # (3) remove stopwords excluding keywords
+    time_budget = limits.get('time_budget_sec')
+    deadline = started + time_budget if time_budget else None
     document = tokenize_cleaned(document, th_tokenizer, re_pattern_th,
-                                stopwords_en, stopwords_th, keywords)
+                                stopwords_en, stopwords_th, keywords, deadline)
     document = [token for token in document if token != '']
+    over_budget = deadline is not None and perf_counter() > deadline
+    if over_budget:
+        COUNTERS.count(field + '.time_budget_sec', 1)  # Thai segmentation stopped or n-grams are skipped.
+    max_tokens = limits.get('max_tokens')
+    if max_tokens and len(document) > max_tokens:
+        document = _limit(document, max_tokens, limits.get('mode'), ['\\\\'])
+        COUNTERS.count(field + '.max_tokens', 1)
 
     # merge token into one string whereas each tokens are separated by '|' and
     # sentence markers are designated by '|\\\\|'
     sentences = '|'.join(document)
     sentences = sentences.split('|\\\\|')  # split into list of sentences.
 
+    begin = PROFILER.clock()
+    n_tokens = len(document)
+    max_ngrams = limits.get('max_ngrams')
     for sentence in sentences:  # iterate over sentences.
-        document.extend(n_grams_compile(sentence, n_grams, re_pattern_th))  # make n-grams and add to the document.
+        if deadline is not None and (over_budget or perf_counter() > deadline):
+            if not over_budget:
+                COUNTERS.count(field + '.time_budget_sec', 1)  # n-grams of the remaining sentences are skipped.
+            break
+        if max_ngrams:
+            # tokens of a sentence beyond those needed for max_ngrams n-grams are not expanded.
+            sentence_tokens = sentence.split('|')
+            needed = max_ngrams // max(n_grams - 1, 1) + n_grams
+            if len(sentence_tokens) > needed:
+                sentence = '|'.join(sentence_tokens[:needed])
+            ngrams = n_grams_compile(sentence, n_grams, re_pattern_th) or []
+            if len(sentence_tokens) > needed or len(ngrams) > max_ngrams:
+                ngrams = ngrams[:max_ngrams]
+                COUNTERS.count(field + '.max_ngrams', 1)
+            document.extend(ngrams)
+        else:
+            document.extend(n_grams_compile(sentence, n_grams, re_pattern_th))  # make n-grams and add to the document.
+    PROFILER.record('ngram', begin, len(document) - n_tokens)
 
     document = '|'.join(document)  # merge all tokens into one string separated by '|' for further processing.
 
     return document
 
 
+def _limit(sequence, size, mode=None, separator=None):
+    """
+    Deterministically shorten a string or a list to size items.
+
+
+    :param sequence: A string or a list.
+    :param size: Maximum number of items.
+    :param mode: 'truncate' (default) keeps the first size items; 'window' keeps the first and the last size / 2
+                    items, joined by separator.
+    :param separator: A string or a list put between the windows.
+    :return: The shortened sequence.
+    """
+
+    if mode == 'window':
+        head = size - size // 2
+        return sequence[:head] + separator + sequence[len(sequence) - size // 2:]
+    return sequence[:size]
+
+
+# recommended per-field limits of tokenize_document() - limits are opt-in (limits=TOKENIZE_LIMITS), since they
+# change the tokens of long documents; None disables a limit.
+# max_chars: characters of the raw text; max_tokens: word-tokens of the cleaned text;
+# max_ngrams: n-grams per sentence;
+# time_budget_sec: wall time of a document after which Thai phrases are no longer segmented (they are kept whole)
+#   and n-grams are no longer compiled - cleaning cannot be interrupted, it is bounded by max_chars instead;
+# mode: 'truncate' keeps the beginning of a text, 'window' keeps its beginning and its end.
+TOKENIZE_LIMITS = {'title': {'max_chars': 500, 'max_tokens': 100, 'max_ngrams': 1000,
+                             'time_budget_sec': 5.0, 'mode': 'truncate'},
+                   'desc': {'max_chars': 50000, 'max_tokens': 10000, 'max_ngrams': 5000,
+                            'time_budget_sec': 30.0, 'mode': 'window'}}
+
+
+LEMMA_CACHE_SIZE = 2 ** 16  # maximum number of memoized English lemmas per process.
+_normalizer = {}  # process-wide lemmatizer and letter test, built on first use by english_normalizer().
+
+
+def english_normalizer():
+    """
+    Return process-wide helpers for English token normalization, built once per process.
+
+
+    :return: (lemmatize(token) memoized with a bounded LRU cache,
+                is_en_alpha(token) - a compiled test of whether all characters are English alphabets).
+    """
+    if not _normalizer:
+        import re
+        from functools import lru_cache
+        from nltk import WordNetLemmatizer
+        import nltk
+
+        if './Resource/nltk_data' not in nltk.data.path:
+            nltk.data.path.append('./Resource/nltk_data')
+        if '../Resource/nltk_data' not in nltk.data.path:
+            nltk.data.path.append('../Resource/nltk_data')
+
+        _normalizer['lemmatize'] = lru_cache(maxsize=LEMMA_CACHE_SIZE)(WordNetLemmatizer().lemmatize)
+        # 'Z' and 'z' are not included, as in earlier versions, so that tokens match fitted vectorizers.
+        _normalizer['is_en_alpha'] = re.compile('[A-Ya-y]*').fullmatch
+    return _normalizer['lemmatize'], _normalizer['is_en_alpha']
+
+
+def lemma_cache_info():
+    """Return {'hits', 'misses', 'size', 'hit_rate'} of the lemma cache of the current process."""
+    if not _normalizer:
+        return {'hits': 0, 'misses': 0, 'size': 0, 'hit_rate': 0.0}
+    info = _normalizer['lemmatize'].cache_info()
+    lookups = info.hits + info.misses
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize,
+            'hit_rate': info.hits / lookups if lookups else 0.0}
+
+
 def tokenize_cleaned(document, th_tokenizer, thai_char,
-                     stopwords_en, stopwords_th, keywords):
+                     stopwords_en, stopwords_th, keywords, deadline=None):
     """
     Tokenize and lemmatize tokens in document.
 
@@ -64,53 +184,57 @@ def tokenize_cleaned(document, th_tokenizer, thai_char,
     :param document: Document in string
     :param th_tokenizer: Thai tokenizer function (return list)
     :param thai_char: re.compile patter containing all Thai alphabets.
-    :param stopwords_en: set() of English stop word
-    :param stopwords_th: set() of Thai stop word
-    :param keywords: set() of keywords.
+    :param stopwords_en: frozenset (see shared_word_list) or set() of English stop word
+    :param stopwords_th: frozenset (see shared_word_list) or set() of Thai stop word
+    :param keywords: KeywordMatcher object (see shared_keyword_matcher) or set() of keywords.
+                        Tokens of keyword occurrences are not lemmatized.
+    :param deadline: perf_counter() time after which Thai phrases are no longer segmented but kept whole,
+                        or None.
     :return: list of tokens.
     """
-    from copy import deepcopy
-    from nltk import WordNetLemmatizer
-    import nltk
-
-    if './Resource/nltk_data' not in nltk.data.path:
-        nltk.data.path.append('./Resource/nltk_data')
-    if '../Resource/nltk_data' not in nltk.data.path:
-        nltk.data.path.append('../Resource/nltk_data')
-
-    def test_all_en_alpha(text):  # test if characters in the string are all English alphabet.
-        roman_alpha = [chr(alpha) for alpha in range(65, 90)] + \
-                      [chr(alpha) for alpha in range(97, 122)]
-        for alpha in text:
-            if alpha not in roman_alpha:
-                return False
-        return True
-
-    word_stem_func = WordNetLemmatizer()  # declare English lemmatizer.
-
-    document = deepcopy(document)
-    document = document.split(' ')  # split to form a list of phrases which are separated by '\s'
-    # remove English stop word.
-    document = [token.lower() for token in document
-                if token not in stopwords_en]
-    # Lemmatize English tokens.
-    document = [word_stem_func.lemmatize(token)
-                if test_all_en_alpha(token) and token not in keywords  # do not lemmatize keywords.
-                else token
-                for token in document]
+    from time import perf_counter
+    from src.profiling import PROFILER
+
+    lemmatize, is_en_alpha = english_normalizer()
+
+    begin = PROFILER.clock()
+    cache_before = lemmatize.cache_info() if PROFILER.enabled else None
+    # in one pass over phrases separated by '\s':
+    # remove English stop word, lower case and lemmatize English tokens excluding keywords.
+    normalized = []
+    append = normalized.append
+    tokens = document.split(' ')
+    # tokens of (possibly multi-word) keyword occurrences, found in one pass over the document.
+    protected = keywords.protected_tokens(tokens) if hasattr(keywords, 'protected_tokens') else None
+    for index, token in enumerate(tokens):
+        if token in stopwords_en:
+            continue
+        token = token.lower()
+        is_keyword = index in protected if protected is not None else token in keywords
+        if not is_keyword and is_en_alpha(token):  # do not lemmatize keywords.
+            token = lemmatize(token)
+        append(token)
+    document = normalized
+    PROFILER.record('lemmatize', begin, len(document))
+    if cache_before:
+        cache_after = lemmatize.cache_info()
+        PROFILER.count('lemma_cache_hit', cache_after.hits - cache_before.hits)
+        PROFILER.count('lemma_cache_miss', cache_after.misses - cache_before.misses)
 
     # tokenize Thai phrase.
+    begin = PROFILER.clock()
     tokenized = []
     for token in document:
-        if thai_char.search(token):  # check if phrase is in Thai
+        # check if phrase is in Thai - past the deadline, Thai phrases are kept whole.
+        if thai_char.search(token) and (deadline is None or perf_counter() < deadline):
             tokenized.extend(th_tokenizer(token))  # extend to include a list of Thai tokens
         else:
             tokenized.append(token)  # append non-Thai tokens
+    PROFILER.record('segment', begin, len(tokenized))
 
     # remove Thai stop word
-    for token_index in reversed(range(len(tokenized))):  # iterate backward
-        if tokenized[token_index] in stopwords_th:  # if token is Thai stop word
-            tokenize_document.pop(token_index)  # remove Thai stop word from doc
+    if stopwords_th:
+        tokenized = [token for token in tokenized if token not in stopwords_th]
 
     return tokenized
 
@@ -154,6 +278,44 @@ def get_word_list(filename):
     return words_set
 
 
+def shared_char_set(filename):
+    """
+    Return the character set of a file, loaded once per process into the resource registry (see src.resources).
+    Resources loaded in the parent before a Pool is forked are shared by pool processes copy-on-write.
+
+
+    :param filename: Path to character set file.
+    :return: FrozenCharSet object.
+    """
+    from src.resources import REGISTRY
+    return REGISTRY.get('charset', filename)
+
+
+def shared_word_list(filename):
+    """
+    Return the word list of a file, loaded once per process into the resource registry (see src.resources).
+    Resources loaded in the parent before a Pool is forked are shared by pool processes copy-on-write.
+
+
+    :param filename: Path to a text file containing word list (each words are separated by \n).
+    :return: A frozenset of words/tokens.
+    """
+    from src.resources import REGISTRY
+    return REGISTRY.get('word_list', filename)
+
+
+def shared_keyword_matcher(filename):
+    """
+    Return a KeywordMatcher of the keywords of a file, built once per process (see shared_word_list).
+
+
+    :param filename: Path to keywords file.
+    :return: KeywordMatcher object.
+    """
+    from src.resources import REGISTRY
+    return REGISTRY.get('keyword_matcher', filename)
+
+
 def n_gram_make(tokens, n, th_lang):
     """
     Compile specific "n" n-grams from a list of tokens.
@@ -163,7 +325,7 @@ def n_gram_make(tokens, n, th_lang):
     :param n: 'n' length of n-gram.
     :param th_lang: Search result if source sentence is in Thai.
     :return: A list of specific "n" n-grams - separated by
-            '\s' for English phrase and not separated for Thai phrase.
+            '\\s' for English phrase and not separated for Thai phrase.
     """
 
     ngram_ret = []
@@ -249,7 +411,7 @@ def cleaner_generator(char_set_filename, keywords_filename=None):
 
         :param val_text: String to be validated.
         :param char_pat: re.compile of character set to remove.
-        :param char_set: Set of characters to include.
+        :param char_set: FrozenCharSet of characters to include.
         :return: A string cleaned of non-sense character5s/alphabets.
         """
 
@@ -258,10 +420,7 @@ def cleaner_generator(char_set_filename, keywords_filename=None):
         val_text = deepcopy(val_text)
         val_text = val_text.replace('&amp;', ' ')
         val_text = val_text.replace('&nbsp;', ' ')
-        ret_text = ''
-        for cha in val_text:
-            if char_set.get(cha):
-                ret_text += cha
+        ret_text = char_set.filter(val_text)
         while char_pat.search(ret_text):
             ret_text = char_pat.sub(' ', ret_text)
         while ret_text.find('  ') != -1:
@@ -278,12 +437,8 @@ def cleaner_generator(char_set_filename, keywords_filename=None):
         return temp
 
     def keyword_lower(en_text, keywords):
-        """Replace keywords with lower case"""
-        from copy import deepcopy
-        en_text = deepcopy(en_text)
-        for keyword in keywords:
-            keyword.sub(keyword.pattern.lower(), en_text)
-        return en_text
+        """Replace keywords with lower case - keywords is a KeywordMatcher object or None."""
+        return keywords.lower(en_text) if keywords else en_text
 
     def cleaner(text):
         """
@@ -300,17 +455,17 @@ def cleaner_generator(char_set_filename, keywords_filename=None):
         """
         import re
 
-        charset = load_char_set(char_set_filename)  # load valid character set.
-        keywords = get_word_list(keywords_filename) if keywords_filename else set()  # load keywords.
+        charset = shared_char_set(char_set_filename)  # load valid character set.
+        keywords = shared_keyword_matcher(keywords_filename) if keywords_filename else None  # load keywords.
 
         # ===== BEGIN define pattern =====
         pattern_new_sentence = re.compile(r'\.[0-9]+[).]\s')  # new sentence with numbered bullet.
         # Thai - English switching.
         pattern_th_in = re.compile(u'([^\u0e00-\u0e7f][\u0e00-\u0e7f])|([\u0e00-\u0e7f][^\u0e00-\u0e7f])')
-        pattern_phone_number = re.compile('[0-9\-]{9-12}')  # phone number
-        pattern_email = re.compile('[a-zA-Z._\-0-9]+@[a-zA-Z._\-0-9]+')  # email pattern
-        pattern_url = re.compile('(https://|www.)[a-zA-Z0-9]+.[a-z]+[^\s]*')  # url pattern
-        pattern_thai_name = re.compile(u'\u0e04\u0e38\u0e13\s*[\u0e00-\u0e7f]+\s+')  # Thai name pattern
+        pattern_phone_number = re.compile('[0-9\\-]{9-12}')  # phone number
+        pattern_email = re.compile('[a-zA-Z._\\-0-9]+@[a-zA-Z._\\-0-9]+')  # email pattern
+        pattern_url = re.compile('(https://|www.)[a-zA-Z0-9]+.[a-z]+[^\\s]*')  # url pattern
+        pattern_thai_name = re.compile(u'\u0e04\u0e38\u0e13\\s*[\u0e00-\u0e7f]+\\s+')  # Thai name pattern
         pattern_sentence_merge = re.compile('[a-z][A-Z]')  # Sentence merged pattern.
         pattern_num_bullet = re.compile('^[0-9]+[).]*$')  # numbered bullet
         pattern_double_sentence_stop_maker = re.compile(r'(\\\\)(.){,2}(\\\\)')
@@ -318,7 +473,6 @@ def cleaner_generator(char_set_filename, keywords_filename=None):
         # pattern_thai_phrase_space = re.compile(u'[\u0e01-\u0e3a\u0e40-\u0e5d](\s)+[\u0e01-\u0e3a\u0e40-\u0e5d]')
         # discarded letters.
         pattern_garbage_lead_char = re.compile(r'^-|^\||^\.|^#{1,2}|^(-\|)|^(\+\|)|^(#\|)^(\.\|)')
-        keyword_pat = [re.compile(keyword) for keyword in keywords]
         # ===== END ======
 
         # conversion table for thai number to arabic
@@ -337,7 +491,7 @@ def cleaner_generator(char_set_filename, keywords_filename=None):
         text = pattern_num_bullet.sub(' \\\\ ', text)
         # End===================================
 
-        text = keyword_lower(text, keyword_pat)
+        text = keyword_lower(text, keywords)
         text = split_th_en(text, pattern_th_in)  # split run-on English-Thai tokens.
         text = pattern_new_sentence.sub(' \\\\ ', text)  # replace bullets with sentence marker
         text = text.replace('.', ' \\\\ ')  # English sentences are separated by "\\\\".
@@ -353,7 +507,7 @@ def cleaner_generator(char_set_filename, keywords_filename=None):
 def generate_tokenizer(cleaner=None, thai_tokenizer=None, ngram=3,
                        char_set_filename='./Resource/misc/charset',
                        stop_en_filename='./Resource/WordList/stopwords_en_.txt',
-                       stop_th_filename=None, keywords_filename=None):
+                       stop_th_filename=None, keywords_filename=None, limits=None, field='document'):
     """
     Generate document tokenizer with specified parameters.
 
@@ -366,6 +520,8 @@ def generate_tokenizer(cleaner=None, thai_tokenizer=None, ngram=3,
     :param stop_en_filename: Path to txt file containing English stop word. Default is provided.
     :param stop_th_filename: Path to txt file containing Thai stop word. Default: None
     :param keywords_filename: Path to txt file containing keywords. Default: None
+    :param limits: A dict of limits - see TOKENIZE_LIMITS. Default: no limit.
+    :param field: Name of the field in limit counters.
     :return: A tokenizer function which takes a <string document> and
                 return a segmented <string document> of which each word-tokens are separated by '|'.
     """
@@ -387,7 +543,7 @@ def generate_tokenizer(cleaner=None, thai_tokenizer=None, ngram=3,
 
     kwargs = {'cleaner': cleaner, 'th_tokenizer': thai_tokenizer, 'n_grams': ngram,
               'stop_en_filename': stop_en_filename, 'stop_th_filename': stop_th_filename,
-              'keywords_filename': keywords_filename}
+              'keywords_filename': keywords_filename, 'limits': limits, 'field': field}
 
     # Wrap tokenizer function applicable to all documents both in English and in Thai.
     wrapped_tokenizer = wrapper(tokenize, 'document', **kwargs)
@@ -395,7 +551,7 @@ def generate_tokenizer(cleaner=None, thai_tokenizer=None, ngram=3,
     return wrapped_tokenizer
 
 
-def tokenize_document(doc_dict: dict, title_ngram=5, desc_ngram=4) -> dict:
+def tokenize_document(doc_dict: dict, title_ngram=5, desc_ngram=4, limits=None) -> dict:
     """
     Tokenize job title and job description data from document.
 
@@ -403,14 +559,16 @@ def tokenize_document(doc_dict: dict, title_ngram=5, desc_ngram=4) -> dict:
     :param doc_dict: Document in dict format with keys: 'title' and 'desc'.
     :param title_ngram: n-gram length for job title data.
     :param desc_ngram: n-gram length for job description data.
+    :param limits: A dict {'title': limits, 'desc': limits}, e.g. TOKENIZE_LIMITS. Default: no limit.
     :return: Document in dictionary format with additional keys:
             'title_seg' and 'desc_seg', both of which are tokenized.
     """
     from copy import deepcopy
 
+    limits = limits or {}
     doc_dict = deepcopy(doc_dict)
-    title_tokenizer = generate_tokenizer(ngram=title_ngram)
-    desc_tokenizer = generate_tokenizer(ngram=desc_ngram)
+    title_tokenizer = generate_tokenizer(ngram=title_ngram, limits=limits.get('title'), field='title')
+    desc_tokenizer = generate_tokenizer(ngram=desc_ngram, limits=limits.get('desc'), field='desc')
 
     doc_dict['title_seg'] = title_tokenizer(doc_dict['title'])
     doc_dict['desc_seg'] = desc_tokenizer(doc_dict['desc'])
@@ -418,25 +576,207 @@ def tokenize_document(doc_dict: dict, title_ngram=5, desc_ngram=4) -> dict:
     return doc_dict
 
 
-def wrapper_tokenize_doc(document):
-    """Wrapper for tokenize_documents() with document as only argument."""
-    return tokenize_document(document, **{'title_ngram': 5, 'desc_ngram': 4})
+def wrapper_tokenize_doc(document, limits=None):
+    """Wrapper for tokenize_documents() with document as only argument - limits as in tokenize_document()."""
+    return tokenize_document(document, **{'title_ngram': 5, 'desc_ngram': 4, 'limits': limits})
+
+
+def _document_cost(document):
+    """Estimated tokenization cost of a document - its character count."""
+    return len(document['title']) + len(document['desc'])
+
+
+def content_hash(document):
+    """Return a hex digest identifying the 'title' and 'desc' content of a document."""
+    import hashlib
+    digest = hashlib.sha1(document['title'].encode('utf-8'))
+    digest.update(b'\x00')
+    digest.update(document['desc'].encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_checkpoint(checkpoint_dir):
+    """
+    Load tokenized documents from checkpoint shards written by tokenize_documents().
+
+
+    :param checkpoint_dir: Path to the checkpoint directory.
+    :return: A dict {content hash: {'index', 'hash', 'title_seg', 'desc_seg'}}.
+    """
+    import os
+    import json
+
+    records = {}
+    if not os.path.isdir(checkpoint_dir):
+        return records
+    for filename in sorted(os.listdir(checkpoint_dir)):
+        if not (filename.startswith('shard_') and filename.endswith('.jsonl')):
+            continue  # skip partially written shards.
+        with open(os.path.join(checkpoint_dir, filename), 'rt', encoding='utf-8') as f_shard:
+            for line in f_shard:
+                record = json.loads(line)
+                records[record['hash']] = record
+    return records
+
+
+def write_checkpoint_shard(checkpoint_dir, begin, records):
+    """
+    Atomically write a shard of tokenized documents into the checkpoint directory.
+
+
+    :param checkpoint_dir: Path to the checkpoint directory.
+    :param begin: Input index of the first document in the shard.
+    :param records: A list of dicts {'index', 'hash', 'title_seg', 'desc_seg'}.
+    :return: None
+    """
+    import os
+    import json
+
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    filename = os.path.join(checkpoint_dir, 'shard_{:010d}.jsonl'.format(begin))
+    with open(filename + '.tmp', 'wt', encoding='utf-8') as f_shard:
+        for record in records:
+            f_shard.write(json.dumps(record, ensure_ascii=False) + '\n')
+        f_shard.flush()
+        os.fsync(f_shard.fileno())
+    os.replace(filename + '.tmp', filename)  # a shard is either complete or absent.
+
+
+class TokenizerPool:
+    """
+    Pool processes of tokenize_documents() with their statistics, stage profiler and limit counters, shared by
+    successive calls, e.g. for chunks of a stream: processes start once, and reports are printed and
+    metrics written once for the whole run, when the pool is closed.
+    """
+
+    def __init__(self, pool_process=None, profile=False, metrics_filename=None, pool_mode=None,
+                 report_memory=False, limits=None, freeze=False):
+        """
+        Start pool processes - see tokenize_documents() for the parameters.
+        """
+
+        import os
+        import multiprocessing
+        from functools import partial
+        from src.scheduler import PoolStats
+        from src.profiling import StageProfiler
+        from src.preload import preload, preload_resources
+
+        self.pool_process = pool_process or os.cpu_count() or 1
+        self.metrics_filename = metrics_filename
+        self.limits = limits
+        # limits are passed with each task rather than set globally, since forkserver workers import the module anew.
+        self.tokenize_func = partial(wrapper_tokenize_doc, limits=limits) if limits else wrapper_tokenize_doc
+        pool_mode = pool_mode or multiprocessing.get_start_method()
+        self.frozen = freeze and pool_mode == 'fork'  # objects of this process are unfrozen when the pool closes.
+        if pool_mode == 'fork':
+            # import and load once in this process so that pool processes share the modules and resources.
+            preload('tokenize')
+            preload_resources(freeze=self.frozen)
+        self.stats = PoolStats(self.pool_process)
+        self.profiler = StageProfiler(enabled=True) if profile or metrics_filename else None
+        self.counters = StageProfiler(enabled=True)  # limits which fired in pool processes.
+        self._pool_args = (self.pool_process, pool_mode, ['src.warm_resources'], self.profiler is not None,
+                           report_memory)
+        self._pool = None  # processes start with the first documents to tokenize.
+
+    @property
+    def pool(self):
+        """The multiprocessing Pool, started on first use."""
+        from src.scheduler import open_pool
+        if self._pool is None:
+            self._pool = open_pool(*self._pool_args)
+        return self._pool
+
+    def report(self):
+        """Print pool utilization, limits which fired and stage profiles, and write stage metrics."""
+        from src.resources import REGISTRY
+
+        if self.stats.workers:
+            print(self.stats.report())
+        if self.counters.stages:
+            print('Tokenizer limits fired: ' + ', '.join('{} {} times'.format(limit, counts[2])
+                                                         for limit, counts in sorted(self.counters.stages.items())))
+        if self.profiler:
+            print(self.profiler.report())
+            print(REGISTRY.report())
+            hits = self.profiler.stages.get('lemma_cache_hit', [0, 0.0, 0])[2]
+            misses = self.profiler.stages.get('lemma_cache_miss', [0, 0.0, 0])[2]
+            if hits + misses:
+                print('Lemma cache hit rate: {:.1%} of {} lookups'.format(hits / (hits + misses), hits + misses))
+        if self.metrics_filename:
+            with open(self.metrics_filename, 'wt', encoding='utf-8') as f_metrics:
+                f_metrics.write(self.profiler.prometheus())
+
+    def _unfreeze(self):
+        import gc
+        if self.frozen:
+            gc.unfreeze()
+            self.frozen = False
+
+    def close(self):
+        """Stop pool processes and report the run."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+        self._unfreeze()
+        self.report()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            if self._pool is not None:
+                self._pool.terminate()
+            self._unfreeze()
 
 
-def tokenize_documents(documents, pool_process=32, chunksize=100):
+def tokenize_documents(documents, pool_process=None, chunksize=None, checkpoint_dir=None, shard_size=1000,
+                       profile=False, metrics_filename=None, pool_mode=None, report_memory=False,
+                       store_filename=None, limits=None, pool=None, freeze=False):
     """
     Tokenize a list of documents.
+    If checkpoint_dir is provided, tokenized documents are written to disk in shards as they complete,
+    and documents found in the checkpoint (by content hash of 'title' and 'desc') are not tokenized again,
+    so that an interrupted run can be resumed.
+    If store_filename is provided, documents tokenized by any previous run with the same tokenizer configuration
+    are looked up in a persistent token store (see TokenStore) and only the others are sent to pool processes.
 
 
     :param documents: List of documents, each of which are in dict format with keys: 'title' and 'desc'.
-    :param pool_process: Number of parallel processes.
-    :param chunksize: Number of jobs assigned to a given queue in each process.
-    :return: List of documents, each of which contain additional keys: 'title_seg' and 'desc_seg'.
+    :param pool_process: Number of parallel processes. Default: number of available CPUs.
+    :param chunksize: Number of documents assigned to a process at a time.
+                        Default: chunks are sized adaptively by character count.
+    :param checkpoint_dir: Path to a directory where tokenized shards are written. Default: no checkpoint.
+    :param shard_size: Number of documents in a checkpoint shard.
+    :param profile: True will record wall time, call count and token count of each tokenization stage
+                        in pool processes and print a summary report.
+    :param metrics_filename: Path to a file into which stage metrics are written in Prometheus text format.
+                        Implies profile=True.
+    :param pool_mode: 'fork' loads read-only resources (word lists, character set, WordNet and tltk data)
+                        once in this process and forks pool processes which share them copy-on-write.
+                        'forkserver' loads them once in a forkserver instead. 'spawn' does not preload.
+                        Default: the start method of the platform (multiprocessing.get_start_method()).
+    :param report_memory: True will report memory usage of each pool process at start-up and at the end.
+    :param store_filename: Path to an SQLite token store file. Default: no store.
+    :param limits: Per-field limits of tokenize_document(), e.g. TOKENIZE_LIMITS. Default: no limit.
+    :param pool: TokenizerPool object shared by successive calls, e.g. for chunks of a stream - its settings
+                        replace pool_process, profile, metrics_filename, pool_mode, report_memory and limits,
+                        and reports are printed when it is closed. Default: a pool for this call.
+    :param freeze: True will also freeze the objects of this process out of the garbage collector's reach
+                        in 'fork' mode (see preload_resources), until the pool is closed - so that pool processes
+                        do not copy shared pages. Cyclic garbage of this process is not collected meanwhile.
+    :return: List of documents, in input order, each of which contain additional keys: 'title_seg' and 'desc_seg'.
     """
     import json
     from tqdm import tqdm
-    from multiprocessing import Pool
     from copy import deepcopy
+    from contextlib import nullcontext
+    from src.scheduler import imap_adaptive
+    from src.token_store import TokenStore, tokenizer_config
 
     # load document data
     if type(documents) is str:  # if path to json data file is provided.
@@ -447,17 +787,68 @@ def tokenize_documents(documents, pool_process=32, chunksize=100):
     else:
         raise ImportError
 
-    documents = []
-    progress_bar = tqdm(total=int(len(src_documents)))
-    tokenize_func = wrapper_tokenize_doc
-    print('===================Tokenizing documents===================\n')
-    # tokenize documents using multiprocessing.
-    with Pool(processes=pool_process) as pool:
-        pool_result = pool.imap(tokenize_func, src_documents, chunksize=chunksize)
-        for doc in pool_result:
-            documents.append(doc)
-            progress_bar.update()
-    progress_bar.close()
-    print('===================Tokenizing completed===================')
+    # a pool of this call only reports when it is closed at the end of the call.
+    with nullcontext(pool) if pool is not None else \
+            TokenizerPool(pool_process, profile, metrics_filename, pool_mode, report_memory, limits, freeze) as pool, \
+            TokenStore(store_filename, tokenizer_config(limits=pool.limits)) if store_filename else nullcontext() \
+            as store:
+        # find documents already tokenized in a previous run.
+        checkpoint = load_checkpoint(checkpoint_dir) if checkpoint_dir else {}
+        # an empty store is falsy (len() == 0) - it is compared with None.
+        doc_hashes = [content_hash(doc) for doc in src_documents] if checkpoint_dir or store is not None else []
+        stored = store.get_many(doc_hashes) if store is not None else {}
+        to_tokenize = [doc for index, doc in enumerate(src_documents)
+                       if not doc_hashes or (doc_hashes[index] not in checkpoint and doc_hashes[index] not in stored)]
+        if checkpoint_dir:
+            print('Resuming from checkpoint: ' + str(len(src_documents) - len(to_tokenize)) + ' documents tokenized')
+        if store is not None:
+            print(store.report())
+
+        documents = []
+        progress_bar = tqdm(total=int(len(src_documents)))
+        print('===================Tokenizing documents===================\n')
+        # tokenize documents using multiprocessing.
+        pool_result = imap_adaptive(pool.tokenize_func, to_tokenize, cost_func=_document_cost,
+                                    pool_process=pool.pool_process, batch_size=chunksize, stats=pool.stats,
+                                    profiler=pool.profiler, counters=pool.counters, pool=pool.pool) \
+            if to_tokenize else iter(())
+        shard = []
+        shard_dirty = False  # whether the shard contains documents which are not in the checkpoint.
+        new_records = []  # newly tokenized documents not yet added to the token store.
+        try:
+            for index, doc in enumerate(src_documents):
+                if checkpoint_dir and doc_hashes[index] in checkpoint:
+                    doc['title_seg'] = checkpoint[doc_hashes[index]]['title_seg']
+                    doc['desc_seg'] = checkpoint[doc_hashes[index]]['desc_seg']
+                    shard_dirty = shard_dirty or checkpoint[doc_hashes[index]]['index'] != index
+                elif doc_hashes and doc_hashes[index] in stored:
+                    doc['title_seg'], doc['desc_seg'] = stored[doc_hashes[index]]
+                    shard_dirty = True
+                else:
+                    doc = next(pool_result)
+                    shard_dirty = True
+                    if store is not None:
+                        new_records.append((doc_hashes[index], doc['title_seg'], doc['desc_seg']))
+                documents.append(doc)
+                progress_bar.update()
+
+                if len(new_records) == shard_size:
+                    store.put_many(new_records)
+                    new_records = []
+
+                if checkpoint_dir:
+                    shard.append({'index': index, 'hash': doc_hashes[index],
+                                  'title_seg': doc['title_seg'], 'desc_seg': doc['desc_seg']})
+                    if len(shard) == shard_size or index == len(src_documents) - 1:
+                        if shard_dirty:
+                            write_checkpoint_shard(checkpoint_dir, shard[0]['index'], shard)
+                        shard = []
+                        shard_dirty = False
+        finally:
+            # documents tokenized before an error are kept for the next run, as in the checkpoint.
+            if new_records:
+                store.put_many(new_records)
+            progress_bar.close()
+        print('===================Tokenizing completed===================')
 
     return documents
@@ -25,41 +25,101 @@ def wrapper(func, arg_names, **kwargs):
     return wrapped_function
 
 
-def balance_training_set(dataset: list, target, field):
+def balance_indices(labels, target=None, size=None, seed=None, shuffle=True):
+    """
+    Select row indices of a class-balanced subset of a dataset without touching the dataset itself.
+    The resulting index array can slice a list of documents, a numpy array or a scipy CSR matrix.
+
+
+    :param labels: Array-like of class labels, one for each row.
+    :param target: If provided, balance rows labelled target against all the other rows (binary).
+                    Otherwise, balance every class against each other (stratified multi-class).
+    :param size: Number of rows selected from each class. Default: size of the smallest class.
+    :param seed: Seed of the random number generator - the same seed gives the same selection.
+    :param shuffle: True will shuffle selected rows across classes, False will return them in row order.
+    :return: numpy array of row indices.
+    """
+    import numpy as np
+
+    labels = np.asarray(labels)
+    if target is not None:
+        labels = labels == target
+    classes, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    if len(classes) < 2:
+        return np.arange(len(labels))
+    size = min(counts.min(), size) if size else counts.min()
+
+    # group row indices by class with one stable sort rather than one scan per class.
+    rand = np.random.RandomState(seed)
+    grouped = np.split(np.argsort(inverse, kind='mergesort'), np.cumsum(counts)[:-1])
+    selected = np.concatenate([rows if len(rows) == size else rand.choice(rows, size, replace=False)
+                               for rows in grouped])
+    if shuffle:
+        rand.shuffle(selected)
+    else:
+        selected.sort()
+    return selected
+
+
+def balance_training_set(dataset: list, target, field, seed=None):
     """From a list of dataset which contain more than one class -
     as indicated by field, return a list of dataset which contain
     equal number of target classes - target and the rest."""
-    import random
-    pos_class = []
-    neg_class = []
-    for item in dataset:
-        if item[field] == target:
-            pos_class.append(item)
-        else:
-            neg_class.append(item)
-    if len(pos_class) > len(neg_class):
-        ret_dat = neg_class + random.sample(pos_class, len(neg_class))
-        random.shuffle(ret_dat)
-        return ret_dat
-    elif len(pos_class) < len(neg_class):
-        ret_dat = pos_class + random.sample(neg_class, len(pos_class))
-        random.shuffle(ret_dat)
-        return ret_dat
-    else:
+    indices = balance_indices([item[field] for item in dataset], target=target, seed=seed)
+    if len(indices) == len(dataset):
         return dataset
+    return [dataset[index] for index in indices]
+
+
+def count_en_th(document):
+    """
+    Count Thai and English characters in a document.
+    Thai characters are U+0E01 to U+0E5D, English characters are U+0041 ('A') to U+0079 ('y').
 
 
-def classify_en_th(document):
+    :param document: A string document.
+    :return: (Thai character count, English character count).
+    """
+    import re
+    # match whole runs of characters so that the scan stays in C; compiled patterns are cached by re.
+    th_count = sum(map(len, re.findall(u'[\u0e01-\u0e5d]+', document)))
+    en_count = sum(map(len, re.findall(u'[A-y]+', document)))
+    return th_count, en_count
+
+
+def count_en_th_batch(documents):
+    """
+    Count Thai and English characters in each of a list of documents at once.
+
+
+    :param documents: A list of string documents.
+    :return: (numpy array of Thai character counts, numpy array of English character counts).
+    """
+    import numpy as np
+
+    # view all documents as one array of code points.
+    code_points = np.frombuffer(''.join(documents).encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+    offsets = np.zeros(len(documents) + 1, dtype=np.int64)
+    np.cumsum([len(document) for document in documents], out=offsets[1:])
+
+    # cumulative counts so that empty documents get 0.
+    th_cum = np.concatenate(([0], np.cumsum((code_points >= 3585) & (code_points < 3678))))
+    en_cum = np.concatenate(([0], np.cumsum((code_points >= 65) & (code_points < 122))))
+    return th_cum[offsets[1:]] - th_cum[offsets[:-1]], en_cum[offsets[1:]] - en_cum[offsets[:-1]]
+
+
+def classify_en_th(document, counts=None):
     """Classify English documents from Thai documents and vise-versa
-    based on character count."""
-    th_count = 0
-    en_count = 0
-    for char in document:
-        if ord(char) in range(3585, 3678):
-            th_count += 1
-        elif ord(char) in range(65, 122):
-            en_count += 1
+    based on character count. Counts from count_en_th() can be passed
+    on to avoid counting again."""
+    th_count, en_count = counts if counts is not None else count_en_th(document)
     if en_count >= th_count:
         return 'en'
     else:
         return 'th'
+
+
+def classify_en_th_batch(documents):
+    """Classify each of a list of documents as 'en' or 'th' based on character count."""
+    th_counts, en_counts = count_en_th_batch(documents)
+    return ['en' if en_count >= th_count else 'th' for th_count, en_count in zip(th_counts, en_counts)]
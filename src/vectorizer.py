@@ -10,6 +10,8 @@ class VectorizerTFIDF:
         title_para: parameters of job title vectorizer - {"max_df":max_df, "min_df":min_df}.
         desc_para: parameters of job description vectorizer - {"max_df":max_df, "min_df":min_df}.
         filename: Path of the file into which VectorizerTFIDF is saved.
+        reducer: Fitted reduction of the stacked title and description features (see src/reduction.py),
+                    applied by Classifier._extract_features, or None.
     """
 
     def __init__(self, title_vectorizer, desc_vectorizer, date):
@@ -29,12 +31,14 @@ class VectorizerTFIDF:
         self.desc_vectorizer = desc_vectorizer
         self.desc_para = {'max_df': desc_vectorizer.max_df,
                           'min_df': desc_vectorizer.min_df}
+        self.reducer = None
 
     @staticmethod
     def load(filename):
-        """Load VectorizerTFIDF object from saved pickle file."""
+        """Load VectorizerTFIDF object from saved pickle file, possibly compressed."""
         import pickle
-        with open(filename, 'rb') as file_in:
+        from src.pipeline_io import open_input
+        with open_input(filename, 'rb') as file_in:
             loaded_vect = pickle.load(file_in)
         return loaded_vect
 
@@ -61,8 +65,8 @@ def fit_tfidf_vectorizer(tokenized_docs, doc_field, max_df=None, min_df=None):
 
     from sklearn.feature_extraction.text import TfidfVectorizer
 
-    # select document field to be tokenized.
-    tokenized_docs = [doc[doc_field] for doc in tokenized_docs]
+    # select document field to be tokenized - lazily, so that no second copy of the corpus is made.
+    tokenized_docs = (doc[doc_field] for doc in tokenized_docs)
 
     # instantiate TfidfVectorizer object.
     tfidf_vectorize = TfidfVectorizer(tokenizer=simple_split, max_df=max_df, min_df=min_df)
@@ -70,10 +74,136 @@ def fit_tfidf_vectorizer(tokenized_docs, doc_field, max_df=None, min_df=None):
     return tfidf_vectorize
 
 
+def _split_tokens(doc_segmented):
+    """Return a list of word-tokens by splitting doc_segmented whereby word-tokens are separated by '|'."""
+    return doc_segmented.split('|')
+
+
+def _count_document_frequency(shard):
+    """
+    Count document frequency of word-tokens over a shard of documents (worker function).
+
+
+    :param shard: (doc_field, list of segmented text) pair.
+    :return: (doc_field, number of documents, Counter{token: document frequency}).
+    """
+
+    from collections import Counter
+
+    doc_field, texts = shard
+    doc_freq = Counter()
+    for text in texts:
+        # TfidfVectorizer lower-cases documents before passing them onto the tokenizer.
+        doc_freq.update(set(_split_tokens(text.lower())))
+    return doc_field, len(texts), doc_freq
+
+
+def _generate_shards(tokenized_docs, doc_fields, shard_size):
+    """Yield (doc_field, list of segmented text) shards of at most shard_size documents for each field."""
+    for begin in range(0, len(tokenized_docs), shard_size):
+        shard_docs = tokenized_docs[begin:begin + shard_size]
+        for doc_field in doc_fields:
+            yield doc_field, [doc[doc_field] for doc in shard_docs]
+
+
+def _build_tfidf_vectorizer(doc_freq, n_docs, max_df, min_df):
+    """
+    Build a fitted TfidfVectorizer from merged document frequency counts.
+    Vocabulary pruning and idf weights follow TfidfVectorizer.fit with its default parameters.
+
+
+    :param doc_freq: Counter{token: document frequency} over the whole corpus.
+    :param n_docs: Number of documents in the corpus.
+    :param max_df: Maximum document frequency - (int) absolute count or (float) fraction of documents.
+    :param min_df: Minimum document frequency - (int) absolute count or (float) fraction of documents.
+    :return: Fitted scikit-learn TfidfVectorizer object.
+    """
+
+    import numpy as np
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    max_df = 1.0 if max_df is None else max_df
+    min_df = 1 if min_df is None else min_df
+    max_doc_count = max_df if isinstance(max_df, int) else max_df * n_docs
+    min_doc_count = min_df if isinstance(min_df, int) else min_df * n_docs
+    if max_doc_count < min_doc_count:
+        raise ValueError('max_df corresponds to < documents than min_df')
+
+    # prune and index vocabulary in sorted order - as done by CountVectorizer.
+    terms = sorted(term for term, count in doc_freq.items() if min_doc_count <= count <= max_doc_count)
+    if not terms:
+        raise ValueError('After pruning, no terms remain. Try a lower min_df or a higher max_df.')
+    vocabulary = {term: index for index, term in enumerate(terms)}
+
+    # smoothed idf: ln((1 + n) / (1 + df)) + 1
+    df = np.array([doc_freq[term] for term in terms], dtype=np.float64)
+    idf = np.log(float(n_docs + 1) / (df + 1)) + 1
+
+    tfidf_vectorize = TfidfVectorizer(tokenizer=_split_tokens, max_df=max_df, min_df=min_df)
+    set_vocabulary(tfidf_vectorize, vocabulary, idf)
+    return tfidf_vectorize
+
+
+def set_vocabulary(tfidf_vectorize, vocabulary, idf):
+    """
+    Set the fitted vocabulary and idf weights of a TfidfVectorizer object in place.
+
+
+    :param tfidf_vectorize: scikit-learn TfidfVectorizer object.
+    :param vocabulary: A dict {term: feature index}.
+    :param idf: numpy array of idf weights ordered by feature index.
+    :return: None
+    """
+
+    import scipy.sparse as sp
+
+    tfidf_vectorize.vocabulary_ = vocabulary
+    tfidf_vectorize.fixed_vocabulary_ = False
+    try:
+        tfidf_vectorize.idf_ = idf
+    except AttributeError:  # scikit-learn < 0.20 has no idf_ setter.
+        n_features = len(vocabulary)
+        tfidf_vectorize._tfidf._idf_diag = sp.spdiags(idf, diags=0, m=n_features, n=n_features, format='csr')
+
+
+def fit_tfidf_vectorizers_parallel(tokenized_docs, doc_fields, pool_process=None, shard_size=2000):
+    """
+    Fit scikit-learn TfidfVectorizer objects for several document fields at once.
+    Document frequencies are counted over corpus shards in pool processes and merged in the parent,
+    so that fields are fitted concurrently rather than one after the other.
+
+
+    :param tokenized_docs: A list of documents in dict format of which each word-tokens are separated by '|'.
+    :param doc_fields: A dict {doc_field: (max_df, min_df)} of data fields to be vectorized.
+    :param pool_process: Number of parallel processes. Default: number of available CPUs.
+    :param shard_size: Number of documents in a given shard.
+    :return: A dict {doc_field: fitted scikit-learn TfidfVectorizer object}.
+    """
+
+    from collections import Counter
+    from multiprocessing import Pool
+    from src.preload import preload
+
+    preload('vectorize')  # import once in the parent so that pool processes share the modules.
+    doc_freq = {doc_field: Counter() for doc_field in doc_fields}
+    n_docs = {doc_field: 0 for doc_field in doc_fields}
+
+    # count document frequency of each shard in parallel and merge partial counts.
+    with Pool(processes=pool_process) as pool:
+        shards = _generate_shards(tokenized_docs, list(doc_fields), shard_size)
+        for doc_field, shard_docs, shard_freq in pool.imap_unordered(_count_document_frequency, shards):
+            doc_freq[doc_field].update(shard_freq)
+            n_docs[doc_field] += shard_docs
+
+    return {doc_field: _build_tfidf_vectorizer(doc_freq[doc_field], n_docs[doc_field], max_df, min_df)
+            for doc_field, (max_df, min_df) in doc_fields.items()}
+
+
 def create_vectorizer(documents: dict, tokenize_func=None,
                       title_max_df=0.95, title_min_df=0.01,
                       desc_max_df=0.95, desc_min_df=0.025,
-                      dump=False):
+                      dump=False, pool_process=0,
+                      reduction=None, n_components=5000, label_field='label'):
     """
     Create a fitted VectorizerTFIDF object to be used for document feature extraction
     required for text classification by scikit-learn library.
@@ -100,13 +230,25 @@ def create_vectorizer(documents: dict, tokenize_func=None,
                         Providing (int)/(float) will specify minimum count in term of
                         (absolute number)/(fraction of total available features).
     :param dump: True will store VectorizerTFIDF object into a file.
+    :param pool_process: Number of parallel processes used to fit title and description vectorizers
+                        concurrently. 0 fits them one after the other in the current process,
+                        None uses all available CPUs.
+    :param reduction: Reduction of features fitted on the documents - 'chi2' or 'random_projection'
+                        (see fit_reducer in src/reduction.py). Default: no reduction.
+    :param n_components: Number of features after reduction - a positive integer.
+    :param label_field: Data field of the class of a document, used by 'chi2' reduction.
     :return: Fitted VectorizerTFIDF object.
     """
 
     from copy import deepcopy
     from datetime import date
+    from numbers import Integral
     import dill
+    from src.pipeline_io import open_output
 
+    if reduction and not (isinstance(n_components, Integral) and n_components > 0):
+        # fail before fitting the vectorizers rather than when fitting the reduction.
+        raise ValueError('n_components must be a positive integer')
     documents = deepcopy(documents)
     today = date.today()
 
@@ -118,14 +260,30 @@ def create_vectorizer(documents: dict, tokenize_func=None,
     # or that one wants to re-tokenize the documents.
     if tokenize_func:
         documents = tokenize_func(documents)
-    # create vectorizer for job title data.
-    title_vectorizer = fit_tfidf_vectorizer(documents, 'title_seg', title_max_df, title_min_df)
-    # create vectorizer for job description data.
-    desc_vectorizer = fit_tfidf_vectorizer(documents, 'desc_seg', desc_max_df, desc_min_df)
+    if pool_process == 0:
+        # create vectorizer for job title data.
+        title_vectorizer = fit_tfidf_vectorizer(documents, 'title_seg', title_max_df, title_min_df)
+        # create vectorizer for job description data.
+        desc_vectorizer = fit_tfidf_vectorizer(documents, 'desc_seg', desc_max_df, desc_min_df)
+    else:
+        # create vectorizers for job title and job description data concurrently.
+        vectorizers = fit_tfidf_vectorizers_parallel(documents, {'title_seg': (title_max_df, title_min_df),
+                                                                 'desc_seg': (desc_max_df, desc_min_df)},
+                                                     pool_process=pool_process)
+        title_vectorizer = vectorizers['title_seg']
+        desc_vectorizer = vectorizers['desc_seg']
     # create VectorizerTFIDF object.
     document_vectorizer = VectorizerTFIDF(title_vectorizer, desc_vectorizer, today)
+    if reduction:
+        # fit the reduction on the features of the documents - classifiers see only the reduced features.
+        from src.classifier import Classifier
+        from src.reduction import fit_reducer
+        data_vec = Classifier(document_vectorizer)._extract_features(documents)
+        document_vectorizer.reducer = fit_reducer(data_vec, reduction, n_components,
+                                                  labels=[doc.get(label_field) for doc in documents])
 
     if dump:  # if user wants to save the fitted vectorizer.
-        dill.dump(document_vectorizer, open(filename, 'wb'))
+        with open_output(filename, 'wb') as f_out:
+            dill.dump(document_vectorizer, f_out)
 
     return document_vectorizer
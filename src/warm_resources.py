@@ -0,0 +1,10 @@
+"""
+Importing this module preloads heavy modules and read-only tokenizer resources into the importing process.
+It is the forkserver preload of tokenize_documents(pool_mode='forkserver'), so that processes forked by the
+forkserver share them copy-on-write.
+"""
+
+from src.preload import preload, preload_resources
+
+preload('tokenize')
+preload_resources(freeze=True)  # the forkserver only forks workers - its objects never become garbage.
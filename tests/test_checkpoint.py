@@ -0,0 +1,26 @@
+import os
+
+from src.tokenizer import tokenize_documents, TokenizerPool, load_checkpoint
+
+DOCUMENTS = [{'title': str(index), 'desc': '{} {}'.format(index, index + 1)} for index in range(25)]
+
+
+def _tokenize(documents, **kwargs):
+    with TokenizerPool(pool_process=1) as pool:
+        tokenized = tokenize_documents(documents, pool=pool, shard_size=10, **kwargs)
+    return tokenized, sum(worker['items'] for worker in pool.stats.workers.values())
+
+
+def test_resume_tokenizes_only_missing_shards(tmp_path):
+    checkpoint_dir = str(tmp_path / 'checkpoint')
+    expected, tokenized_count = _tokenize(DOCUMENTS, checkpoint_dir=checkpoint_dir)
+    assert tokenized_count == 25
+    assert sorted(os.listdir(checkpoint_dir)) == ['shard_0000000000.jsonl', 'shard_0000000010.jsonl',
+                                                  'shard_0000000020.jsonl']
+    assert len(load_checkpoint(checkpoint_dir)) == 25
+
+    # an interrupted run: the second shard was not written.
+    os.remove(os.path.join(checkpoint_dir, 'shard_0000000010.jsonl'))
+    resumed, tokenized_count = _tokenize(DOCUMENTS, checkpoint_dir=checkpoint_dir)
+    assert tokenized_count == 10
+    assert resumed == expected
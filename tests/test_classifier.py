@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from sklearn.naive_bayes import MultinomialNB
+
+from src.benchmark import synthetic_tokenized_documents
+from src.classifier import Classifier
+from src.vectorizer import create_vectorizer
+
+
+@pytest.fixture(scope='module')
+def documents():
+    return synthetic_tokenized_documents(300, desc_tokens=50, vocabulary_size=500, seed=1)
+
+
+@pytest.fixture(scope='module')
+def classifier(documents):
+    classifier = Classifier(create_vectorizer(documents, title_min_df=1, desc_min_df=1))
+    data_vec = classifier._extract_features(documents)
+    rand = np.random.RandomState(0)
+    for class_index in range(3):
+        class_ = 'class' + str(class_index)
+        labels = np.where(rand.rand(len(documents)) < 0.4, class_, '!' + class_)
+        classifier.append(MultinomialNB().fit(data_vec, labels))
+    return classifier
+
+
+def test_predict_documents_matches_predict_document(classifier, documents):
+    predicted = classifier.predict_documents(documents[:30], thres=0.4)
+    for document in predicted:
+        expected_class, expected_proba = classifier.predict_document(document, thres=0.4)
+        assert document['predicted'] == expected_class
+        assert document['proba'] == pytest.approx(expected_proba)
+    assert 'predicted' not in documents[0]  # the input documents are not modified.
+
+
+@pytest.mark.parametrize('k, thres, class_thres', [(2, 0.4, None), (5, 0.3, {'class1': 0.9}), (1, 1.0, None)])
+def test_predict_top_k_matches_sorted_thresholded_proba(classifier, documents, k, thres, class_thres):
+    classes, proba = classifier.predict_proba_documents(documents[:50])
+    top_classes, label_ids, scores = classifier.predict_top_k(documents[:50], k=k, thres=thres,
+                                                              class_thres=class_thres)
+    assert top_classes == classes
+    assert label_ids.shape == scores.shape == (50, min(k, len(classes)))
+    for row in range(50):
+        thresholds = [(class_thres or {}).get(class_, thres) for class_ in classes]
+        expected = sorted(((float(proba[row, index]), index) for index in range(len(classes))
+                           if proba[row, index] > thresholds[index]), key=lambda item: -item[0])[:k]
+        n_assigned = len(expected)
+        assert list(label_ids[row, :n_assigned]) == [index for _, index in expected]
+        assert scores[row, :n_assigned] == pytest.approx([score for score, _ in expected], rel=1e-6)
+        # padding where fewer than k classes are over their threshold.
+        assert (label_ids[row, n_assigned:] == -1).all() and (scores[row, n_assigned:] == 0).all()
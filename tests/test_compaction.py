@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from sklearn.naive_bayes import MultinomialNB
+
+from src.benchmark import synthetic_tokenized_documents
+from src.classifier import Classifier
+from src.compaction import compact_classifier, select_features
+from src.vectorizer import create_vectorizer
+
+
+@pytest.fixture(scope='module')
+def documents():
+    return synthetic_tokenized_documents(200, desc_tokens=40, vocabulary_size=300, seed=2)
+
+
+@pytest.fixture(scope='module')
+def classifier(documents):
+    classifier = Classifier(create_vectorizer(documents, title_min_df=1, desc_min_df=1))
+    data_vec = classifier._extract_features(documents)
+    rand = np.random.RandomState(0)
+    for class_ in ('it', 'sales'):
+        classifier.append(MultinomialNB().fit(data_vec, np.where(rand.rand(len(documents)) < 0.4,
+                                                                 class_, '!' + class_)))
+    return classifier
+
+
+def test_compact_keeps_vocabulary_idf_and_weights_of_kept_columns(classifier):
+    compact, features = compact_classifier(classifier, threshold=0.5)
+    n_title = features['title_before']
+    keep = select_features(classifier.classifiers, n_title + features['desc_before'], 0.5)
+    assert 0 < keep.sum() < len(keep)
+    assert features['title_after'] + features['desc_after'] == keep.sum()
+
+    for field, mask in (('title_vectorizer', keep[:n_title]), ('desc_vectorizer', keep[n_title:])):
+        original, compacted = getattr(classifier.vectorizer, field), getattr(compact.vectorizer, field)
+        kept_terms = {term for term, index in original.vocabulary_.items() if mask[index]}
+        assert set(compacted.vocabulary_) == kept_terms
+        assert sorted(compacted.vocabulary_.values()) == list(range(len(kept_terms)))
+        for term in kept_terms:
+            assert compacted.idf_[compacted.vocabulary_[term]] == original.idf_[original.vocabulary_[term]]
+        # kept columns stay in their original order.
+        assert sorted(kept_terms, key=compacted.vocabulary_.get) == sorted(kept_terms, key=original.vocabulary_.get)
+
+    for original, compacted in zip(classifier.classifiers, compact.classifiers):
+        assert np.array_equal(compacted.feature_log_prob_, original.feature_log_prob_[:, keep])
+        assert compacted.n_features_in_ == keep.sum()
+
+
+def test_compact_with_zero_threshold_predicts_like_the_original(classifier, documents):
+    compact, features = compact_classifier(classifier, threshold=0)
+    assert features['title_after'] == features['title_before'] and features['desc_after'] == features['desc_before']
+    classes, proba = classifier.predict_proba_documents(documents[:50])
+    compact_classes, compact_proba = compact.predict_proba_documents(documents[:50])
+    assert compact_classes == classes
+    assert np.allclose(compact_proba, proba)
+    assert compact.predict_documents(documents[:50]) == classifier.predict_documents(documents[:50])
@@ -0,0 +1,23 @@
+import numpy as np
+
+import src.dedup
+from src.dedup import find_duplicates
+
+
+def test_candidates_are_verified_against_every_bucket_member(monkeypatch):
+    # the three documents share the first band; only b and c are similar.
+    signatures = {'a a': [1, 1, 1, 1, 9, 9, 9, 9], 'b b': [1, 1, 1, 1, 2, 2, 2, 2], 'c c': [1, 1, 1, 1, 2, 2, 2, 3]}
+    monkeypatch.setattr(src.dedup, 'minhash_signature',
+                        lambda text, coefficients, shingle_size: np.array(signatures[text], dtype=np.uint64))
+    documents = [{'title': name, 'desc': name} for name in 'abc']
+    representatives, report = find_duplicates(documents, threshold=0.8, num_perm=8, bands=2)
+    assert representatives == [0, 1, 1]
+    assert report['near_duplicates'] == 1
+
+
+def test_exact_duplicates_share_the_first_occurrence():
+    documents = [{'title': 'engineer', 'desc': 'python'}, {'title': 'chef', 'desc': 'thai food'},
+                 {'title': 'engineer', 'desc': 'python'}]
+    representatives, report = find_duplicates(documents)
+    assert representatives == [0, 1, 0]
+    assert report['exact_duplicates'] == 1
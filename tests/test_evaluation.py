@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from src.evaluation import tune_cutoffs, evaluate_cutoffs
+
+CLASSES = ['a', 'b', 'c']
+
+
+def _data(seed=0, n_docs=200):
+    rand = np.random.RandomState(seed)
+    labels = [CLASSES[index] for index in rand.randint(0, len(CLASSES), n_docs)]
+    truth = np.array(labels)[:, None] == np.array(CLASSES)[None, :]
+    # informative but noisy probabilities, rounded so that some documents tie.
+    proba = np.round(np.clip(0.35 * truth + rand.rand(n_docs, len(CLASSES)) * 0.7, 0, 1), 2)
+    return proba, labels, truth
+
+
+def _best_f_score(scores, truth, beta):
+    """Highest F-beta score over every cutoff separating distinct scores."""
+    best = 0.0
+    for score in np.unique(scores):
+        predicted = scores >= score
+        precision = (predicted & truth).sum() / predicted.sum()
+        recall = (predicted & truth).sum() / max(truth.sum(), 1)
+        if precision + recall:
+            best = max(best, (1 + beta ** 2) * precision * recall / (beta ** 2 * precision + recall))
+    return best
+
+
+@pytest.mark.parametrize('beta', [1.0, 2.0, 0.5])
+def test_tune_cutoffs_finds_the_best_cutoff(beta):
+    proba, labels, truth = _data()
+    tuned = tune_cutoffs(proba, labels, CLASSES, beta=beta)
+    for index, class_ in enumerate(CLASSES):
+        assert tuned[class_]['f_score'] == pytest.approx(_best_f_score(proba[:, index], truth[:, index], beta))
+        # the cutoff reproduces the reported precision and recall.
+        predicted = proba[:, index] > tuned[class_]['cutoff']
+        true_pos = (predicted & truth[:, index]).sum()
+        assert tuned[class_]['precision'] == pytest.approx(true_pos / predicted.sum())
+        assert tuned[class_]['recall'] == pytest.approx(true_pos / truth[:, index].sum())
+
+
+def test_evaluate_cutoffs_agrees_with_tuning():
+    proba, labels, _ = _data(seed=1)
+    tuned = tune_cutoffs(proba, labels, CLASSES)
+    evaluated = evaluate_cutoffs(proba, labels, CLASSES, {class_: tuned[class_]['cutoff'] for class_ in CLASSES})
+    for class_ in CLASSES:
+        assert evaluated[class_]['f_score'] == pytest.approx(tuned[class_]['f_score'])
+        assert evaluated[class_]['support'] == labels.count(class_)
+
+
+def test_every_document_is_positive_when_the_best_row_is_the_last_row():
+    # every document is positive, so the best cutoff keeps the least probable one positive.
+    proba = np.array([[0.9], [0.7], [0.5]])
+    labels = ['a', 'a', 'a']
+    tuned = tune_cutoffs(proba, labels, ['a'])
+    assert tuned['a']['recall'] == 1.0 and tuned['a']['cutoff'] < 0.5
+    evaluated = evaluate_cutoffs(proba, labels, ['a'], {'a': tuned['a']['cutoff']})
+    assert evaluated['a']['recall'] == 1.0
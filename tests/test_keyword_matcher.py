@@ -0,0 +1,48 @@
+import random
+
+from src.keyword_matcher import KeywordMatcher
+
+KEYWORDS = ['C++', 'c#', 'machine learning', 'learn', 'SQL', 'sql server', 'ภาษา', 'ภาษาไทย', 'ai', 'a']
+
+
+def _is_word_char(char):
+    return char < '\x80' and char.isalnum()
+
+
+def _naive_find(keywords, text):
+    """Leftmost-longest non-overlapping whole-word occurrences by trying every keyword at every position."""
+    keywords = {keyword.lower() for keyword in keywords}
+    lowered = text.lower()
+    matches = []
+    position = 0
+    while position < len(lowered):
+        found = [keyword for keyword in keywords if lowered.startswith(keyword, position) and
+                 not (position > 0 and _is_word_char(lowered[position]) and _is_word_char(lowered[position - 1])) and
+                 not (position + len(keyword) < len(lowered) and _is_word_char(keyword[-1]) and
+                      _is_word_char(lowered[position + len(keyword)]))]
+        if found:
+            end = position + max(len(keyword) for keyword in found)
+            matches.append((position, end))
+            position = end
+        else:
+            position += 1
+    return matches
+
+
+def test_find_matches_naive_search():
+    matcher = KeywordMatcher(KEYWORDS)
+    rand = random.Random(0)
+    pieces = KEYWORDS + ['Machine', 'Learning', 'server', 'ไทย', 'x', '+', ' ', ' ', '.', 'ai2']
+    for _ in range(500):
+        text = ''.join(rand.choice(pieces) + rand.choice(['', ' ']) for _ in range(rand.randrange(12)))
+        assert matcher.find(text) == _naive_find(KEYWORDS, text), text
+
+
+def test_lower_and_protected_tokens():
+    matcher = KeywordMatcher(KEYWORDS)
+    assert matcher.lower('Senior SQL Server and Machine Learning engineer') == \
+        'Senior sql server and machine learning engineer'
+    tokens = 'we use SQL Server for Machine Learning'.split(' ')
+    assert matcher.protected_tokens(tokens) == {2, 3, 5, 6}
+    assert matcher.find('learning Learned') == []
+    assert not KeywordMatcher([' ', '']).protected_tokens(tokens)
@@ -0,0 +1,15 @@
+import pickle
+
+import numpy as np
+
+
+def test_multi_nb_pickle_round_trip():
+    from src.multinomialNB import MultiNB
+
+    clf = MultiNB({'x': 0.6, '!x': 0.4}).fit(np.array([[3, 0], [0, 3], [2, 1], [1, 2]]), ['x', '!x', 'x', '!x'])
+    pickled = pickle.dumps(clf)
+    assert b'src.multinomialNB' in pickled and b'<locals>' not in pickled
+    loaded = pickle.loads(pickled)
+    assert type(loaded) is MultiNB
+    assert loaded.cutoff == clf.cutoff
+    assert loaded.predict(np.array([[3, 0], [0, 3]])) == clf.predict(np.array([[3, 0], [0, 3]]))
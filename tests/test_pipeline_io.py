@@ -0,0 +1,37 @@
+import gzip
+import json
+
+import pytest
+
+from src.pipeline_io import iter_json_records, JsonArrayWriter
+
+RECORDS = [{'pos': 'วิศวกร', 'desc': 'a}\n{b, [c]', 'n': index, 'skills': ['x' * (index * 7)]} for index in range(40)]
+
+
+def _crawler_format(records, ending):
+    """Objects one after the other, as written by the crawler."""
+    return '\n'.join(json.dumps(record, ensure_ascii=False, indent=1) for record in records) + ending
+
+
+@pytest.mark.parametrize('ending', ['\n', ',', ''])
+@pytest.mark.parametrize('buffer_size', [16, 1 << 20])
+def test_concatenated_objects(tmp_path, ending, buffer_size):
+    filename = str(tmp_path / 'raw.json')
+    with open(filename, 'wt', encoding='utf-8') as f_out:
+        f_out.write(_crawler_format(RECORDS, ending))
+    assert list(iter_json_records(filename, buffer_size=buffer_size)) == RECORDS
+
+
+def test_json_lines_and_compressed_array(tmp_path):
+    lines_filename = str(tmp_path / 'raw.jsonl')
+    with open(lines_filename, 'wt', encoding='utf-8') as f_out:
+        f_out.write('\n'.join(json.dumps(record) for record in RECORDS) + '\n')
+    assert list(iter_json_records(lines_filename, buffer_size=64)) == RECORDS
+
+    array_filename = str(tmp_path / 'out.json.gz')
+    with JsonArrayWriter(array_filename) as writer:
+        for record in RECORDS:
+            writer.write(record)
+    with gzip.open(array_filename, 'rt', encoding='utf-8') as f_in:
+        assert json.load(f_in) == RECORDS
+    assert list(iter_json_records(array_filename, buffer_size=64)) == RECORDS
@@ -0,0 +1,48 @@
+import gc
+import multiprocessing
+
+import pytest
+
+from src.preload import preload_resources, memory_usage
+from src.resources import REGISTRY
+from src.scheduler import imap_adaptive
+from src.tokenizer import tokenize_documents, TokenizerPool
+
+DOCUMENTS = [{'title': str(index), 'desc': '{} {}'.format(index, index + 1)} for index in range(20)]
+
+
+def _loaded_resources(_):
+    """Kinds of resources in the registry of a pool process before it tokenizes anything."""
+    return sorted({stats['kind'] for stats in REGISTRY.stats()})
+
+
+def test_preload_does_not_freeze_by_default():
+    frozen = gc.get_freeze_count()
+    timings = preload_resources()
+    assert timings['charset'] is not None
+    assert gc.get_freeze_count() == frozen
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='fork is not available')
+def test_fork_workers_share_preloaded_resources():
+    REGISTRY.clear()
+    frozen = gc.get_freeze_count()
+    with TokenizerPool(pool_process=2, pool_mode='fork', freeze=True) as pool:
+        assert gc.get_freeze_count() > frozen
+        # resources were loaded before the pool processes were forked.
+        assert 'charset' in next(imap_adaptive(_loaded_resources, [None], cost_func=lambda item: 1,
+                                               pool_process=2, pool=pool.pool))
+    assert gc.get_freeze_count() == frozen  # unfrozen when the pool closes.
+
+
+def test_per_worker_memory_report(capsys):
+    with TokenizerPool(pool_process=2, report_memory=True) as pool:
+        tokenized = tokenize_documents(DOCUMENTS, pool=pool)
+        workers = pool.stats.workers
+    assert len(tokenized) == len(DOCUMENTS)
+    assert sum(worker['items'] for worker in workers.values()) == len(DOCUMENTS)
+    for worker in workers.values():
+        assert worker['memory_before']['rss_mb'] > 0 and worker['memory_after']['rss_mb'] > 0
+    report = capsys.readouterr().out
+    assert report.count(', RSS ') == len(workers)
+    assert memory_usage()['rss_mb'] > 0
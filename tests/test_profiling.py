@@ -0,0 +1,67 @@
+import re
+
+from src.profiling import enable_profiling, PROFILER, StageProfiler
+
+
+def _profiler(times):
+    profiler = StageProfiler(enabled=True)
+    profiler._perf_counter = iter(times).__next__  # deterministic clock.
+    return profiler
+
+
+def test_counts_and_times_accumulate():
+    profiler = _profiler([0.0, 0.5, 1.0, 1.25, 2.0, 3.0])
+    for stage, tokens in (('segment', 10), ('segment', 5), ('lemmatize', 3)):
+        profiler.record(stage, profiler.clock(), tokens)
+    profiler.count('lemma_cache_hit', 7)
+    assert profiler.stages == {'segment': [2, 0.75, 15], 'lemmatize': [1, 1.0, 3], 'lemma_cache_hit': [1, 0.0, 7]}
+
+    other = StageProfiler(enabled=True)
+    other.merge({'segment': [1, 0.25, 5]})
+    other.merge(profiler.pop())
+    assert not profiler.stages
+    summary = other.summary()
+    assert summary['segment'] == {'calls': 3, 'seconds': 1.0, 'tokens': 20, 'ms_per_call': 1000 / 3}
+
+    report = other.report().split('\n')
+    assert report[0].split() == ['stage', 'calls', 'seconds', '%', 'tokens', 'ms/call']
+    # slowest stages first.
+    assert [line.split()[0] for line in report[1:]] == ['lemmatize', 'segment', 'lemma_cache_hit']
+    assert report[2].split()[1:5] == ['3', '1.00', '50.0%', '20']
+
+
+def test_prometheus_text_is_well_formed():
+    profiler = _profiler([0.0, 0.5, 1.0, 3.0])
+    profiler.record('clean', profiler.clock(), 4)
+    profiler.record('segment', profiler.clock(), 6)
+    text = profiler.prometheus(prefix='job')
+    assert text.endswith('\n')
+    sample = re.compile(r'job_stage_(calls|seconds|tokens)_total\{stage="(clean|segment)"\} [0-9.]+')
+    names = []
+    for line in text.splitlines():
+        if line.startswith('# HELP '):
+            names.append(line.split()[2])
+        elif line.startswith('# TYPE '):
+            assert line.split()[2:] == [names[-1], 'counter']
+        else:
+            assert sample.fullmatch(line) and line.startswith(names[-1] + '{')
+    assert names == ['job_stage_calls_total', 'job_stage_seconds_total', 'job_stage_tokens_total']
+    assert 'job_stage_seconds_total{stage="segment"} 2.0' in text.splitlines()
+    assert 'job_stage_tokens_total{stage="clean"} 4' in text.splitlines()
+
+
+def test_enable_profiling_switches_the_process_profiler():
+    enabled = PROFILER.enabled
+    stages = PROFILER.pop()
+    try:
+        enable_profiling(False)
+        assert PROFILER.clock() == 0
+        PROFILER.record('clean', PROFILER.clock(), 1)
+        PROFILER.count('lemma_cache_hit', 1)
+        assert not PROFILER.stages
+        enable_profiling()
+        PROFILER.record('clean', PROFILER.clock(), 1)
+        assert PROFILER.stages['clean'][0] == 1 and PROFILER.stages['clean'][1] >= 0
+    finally:
+        enable_profiling(enabled)
+        PROFILER.stages = stages
@@ -0,0 +1,57 @@
+import dill
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix
+
+from src.benchmark import synthetic_tokenized_documents
+from src.classifier import Classifier
+from src.reduction import FeatureSelector, fit_reducer
+from src.vectorizer import create_vectorizer
+
+
+@pytest.fixture(scope='module')
+def documents():
+    documents = synthetic_tokenized_documents(120, desc_tokens=30, vocabulary_size=200, seed=3)
+    for index, document in enumerate(documents):
+        document['label'] = ('it', 'sales', None)[index % 3]
+    return documents
+
+
+def test_selector_keeps_the_selected_columns():
+    data_vec = csr_matrix(np.arange(24, dtype=np.float64).reshape(4, 6))
+    selector = FeatureSelector(np.array([1, 3, 4]), 6)
+    assert selector.n_components_ == 3 and selector.n_features_in_ == 6
+    selected = selector.transform(data_vec)
+    assert selected.format == 'csr'
+    assert np.array_equal(selected.toarray(), data_vec.toarray()[:, [1, 3, 4]])
+
+
+@pytest.mark.parametrize('n_components', [None, 0, 2.5])
+def test_reduction_requires_a_positive_number_of_components(documents, n_components):
+    with pytest.raises(ValueError):
+        create_vectorizer(documents, title_min_df=1, desc_min_df=1, reduction='chi2', n_components=n_components)
+    with pytest.raises(ValueError):
+        fit_reducer(csr_matrix(np.eye(3)), 'random_projection', n_components)
+
+
+@pytest.mark.parametrize('reduction', ['chi2', 'random_projection'])
+def test_extract_features_applies_the_reducer(documents, reduction):
+    vectorizer = create_vectorizer(documents, title_min_df=1, desc_min_df=1, reduction=reduction, n_components=20)
+    assert vectorizer.reducer.n_components_ == 20
+    reduced = Classifier(vectorizer)._extract_features(documents[:10])
+    assert reduced.shape == (10, 20)
+    reducer, vectorizer.reducer = vectorizer.reducer, None
+    full = Classifier(vectorizer)._extract_features(documents[:10])
+    assert np.allclose(reduced.toarray(), reducer.transform(full).toarray())
+
+
+def test_vectorizer_pickled_before_reduction_extracts_all_features(documents):
+    vectorizer = create_vectorizer(documents, title_min_df=1, desc_min_df=1)
+    expected = Classifier(vectorizer)._extract_features(documents[:10])
+    del vectorizer.reducer  # vectorizers saved before reduction existed have no reducer attribute.
+    loaded = dill.loads(dill.dumps(vectorizer))
+    assert not hasattr(loaded, 'reducer')
+    features = Classifier(loaded)._extract_features(documents[:10])
+    assert features.shape[1] == len(vectorizer.title_vectorizer.vocabulary_) + \
+        len(vectorizer.desc_vectorizer.vocabulary_)
+    assert np.allclose(features.toarray(), expected.toarray())
@@ -0,0 +1,24 @@
+import random
+
+from src.resources import REGISTRY, FrozenCharSet
+from src.tokenizer import load_char_set, get_word_list
+
+
+def test_frozen_char_set_matches_dict():
+    charset = load_char_set('./Resource/misc/charset')
+    frozen = FrozenCharSet(charset)
+    rand = random.Random(0)
+    pool = list(charset) + ['\x00', '\n', '•', 'é', '\U0001f600']
+    for _ in range(200):
+        text = ''.join(rand.choice(pool) for _ in range(rand.randrange(60)))
+        assert frozen.filter(text) == ''.join(char for char in text if charset.get(char))
+        assert all(bool(frozen.get(char)) == bool(charset.get(char)) for char in text)
+
+
+def test_registry_loads_word_list_once():
+    filename = './Resource/WordList/stopwords_en_.txt'
+    words = REGISTRY.get('word_list', filename)
+    assert isinstance(words, frozenset)
+    assert words == get_word_list(filename)
+    assert REGISTRY.get('word_list', filename) is words
+    assert any(stats['filename'] == filename and stats['size_bytes'] > 0 for stats in REGISTRY.stats())
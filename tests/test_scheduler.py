@@ -0,0 +1,32 @@
+import time
+
+import pytest
+
+from src.scheduler import imap_adaptive, PoolStats
+
+
+def _slow_square(item):
+    # later items finish first, so that batches complete out of input order.
+    time.sleep(0.002 * (item % 5))
+    return item * item
+
+
+@pytest.mark.parametrize('batch_size', [7, None])
+def test_results_come_back_in_input_order(batch_size):
+    items = list(range(200))
+    stats = PoolStats(3)
+    results = list(imap_adaptive(_slow_square, items, cost_func=lambda item: item % 5 + 1, pool_process=3,
+                                 batch_size=batch_size, target_seconds=0.01, stats=stats))
+    assert results == [item * item for item in items]
+    summary = stats.summary()
+    assert sum(worker['items'] for worker in summary['per_worker'].values()) == len(items)
+    assert sum(worker['cost'] for worker in summary['per_worker'].values()) == sum(item % 5 + 1 for item in items)
+    if batch_size:
+        assert summary['batches'] == 29  # 28 batches of 7 and one of 4.
+    assert stats.end is not None and len(summary['per_worker']) <= 3
+
+
+def test_no_items_yield_nothing():
+    stats = PoolStats(2)
+    assert list(imap_adaptive(_slow_square, [], pool_process=2, stats=stats)) == []
+    assert stats.summary()['batches'] == 0 and stats.end is not None
@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+import numpy as np
+
+from src import service
+from src.service import ClassificationService, validate_document
+
+
+class _Classifier:
+    classes_ = ['a']
+    classifiers = []
+
+    def predict_proba_documents(self, documents):
+        return ['a'], np.full((len(documents), 1), 0.9)
+
+
+def test_validate_document():
+    assert validate_document({'title': 't', 'desc': 'd'}) is None
+    assert validate_document({'title': 't'})
+    assert validate_document({'title': 't', 'desc': None})
+    assert validate_document(['t', 'd'])
+
+
+def test_classify_batch_isolates_failed_documents(monkeypatch):
+    import src.tokenizer
+
+    def tokenize_document(doc, **kwargs):
+        if doc['title'] == 'bad':
+            raise ValueError('cannot tokenize')
+        return {'title_seg': doc['title'], 'desc_seg': doc['desc']}
+
+    monkeypatch.setattr(src.tokenizer, 'tokenize_document', tokenize_document)
+    monkeypatch.setitem(service._worker_state, 'classifier', _Classifier())
+    monkeypatch.setitem(service._worker_state, 'ngram', {})
+    classes, proba, errors = service._classify_batch([{'title': 'ok', 'desc': ''}, {'title': 'bad', 'desc': ''},
+                                                      {'title': 'ok', 'desc': ''}])
+    assert classes == ['a']
+    assert list(errors) == [1]
+    assert proba[0, 0] == proba[2, 0] == 0.9
+
+
+class _Service(ClassificationService):
+    async def classify(self, document):
+        if document['title'] == 'boom':
+            raise RuntimeError('failed')
+        return {'predicted': 'a', 'proba': {'a': 0.9}}
+
+
+def _request(payload):
+    async def run():
+        app = _Service('unused')
+        server = await asyncio.start_server(app._handle_connection, host='127.0.0.1', port=0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        body = payload.encode('utf-8')
+        writer.write(('POST /classify HTTP/1.1\r\nContent-Length: ' + str(len(body)) +
+                      '\r\nConnection: close\r\n\r\n').encode('latin-1') + body)
+        response = await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        head, _, body = response.partition(b'\r\n\r\n')
+        return int(head.split()[1]), json.loads(body.decode('utf-8'))
+    return asyncio.run(run())
+
+
+def test_service_answers_every_request():
+    assert _request(json.dumps([{'title': 't', 'desc': 'd'}]))[0] == 200
+    status, payload = _request(json.dumps([{'title': 't', 'desc': 'd'}, {'title': 't'}]))
+    assert status == 400 and payload['index'] == 1
+    assert _request(json.dumps('text'))[0] == 400
+    assert _request('{not json')[0] == 400
+    assert _request(json.dumps({'title': 'boom', 'desc': 'd'}))[0] == 500
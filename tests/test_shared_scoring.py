@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from src.shared_scoring import share_arrays, attach_arrays
+
+ATTACH_SCRIPT = '''
+import sys
+from src.shared_scoring import attach_arrays
+blocks, arrays = attach_arrays({'a': (sys.argv[1], (5,), '<i8')})
+print(int(arrays['a'].sum()))
+for block in blocks:
+    block.close()
+'''
+
+
+def test_blocks_outlive_an_attaching_process():
+    blocks, specs = share_arrays({'a': np.arange(5, dtype=np.int64)})
+    try:
+        # a process which is not a child of the creator attaches the block and exits.
+        result = subprocess.run([sys.executable, '-c', ATTACH_SCRIPT, specs['a'][0]],
+                                capture_output=True, text=True, timeout=60,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        assert result.stdout.strip() == '10'
+        assert 'leaked' not in result.stderr and 'Traceback' not in result.stderr
+        attached, arrays = attach_arrays(specs)
+        assert list(arrays['a']) == [0, 1, 2, 3, 4]
+        for block in attached:
+            block.close()
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix
+from sklearn.preprocessing import normalize
+
+from src.similarity_index import SimilarityIndex
+
+
+@pytest.fixture(scope='module')
+def vectors():
+    # 10 clusters of 30 sparse non-negative vectors around random centres.
+    rand = np.random.RandomState(0)
+    centres = rand.rand(10, 200) * (rand.rand(10, 200) < 0.1)
+    noise = rand.rand(300, 200) * (rand.rand(300, 200) < 0.02)
+    return csr_matrix(np.repeat(centres, 30, axis=0) + 0.3 * noise)
+
+
+def _brute_force(vectors, k):
+    normalized = normalize(vectors).toarray()
+    similarities = normalized @ normalized.T
+    np.fill_diagonal(similarities, -np.inf)
+    return np.argsort(-similarities, axis=1, kind='stable')[:, :k]
+
+
+def test_neighbours_agree_with_brute_force(vectors):
+    index = SimilarityIndex.build(vectors, n_tables=8, n_bits=8)
+    rows, similarities = index.neighbours(np.arange(vectors.shape[0]), k=5)
+    expected = _brute_force(vectors, 5)
+    recall = np.mean([len(set(found) & set(true)) / 5 for found, true in zip(rows, expected)])
+    assert recall >= 0.9
+    assert (rows != np.arange(vectors.shape[0])[:, None]).all()  # the query row is excluded.
+    assert (np.diff(similarities, axis=1) <= 0).all()
+
+
+def test_query_finds_the_query_row_unless_excluded(vectors):
+    index = SimilarityIndex.build(vectors, n_tables=8, n_bits=8)
+    rows, similarities = index.query(vectors[:20], k=3)
+    assert list(rows[:, 0]) == list(range(20))
+    assert similarities[:, 0] == pytest.approx(1, abs=1e-5)
+    rows, _ = index.query(vectors[:20], k=3, exclude=np.arange(20))
+    assert (rows != np.arange(20)[:, None]).all()
+
+
+def test_results_are_padded_when_fewer_than_k_are_found(vectors):
+    index = SimilarityIndex.build(vectors[:4], n_tables=4, n_bits=4)
+    rows, similarities = index.neighbours([0, 1], k=6)
+    assert (rows[:, 3:] == -1).all() and (similarities[:, 3:] == 0).all()
+    rows, similarities = SimilarityIndex.build(vectors).query(vectors[:5], k=20, max_candidates=8)
+    assert ((rows == -1).sum(axis=1) >= 12).all()
+    assert (similarities[rows == -1] == 0).all()
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_save_and_load_give_identical_results(vectors, tmp_path, mmap):
+    index = SimilarityIndex.build(vectors, n_tables=6, n_bits=10, seed=3)
+    index.save(str(tmp_path / 'index'))
+    loaded = SimilarityIndex.load(str(tmp_path / 'index'), mmap=mmap)
+    assert len(loaded) == len(index) and loaded.n_tables == 6 and loaded.n_bits == 10
+    expected = index.neighbours(np.arange(50), k=5)
+    result = loaded.neighbours(np.arange(50), k=5)
+    assert np.array_equal(result[0], expected[0]) and np.array_equal(result[1], expected[1])
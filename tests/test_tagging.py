@@ -0,0 +1,100 @@
+import numpy as np
+import pandas
+import pytest
+from sklearn.naive_bayes import MultinomialNB
+
+from src.tagging import convert_to_columnar, ColumnarData, TagJournal, export_tags, uncertainty, UncertaintyQueue
+
+
+def test_export_keeps_source_columns(tmp_path):
+    source = pandas.DataFrame({'id': [11, 12, 13], 'title': ['engineer', 'วิศวกร', None],
+                               'desc': ['a', 'b', 'c'], 'predict': ['it', None, 'it'],
+                               'salary': [1.5, 2.5, 3.5], 'skills': [['python'], [], ['sql', 'excel']]},
+                              index=['x', 'y', 'z'])
+    source.to_pickle(str(tmp_path / 'data.pkl'))
+    convert_to_columnar(str(tmp_path / 'data.pkl'), str(tmp_path / 'data.columns'))
+    data = ColumnarData(str(tmp_path / 'data.columns'))
+    assert data.columns == list(source.columns)
+
+    journal = TagJournal(str(tmp_path / 'ret.journal'))
+    journal.start([2, 0, 1])
+    journal.record(2, 'neg')
+    journal.record(0, 'pos')
+    journal.close()
+    tagged = export_tags(data, journal, str(tmp_path / 'ret'))
+
+    assert list(tagged.index) == ['z', 'x']
+    assert list(tagged.columns) == list(source.columns) + ['tag']
+    assert list(tagged['tag']) == ['neg', 'pos']
+    expected = source.loc[['z', 'x']]
+    for column in ('id', 'desc', 'predict', 'salary', 'skills'):
+        assert tagged[column].dtype == expected[column].dtype
+        assert list(tagged[column]) == list(expected[column])
+    assert list(tagged['title']) == ['', 'engineer']  # missing text is stored as ''.
+
+
+class _Bank:
+    """Stand-in for Classifier: documents carry their feature vector."""
+
+    def __init__(self, classifiers):
+        self.classifiers = classifiers
+
+    def _extract_features(self, documents):
+        from scipy.sparse import csr_matrix
+        return csr_matrix(np.array([document['x'] for document in documents], dtype=np.float64))
+
+
+def _bank_and_features(n_rows=40, seed=0):
+    rand = np.random.RandomState(seed)
+    features = rand.randint(0, 5, size=(n_rows, 6))
+    classifiers = []
+    for class_ in ('it', 'sales'):
+        labels = np.where(rand.rand(n_rows) < 0.5, class_, '!' + class_)
+        classifiers.append(MultinomialNB().fit(features, labels))
+    return _Bank(classifiers), features
+
+
+def _queue(bank, features, **kwargs):
+    queue = UncertaintyQueue(bank, lambda rows: [{'x': features[row]} for row in rows], **kwargs)
+    queue.extend(range(len(features)))
+    return queue
+
+
+def test_uncertainty():
+    proba = np.array([[0.5, 0.1], [0.9, 0.0], [0.8, 0.7], [0.95, 0.05]])
+    assert np.allclose(uncertainty(proba), [0.0, 0.4, 0.1, 0.45])
+    assert np.allclose(uncertainty(proba[:, :1], thres=0.6), [0.1, 0.3, 0.2, 0.35])
+
+
+def test_queue_serves_the_most_uncertain_of_the_whole_selection():
+    bank, features = _bank_and_features()
+    proba = np.column_stack([clf.predict_proba(features)[:, 1] for clf in bank.classifiers])
+    expected = uncertainty(proba)
+    queue = _queue(bank, features, batch_size=4)
+    served = [queue.pop() for _ in range(len(features))]
+    assert queue.pop() is None
+    assert served[0][0] == int(np.argmin(expected))
+    assert [score for _, score in served] == sorted(score for _, score in served)
+    assert sorted(row for row, _ in served) == list(range(len(features)))
+
+
+def test_labels_update_classifiers_and_rescore_kept_rows():
+    bank, features = _bank_and_features()
+    queue = _queue(bank, features, batch_size=8, rescore_every=1, max_features=10)
+    row, _ = queue.pop()
+    # only the feature vectors of the most uncertain rows are kept.
+    assert queue.features.shape[0] == 10 and row in queue.positions
+    counts = [clf.feature_count_.copy() for clf in bank.classifiers]
+    queue.label(row, 'it')
+    assert not np.allclose(counts[0], bank.classifiers[0].feature_count_)
+    assert row not in queue.positions and len(queue.positions) == 9
+
+    # kept rows still queued were re-scored with the updated classifiers.
+    proba = np.column_stack([clf.predict_proba(features)[:, 1] for clf in bank.classifiers])
+    rescored = uncertainty(proba)
+    queued = dict((row, score) for score, row in queue.heap)
+    assert queue.positions
+    for kept_row in queue.positions:
+        assert queued[kept_row] == pytest.approx(rescored[kept_row])
+    queue.label(queue.pop()[0], 'not sure')  # ignored tags do not update classifiers.
+    assert queue.n_updates == 1
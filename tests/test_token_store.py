@@ -0,0 +1,76 @@
+import os
+from functools import partial
+
+import pytest
+
+from src.token_store import _file_digest, tokenizer_config, TokenStore
+from src.tokenizer import tokenize_documents, TokenizerPool
+
+DOCUMENTS = [{'title': str(index), 'desc': '{} {}'.format(index, index + 1)} for index in range(25)]
+
+
+def test_file_digest_falls_back_to_dot_relative_path(tmp_path, monkeypatch):
+    (tmp_path / 'Resource').mkdir()
+    (tmp_path / 'Resource' / 'words.txt').write_text('engineer\n', encoding='utf-8')
+    (tmp_path / 'src').mkdir()
+    monkeypatch.chdir(tmp_path / 'src')
+    assert _file_digest('./Resource/words.txt') == _file_digest(str(tmp_path / 'Resource' / 'words.txt'))
+
+
+def test_config_covers_resource_modules():
+    config = tokenizer_config()
+    assert config['resources'] and config['keyword_matcher'] and config['tokenizer']
+    assert config['limits'] is None
+
+
+def test_store_is_emptied_by_a_configuration_change(tmp_path):
+    filename = str(tmp_path / 'tokens.sqlite')
+    store = TokenStore(filename, {'title_ngram': 5})
+    store.put_many([('h1', 'a|b', 'c'), ('h2', 'd', 'e|f')])
+    assert store.get_many(['h1', 'h3']) == {'h1': ('a|b', 'c')}
+    store.close()
+
+    store = TokenStore(filename, {'title_ngram': 5})
+    assert len(store) == 2 and not store.invalidated
+    store.close()
+
+    store = TokenStore(filename, {'title_ngram': 4})
+    assert len(store) == 0 and store.invalidated
+    store.close()
+    assert os.path.exists(filename)
+
+
+def _tokenize(documents, **kwargs):
+    with TokenizerPool(pool_process=1) as pool:
+        tokenized = tokenize_documents(documents, pool=pool, **kwargs)
+    return tokenized, sum(worker['items'] for worker in pool.stats.workers.values())
+
+
+def test_token_store_serves_a_second_run(tmp_path):
+    store_filename = str(tmp_path / 'tokens.sqlite')
+    expected, tokenized_count = _tokenize(DOCUMENTS, store_filename=store_filename)
+    assert tokenized_count == 25
+    changed = DOCUMENTS[:5] + [{'title': '99', 'desc': '100 101'}]
+    stored, tokenized_count = _tokenize(changed, store_filename=store_filename)
+    assert tokenized_count == 1
+    assert stored[:5] == expected[:5]
+
+
+def _fail_on_marker(tokenize_func, document):
+    if document['title'] == 'fail':
+        raise ValueError('cannot tokenize')
+    return tokenize_func(document)
+
+
+def test_store_keeps_documents_tokenized_before_an_error(tmp_path, monkeypatch):
+    closed = []
+    monkeypatch.setattr(TokenStore, 'close', lambda self: closed.append(self.connection.close()))
+    documents = DOCUMENTS[:6] + [{'title': 'fail', 'desc': ''}] + DOCUMENTS[6:]
+    store_filename = str(tmp_path / 'tokens.sqlite')
+    with TokenizerPool(pool_process=1) as pool:
+        pool.tokenize_func = partial(_fail_on_marker, pool.tokenize_func)
+        with pytest.raises(ValueError):
+            tokenize_documents(documents, pool=pool, chunksize=1, store_filename=store_filename)
+    assert len(closed) == 1
+    with TokenStore(store_filename, tokenizer_config()) as store:
+        assert len(store) == 6
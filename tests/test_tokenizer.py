@@ -0,0 +1,119 @@
+import re
+import time
+from functools import lru_cache
+
+import pytest
+
+import src.tokenizer
+from src.profiling import COUNTERS
+from src.tokenizer import english_normalizer, lemma_cache_info, tokenize, tokenize_cleaned, tokenize_documents, \
+    TokenizerPool
+
+THAI_DOCUMENT = ' '.join(['กขค'] * 10)
+
+
+def _slow_th_tokenizer(phrase):
+    time.sleep(0.05)
+    return list(phrase)
+
+
+def test_limits_are_opt_in():
+    COUNTERS.stages.clear()
+    tokens = tokenize(THAI_DOCUMENT, lambda text: text, list, 2, stop_en_filename=None)
+    assert tokens.split('|').count('กข') == 10
+    assert not COUNTERS.stages
+
+
+def test_time_budget_stops_segmentation():
+    COUNTERS.stages.clear()
+    tokens = tokenize(THAI_DOCUMENT, lambda text: text, _slow_th_tokenizer, 2, stop_en_filename=None,
+                      limits={'time_budget_sec': 0.12}, field='title').split('|')
+    # phrases past the deadline are kept whole and no n-grams are compiled.
+    assert 'กขค' in tokens and 'กข' not in tokens
+    assert COUNTERS.stages['title.time_budget_sec'][2] == 1
+
+
+def test_pool_is_shared_by_chunks(tmp_path):
+    documents = [{'title': '123 456', 'desc': '789 000'} for _ in range(10)]
+    metrics_filename = str(tmp_path / 'metrics.prom')
+    with TokenizerPool(pool_process=2, metrics_filename=metrics_filename) as pool:
+        for _ in range(2):
+            tokenized = tokenize_documents(documents, pool=pool)
+            assert [doc['title_seg'] for doc in tokenized] == ['123|456|123 456'] * 10
+        pids = set(pool.stats.workers)
+    assert len(pids) <= 2
+    # metrics are written once, for both chunks.
+    assert 'tokenizer_stage_calls_total{stage="clean"} 40' in open(metrics_filename, encoding='utf-8').read()
+
+
+THAI_CHAR = re.compile(u'[\u0e01-\u0e5d]')
+SAMPLE = 'The Cats were running ZOO zebra Python3 data-science analyses ' \
+         'the ml engineers ' + 'กขคง จฉ ' + 'buses Buses  ' + 'AI ai'
+
+
+def _lemmatize(token):
+    """Stand-in for WordNetLemmatizer.lemmatize - the wordnet corpus is not needed."""
+    return token[:-1] if token.endswith('s') else token
+
+
+def _th_tokenizer(phrase):
+    return [phrase[index:index + 2] for index in range(0, len(phrase), 2)]
+
+
+def _tokenize_cleaned_before(document, stopwords_en, stopwords_th, keywords):
+    """Reference - tokenize_cleaned before lemmas were cached, with its Thai stop word removal fixed."""
+    def test_all_en_alpha(text):
+        roman_alpha = [chr(alpha) for alpha in range(65, 90)] + [chr(alpha) for alpha in range(97, 122)]
+        for alpha in text:
+            if alpha not in roman_alpha:
+                return False
+        return True
+
+    document = [token.lower() for token in document.split(' ') if token not in stopwords_en]
+    document = [_lemmatize(token) if test_all_en_alpha(token) and token not in keywords else token
+                for token in document]
+    tokenized = []
+    for token in document:
+        if THAI_CHAR.search(token):
+            tokenized.extend(_th_tokenizer(token))
+        else:
+            tokenized.append(token)
+    for token_index in reversed(range(len(tokenized))):
+        if tokenized[token_index] in stopwords_th:
+            tokenized.pop(token_index)
+    return tokenized
+
+
+@pytest.fixture
+def cached_lemmatize(monkeypatch):
+    english_normalizer()  # the letter test is the one under test - only the lemmatizer is replaced.
+    lemmatize = lru_cache(maxsize=src.tokenizer.LEMMA_CACHE_SIZE)(_lemmatize)
+    monkeypatch.setitem(src.tokenizer._normalizer, 'lemmatize', lemmatize)
+    return lemmatize
+
+
+@pytest.mark.parametrize('stopwords_en, stopwords_th, keywords', [
+    (set(), set(), set()),
+    ({'The', 'the', 'were'}, set(), {'buses', 'ai'}),
+    ({'the'}, {'จฉ', 'กข'}, {'analyses'}),
+])
+def test_normalization_matches_the_previous_tokenizer(cached_lemmatize, stopwords_en, stopwords_th, keywords):
+    tokens = tokenize_cleaned(SAMPLE, _th_tokenizer, THAI_CHAR, stopwords_en, stopwords_th, keywords)
+    assert tokens == _tokenize_cleaned_before(SAMPLE, stopwords_en, stopwords_th, keywords)
+    # 'z' is not an English letter of the lemmatizer, as before.
+    assert 'zoo' in tokens and 'cat' in tokens
+
+
+def test_thai_stop_words_are_removed(cached_lemmatize):
+    # the previous tokenizer called .pop on the tokenize_document function as soon as a Thai stop word was found.
+    tokens = tokenize_cleaned('กขคง engineer จฉ', _th_tokenizer, THAI_CHAR, set(), frozenset({'กข', 'จฉ'}), set())
+    assert tokens == ['คง', 'engineer']
+
+
+def test_lemma_cache_counts_hits(cached_lemmatize):
+    before = lemma_cache_info()
+    tokenize_cleaned('cats dogs', _th_tokenizer, THAI_CHAR, set(), set(), set())
+    tokenize_cleaned('cats dogs cats', _th_tokenizer, THAI_CHAR, set(), set(), set())
+    info = lemma_cache_info()
+    assert info['misses'] - before['misses'] == 2 and info['hits'] - before['hits'] == 3
+    assert info['size'] == 2 and info['hit_rate'] == pytest.approx(3 / 5)
@@ -0,0 +1,75 @@
+import random
+from collections import Counter
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from src.utils import balance_indices, balance_training_set, classify_en_th, classify_en_th_batch, count_en_th, \
+    count_en_th_batch
+
+LABELS = ['a'] * 10 + ['b'] * 4 + ['c'] * 7
+
+
+def test_classes_are_balanced_to_the_smallest():
+    indices = balance_indices(LABELS, seed=0)
+    assert len(set(indices)) == len(indices) == 12
+    assert Counter(LABELS[index] for index in indices) == {'a': 4, 'b': 4, 'c': 4}
+
+
+def test_target_is_balanced_against_the_rest():
+    indices = balance_indices(LABELS, target='b', seed=0, shuffle=False)
+    assert list(indices) == sorted(indices)
+    assert Counter(LABELS[index] == 'b' for index in indices) == {True: 4, False: 4}
+    assert len(balance_indices(LABELS, size=2, seed=0)) == 6
+
+
+def test_selection_is_reproducible_and_slices_matrices():
+    assert list(balance_indices(LABELS, seed=1)) == list(balance_indices(LABELS, seed=1))
+    assert list(balance_indices(['a'] * 3)) == [0, 1, 2]
+    matrix = csr_matrix(np.arange(len(LABELS))[:, None])
+    indices = balance_indices(LABELS, seed=2)
+    assert list(matrix[indices].toarray()[:, 0]) == list(indices)
+
+
+def test_balance_training_set_matches_indices():
+    dataset = [{'label': label, 'row': row} for row, label in enumerate(LABELS)]
+    balanced = balance_training_set(dataset, 'a', 'label', seed=3)
+    assert [item['row'] for item in balanced] == list(balance_indices(LABELS, target='a', seed=3))
+
+
+def _count_en_th_loop(document):
+    """Reference - the per-character loop which count_en_th replaced."""
+    th_count = 0
+    en_count = 0
+    for char in document:
+        if ord(char) in range(3585, 3678):
+            th_count += 1
+        elif ord(char) in range(65, 122):
+            en_count += 1
+    return th_count, en_count
+
+
+def _random_documents(n_docs=300, seed=0):
+    rand = random.Random(seed)
+    thai = [chr(code) for code in range(0x0e00, 0x0e60)]  # includes the unassigned U+0E00 and U+0E5E-U+0E5F.
+    english = [chr(code) for code in range(0x40, 0x7c)]  # includes '@', '[' to '`', 'z' and '{'.
+    other = list(' 0123456789.,\n') + ['\u00e9', '\u4e2d', '\U0001f600']
+    alphabets = [thai, english, thai + english + other]
+    documents = ['', ' ', '\U0001f600']
+    for _ in range(n_docs):
+        documents.append(''.join(rand.choices(rand.choice(alphabets), k=rand.randint(0, 40))))
+    return documents
+
+
+def test_character_counts_match_the_per_character_loop():
+    documents = _random_documents()
+    th_counts, en_counts = count_en_th_batch(documents)
+    for document, th_count, en_count in zip(documents, th_counts, en_counts):
+        expected = _count_en_th_loop(document)
+        assert count_en_th(document) == expected
+        assert (th_count, en_count) == expected
+    classes = classify_en_th_batch(documents)
+    for document, class_ in zip(documents, classes):
+        th_count, en_count = _count_en_th_loop(document)
+        assert class_ == classify_en_th(document) == ('en' if en_count >= th_count else 'th')
+    assert [len(counts) for counts in count_en_th_batch([])] == [0, 0]
@@ -0,0 +1,17 @@
+import numpy as np
+
+from src.benchmark import synthetic_tokenized_documents
+from src.vectorizer import create_vectorizer
+
+
+def test_parallel_fit_matches_serial_fit():
+    documents = synthetic_tokenized_documents(600)
+    serial = create_vectorizer(documents, pool_process=0)
+    parallel = create_vectorizer(documents, pool_process=2)
+    for field in ('title_vectorizer', 'desc_vectorizer'):
+        serial_vect, parallel_vect = getattr(serial, field), getattr(parallel, field)
+        assert serial_vect.vocabulary_ == parallel_vect.vocabulary_
+        assert np.allclose(serial_vect.idf_, parallel_vect.idf_)
+    texts = [document['desc_seg'] for document in documents[:20]]
+    assert np.allclose(serial.desc_vectorizer.transform(texts).toarray(),
+                       parallel.desc_vectorizer.transform(texts).toarray())